@@ -2,7 +2,9 @@
 
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.db import transaction
 from .models import User
+from dashboard import stats
 
 @admin.register(User)
 class UserAdmin(BaseUserAdmin):
@@ -24,4 +26,15 @@ class UserAdmin(BaseUserAdmin):
         ('Additional Info', {
             'fields': ('role', 'phone', 'email', 'first_name', 'last_name')
         }),
-    )
\ No newline at end of file
+    )
+    
+    def delete_model(self, request, obj):
+        # The user's shop and orders are deleted with it
+        stats.record_user_removed(obj)
+        super().delete_model(request, obj)
+    
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            for user in queryset:
+                stats.record_user_removed(user)
+            super().delete_queryset(request, queryset)
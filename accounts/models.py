@@ -15,9 +15,13 @@ class User(AbstractUser):
         ('student', 'Student'),
     )
     
+    # Resized copies built by foodcourt.images
+    IMAGE_VARIANTS = {'profile_picture': ('picture_variants', ('thumb',))}
+    
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='student')
     phone = models.CharField(max_length=15, blank=True, null=True)
     profile_picture = models.ImageField(upload_to='profiles/', blank=True, null=True)
+    picture_variants = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -0,0 +1,16 @@
+# accounts/signals.py
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from foodcourt import images
+from .models import User
+
+
+# ============= IMAGE VARIANTS =============
+
+@receiver(post_save, sender=User)
+def build_profile_picture_variants(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Logins save last_login alone; nothing to look at then
+    if raw or (update_fields is not None and 'profile_picture' not in update_fields):
+        return
+    images.schedule_variants(instance)
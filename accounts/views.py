@@ -4,6 +4,8 @@ from django.shortcuts import render, redirect
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db import transaction
+from dashboard import stats
 from .forms import StudentRegistrationForm, VendorRegistrationForm, UserLoginForm
 from .models import User
 
@@ -175,9 +177,11 @@ def delete_account(request):
             messages.error(request, 'Incorrect password.')
             return redirect('delete_account')
         
-        # Delete account
+        # Delete account, with the shop and orders that go with it
         user = request.user
-        user.delete()
+        with transaction.atomic():
+            stats.record_user_removed(user)
+            user.delete()
         messages.success(request, 'Your account has been deleted.')
         return redirect('home')
     
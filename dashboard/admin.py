@@ -1,3 +1,41 @@
+# dashboard/admin.py
+
 from django.contrib import admin
+from vendors.admin import ShopListFilter
+from .models import DailyItemSales, DailyShopSales
+
+
+@admin.register(DailyShopSales)
+class DailyShopSalesAdmin(admin.ModelAdmin):
+    """
+    Read-only view of the daily shop rollups (rebuilt by backfill_sales_rollups)
+    """
+    list_display = ['date', 'shop', 'completed_orders', 'cancelled_orders', 'revenue', 'items_sold']
+    list_filter = [('shop', ShopListFilter)]
+    list_select_related = ['shop__vendor']
+    date_hierarchy = 'date'
+    ordering = ['-date']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(DailyItemSales)
+class DailyItemSalesAdmin(admin.ModelAdmin):
+    """
+    Read-only view of the daily item rollups
+    """
+    list_display = ['date', 'food_item', 'quantity', 'revenue']
+    list_filter = [('shop', ShopListFilter)]
+    list_select_related = ['food_item__shop__vendor']
+    date_hierarchy = 'date'
+    ordering = ['-date', '-revenue']
+
+    def has_add_permission(self, request):
+        return False
 
-# Register your models here.
+    def has_change_permission(self, request, obj=None):
+        return False
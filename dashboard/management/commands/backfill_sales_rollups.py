@@ -0,0 +1,30 @@
+# dashboard/management/commands/backfill_sales_rollups.py
+
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from dashboard import rollups
+
+
+def _date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f'Not an ISO date (YYYY-MM-DD): {value}')
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily sales rollups from orders (all history, or a date range)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=_date, help='First order date to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--end', type=_date, help='Last order date to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--shop', type=int, action='append', dest='shops',
+                            help='Only this shop id (repeatable)')
+
+    def handle(self, *args, **options):
+        if options['start'] and options['end'] and options['start'] > options['end']:
+            raise CommandError('--start is after --end')
+        shop_rows, item_rows = rollups.rebuild(options['start'], options['end'], options['shops'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {shop_rows} daily shop row(s) and {item_rows} daily item row(s).'
+        ))
@@ -0,0 +1,36 @@
+# dashboard/management/commands/reconcile_stats.py
+
+from django.core.management.base import BaseCommand
+from dashboard import stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the maintained dashboard counters and repair any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drifted counters without writing them',
+        )
+
+    def handle(self, *args, **options):
+        drift = stats.reconcile(apply=not options['dry_run'])
+
+        for label, stored, expected in drift:
+            if stored is None:
+                self.stdout.write(f'{label}: missing, expected {expected}')
+                continue
+            changed = {
+                field: f'{stored[field]} -> {value}'
+                for field, value in expected.items()
+                if stored.get(field) != value
+            }
+            self.stdout.write(f'{label}: {changed}')
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('All counters are in sync.'))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'{len(drift)} counter row(s) drifted (dry run, nothing written).'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Repaired {len(drift)} counter row(s).'))
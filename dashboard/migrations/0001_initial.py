@@ -0,0 +1,50 @@
+# Generated by Django 5.2.9 on 2026-10-18 04:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('vendors', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GlobalStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_shops', models.IntegerField(default=0)),
+                ('pending_shops', models.IntegerField(default=0)),
+                ('approved_shops', models.IntegerField(default=0)),
+                ('total_food_items', models.IntegerField(default=0)),
+                ('total_orders', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Global Stats',
+                'verbose_name_plural': 'Global Stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='ShopStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_food_items', models.IntegerField(default=0)),
+                ('available_food_items', models.IntegerField(default=0)),
+                ('total_orders', models.IntegerField(default=0)),
+                ('pending_orders', models.IntegerField(default=0)),
+                ('today_orders', models.IntegerField(default=0)),
+                ('today_date', models.DateField(blank=True, help_text='Day that today_orders refers to', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('shop', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='vendors.shop')),
+            ],
+            options={
+                'verbose_name': 'Shop Stats',
+                'verbose_name_plural': 'Shop Stats',
+            },
+        ),
+    ]
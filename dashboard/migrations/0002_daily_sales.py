@@ -0,0 +1,50 @@
+# Generated by Django 5.2.9 on 2026-10-18 05:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_initial'),
+        ('menu', '0003_fooditem_image_variants'),
+        ('vendors', '0002_shop_banner_variants_shop_logo_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyItemSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quantity', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('food_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='menu.fooditem')),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_item_sales', to='vendors.shop')),
+            ],
+            options={
+                'verbose_name': 'Daily Item Sales',
+                'verbose_name_plural': 'Daily Item Sales',
+                'indexes': [models.Index(fields=['shop', 'date'], name='daily_item_sales_shop_date')],
+                'constraints': [models.UniqueConstraint(fields=('food_item', 'date'), name='unique_daily_item_sales')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyShopSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('completed_orders', models.IntegerField(default=0)),
+                ('cancelled_orders', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('items_sold', models.IntegerField(default=0)),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='vendors.shop')),
+            ],
+            options={
+                'verbose_name': 'Daily Shop Sales',
+                'verbose_name_plural': 'Daily Shop Sales',
+                'constraints': [models.UniqueConstraint(fields=('shop', 'date'), name='unique_daily_shop_sales')],
+            },
+        ),
+    ]
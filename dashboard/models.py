@@ -1,3 +1,111 @@
+# dashboard/models.py
+
 from django.db import models
+from django.utils import timezone
+from vendors.models import Shop
+from menu.models import FoodItem
+
+class ShopStats(models.Model):
+    """
+    Maintained dashboard counters for a single shop
+    Kept in step with menu and order writes by dashboard.stats
+    """
+    shop = models.OneToOneField(Shop, on_delete=models.CASCADE, related_name='stats')
+
+    # Menu Counters
+    total_food_items = models.IntegerField(default=0)
+    available_food_items = models.IntegerField(default=0)
+
+    # Order Counters
+    total_orders = models.IntegerField(default=0)
+    pending_orders = models.IntegerField(default=0)
+    today_orders = models.IntegerField(default=0)
+    today_date = models.DateField(blank=True, null=True, help_text="Day that today_orders refers to")
+
+    # Timestamps
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Shop Stats'
+        verbose_name_plural = 'Shop Stats'
+
+    def __str__(self):
+        return f"Stats for {self.shop.shop_name}"
+
+    @property
+    def orders_today(self):
+        # The counter is only reset by the next order, so a stale day means zero
+        if self.today_date == timezone.localdate():
+            return self.today_orders
+        return 0
+
+
+class GlobalStats(models.Model):
+    """
+    Maintained site-wide counters for the admin dashboard (single row)
+    """
+    SINGLETON_ID = 1
+
+    total_shops = models.IntegerField(default=0)
+    pending_shops = models.IntegerField(default=0)
+    approved_shops = models.IntegerField(default=0)
+    total_food_items = models.IntegerField(default=0)
+    total_orders = models.IntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Global Stats'
+        verbose_name_plural = 'Global Stats'
+
+    def __str__(self):
+        return 'Global Stats'
+
+
+class DailyShopSales(models.Model):
+    """
+    One shop's closed orders on one day (the day they were placed)
+    Maintained by dashboard.rollups; analytics read only these rows.
+    """
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name='daily_sales')
+    date = models.DateField()
+
+    completed_orders = models.IntegerField(default=0)
+    cancelled_orders = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    items_sold = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Daily Shop Sales'
+        verbose_name_plural = 'Daily Shop Sales'
+        constraints = [
+            models.UniqueConstraint(fields=['shop', 'date'], name='unique_daily_shop_sales'),
+        ]
+
+    def __str__(self):
+        return f"{self.shop.shop_name} on {self.date}"
+
+
+class DailyItemSales(models.Model):
+    """
+    One food item's sales in completed orders on one day
+    """
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name='daily_item_sales')
+    food_item = models.ForeignKey(FoodItem, on_delete=models.CASCADE, related_name='daily_sales')
+    date = models.DateField()
+
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = 'Daily Item Sales'
+        verbose_name_plural = 'Daily Item Sales'
+        constraints = [
+            models.UniqueConstraint(fields=['food_item', 'date'], name='unique_daily_item_sales'),
+        ]
+        indexes = [
+            models.Index(fields=['shop', 'date'], name='daily_item_sales_shop_date'),
+        ]
 
-# Create your models here.
+    def __str__(self):
+        return f"{self.food_item.name} on {self.date}"
@@ -0,0 +1,218 @@
+# dashboard/rollups.py
+
+"""
+Daily sales rollups
+
+DailyShopSales and DailyItemSales hold per-day sums of closed orders, so
+analytics over months read a row per day instead of every order. An order
+counts once it is completed (revenue, items sold) or cancelled, on the day
+it was placed, which never changes, so the rows are reproducible from the
+order tables.
+
+dashboard.stats calls record_order_status_changed() and
+record_order_removed() from its order hooks, inside the same transaction as
+the write. rebuild() recomputes a date range from the source tables: the
+backfill and repair path (`manage.py backfill_sales_rollups`).
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+from orders.models import Order, OrderItem
+from foodcourt.dates import day_range
+from .models import DailyItemSales, DailyShopSales
+
+COMPLETED = 'completed'
+CANCELLED = 'cancelled'
+CLOSED = (COMPLETED, CANCELLED)
+
+
+def order_date(order):
+    return timezone.localdate(order.created_at)
+
+
+# ============= INCREMENTAL UPDATES =============
+
+def _add(model, lookup, **deltas):
+    """
+    Add deltas to a rollup row in one UPDATE, creating the row if needed
+    """
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    if model.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        # Another request created the row first
+        model.objects.filter(**lookup).update(**changes)
+
+
+def _apply(order, status, sign):
+    """
+    Add (sign=1) or take back (sign=-1) the contribution of order as it
+    counts under a closed status
+    """
+    day = order_date(order)
+    if status == CANCELLED:
+        _add(DailyShopSales, {'shop_id': order.shop_id, 'date': day}, cancelled_orders=sign)
+        return
+
+    items = list(OrderItem.objects.filter(order=order).values_list('food_item_id', 'quantity', 'price'))
+    _add(
+        DailyShopSales, {'shop_id': order.shop_id, 'date': day},
+        completed_orders=sign,
+        revenue=sign * order.total_amount,
+        items_sold=sign * sum(quantity for _, quantity, _ in items),
+    )
+    for food_item_id, quantity, price in items:
+        _add(
+            DailyItemSales, {'shop_id': order.shop_id, 'food_item_id': food_item_id, 'date': day},
+            quantity=sign * quantity,
+            revenue=sign * price * quantity,
+        )
+
+
+def record_order_status_changed(order, old_status):
+    """
+    Move an order in or out of the rollups as its status changes
+    """
+    if old_status == order.status:
+        return
+    if old_status in CLOSED:
+        _apply(order, old_status, -1)
+    if order.status in CLOSED:
+        _apply(order, order.status, 1)
+
+
+def record_order_removed(order):
+    """
+    Must run before the delete, while the order's items still exist
+    """
+    if order.status in CLOSED:
+        _apply(order, order.status, -1)
+
+
+# ============= FULL RECOMPUTATION =============
+
+def rebuild(start=None, end=None, shop_ids=None):
+    """
+    Recompute the rollups for orders placed from start to end (dates,
+    inclusive, open-ended if None), optionally for some shops only
+    Returns the number of (shop rows, item rows) written.
+    """
+    orders = Order.objects.filter(status__in=CLOSED)
+    shop_rows = DailyShopSales.objects.all()
+    item_rows = DailyItemSales.objects.all()
+    if start is not None:
+        orders = orders.filter(created_at__gte=day_range(start)[0])
+        shop_rows = shop_rows.filter(date__gte=start)
+        item_rows = item_rows.filter(date__gte=start)
+    if end is not None:
+        orders = orders.filter(created_at__lt=day_range(end)[1])
+        shop_rows = shop_rows.filter(date__lte=end)
+        item_rows = item_rows.filter(date__lte=end)
+    if shop_ids is not None:
+        orders = orders.filter(shop_id__in=shop_ids)
+        shop_rows = shop_rows.filter(shop_id__in=shop_ids)
+        item_rows = item_rows.filter(shop_id__in=shop_ids)
+
+    per_shop = (
+        orders.order_by()
+        .annotate(day=TruncDate('created_at'))
+        .values('shop_id', 'day')
+        .annotate(
+            completed=Count('id', filter=Q(status=COMPLETED)),
+            cancelled=Count('id', filter=Q(status=CANCELLED)),
+            revenue=Sum('total_amount', filter=Q(status=COMPLETED)),
+        )
+    )
+    line_total = ExpressionWrapper(F('price') * F('quantity'), output_field=DecimalField(max_digits=12, decimal_places=2))
+    per_item = (
+        OrderItem.objects.filter(order__in=orders.filter(status=COMPLETED))
+        .order_by()
+        .annotate(day=TruncDate('order__created_at'))
+        .values('order__shop_id', 'food_item_id', 'day')
+        .annotate(quantity_sold=Sum('quantity'), revenue=Sum(line_total))
+    )
+
+    items_sold = {}
+    item_sales = []
+    for row in per_item:
+        key = (row['order__shop_id'], row['day'])
+        items_sold[key] = items_sold.get(key, 0) + row['quantity_sold']
+        item_sales.append(DailyItemSales(
+            shop_id=row['order__shop_id'], food_item_id=row['food_item_id'], date=row['day'],
+            quantity=row['quantity_sold'], revenue=row['revenue'],
+        ))
+    shop_sales = [
+        DailyShopSales(
+            shop_id=row['shop_id'], date=row['day'],
+            completed_orders=row['completed'], cancelled_orders=row['cancelled'],
+            revenue=row['revenue'] or Decimal('0'),
+            items_sold=items_sold.get((row['shop_id'], row['day']), 0),
+        )
+        for row in per_shop
+    ]
+
+    with transaction.atomic():
+        shop_rows.delete()
+        item_rows.delete()
+        DailyShopSales.objects.bulk_create(shop_sales, batch_size=500)
+        DailyItemSales.objects.bulk_create(item_sales, batch_size=500)
+    return len(shop_sales), len(item_sales)
+
+
+# ============= READS =============
+
+def sales_report(shop_ids, start, end, top_items=10):
+    """
+    Totals, a per-day (or, past 92 days, per-month) series and the best
+    selling items for shops over start..end, read from the rollups only
+    shop_ids=None covers every shop.
+    """
+    days = DailyShopSales.objects.filter(date__gte=start, date__lte=end)
+    items = DailyItemSales.objects.filter(date__gte=start, date__lte=end)
+    if shop_ids is not None:
+        days = days.filter(shop_id__in=shop_ids)
+        items = items.filter(shop_id__in=shop_ids)
+
+    sums = {
+        'completed_orders': Sum('completed_orders'),
+        'cancelled_orders': Sum('cancelled_orders'),
+        'revenue': Sum('revenue'),
+        'items_sold': Sum('items_sold'),
+    }
+    monthly = (end - start) > timedelta(days=92)
+    if monthly:
+        series = days.order_by().annotate(period=TruncMonth('date')).values('period').annotate(**sums).order_by('period')
+    else:
+        series = days.order_by().annotate(period=F('date')).values('period').annotate(**sums).order_by('period')
+
+    top = (
+        items.order_by()
+        .values('food_item_id', 'food_item__name')
+        .annotate(quantity_sold=Sum('quantity'), revenue=Sum('revenue'))
+        .order_by('-revenue', '-quantity_sold')[:top_items]
+    )
+    series = [{**row, 'revenue': _money(row['revenue'])} for row in series]
+    totals = {field: sum(row[field] for row in series) for field in sums}
+    totals['revenue'] = _money(totals['revenue'])
+    top = [{**row, 'revenue': _money(row['revenue'])} for row in top]
+    return {
+        'totals': totals,
+        'granularity': 'month' if monthly else 'day',
+        'series': series,
+        'top_items': top,
+    }
+
+
+def _money(value):
+    # SQLite sums of decimals come back without their scale
+    return Decimal(value or 0).quantize(Decimal('0.01'))
@@ -0,0 +1,323 @@
+# dashboard/stats.py
+
+"""
+Maintained dashboard counters
+
+Views and admin actions call the record_* helpers inside the same
+transaction as the write they describe, so a counter never commits without
+its data. The order helpers also keep the daily sales rollups
+(dashboard.rollups) in step. reconcile() recomputes every row from the
+source tables and is the repair path for anything that bypasses these
+helpers.
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, Q, Value, When
+from django.utils import timezone
+from foodcourt.dates import day_range
+from menu.models import FoodItem
+from orders.models import Order
+from vendors.models import Shop
+from .models import ShopStats, GlobalStats
+from . import rollups
+
+SHOP_FIELDS = ['total_food_items', 'available_food_items', 'total_orders', 'pending_orders', 'today_orders']
+GLOBAL_FIELDS = ['total_shops', 'pending_shops', 'approved_shops', 'total_food_items', 'total_orders']
+
+
+# ============= FULL RECOMPUTATION =============
+
+def compute_shop_stats(shop_id):
+    """
+    Count a shop's counters straight from the source tables
+    """
+    today = timezone.localdate()
+    start, end = day_range(today)
+    items = FoodItem.objects.filter(shop_id=shop_id).aggregate(
+        total=Count('id'),
+        available=Count('id', filter=Q(is_available=True)),
+    )
+    orders = Order.objects.filter(shop_id=shop_id).aggregate(
+        total=Count('id'),
+        pending=Count('id', filter=Q(status='pending')),
+        today=Count('id', filter=Q(created_at__gte=start, created_at__lt=end)),
+    )
+    return {
+        'total_food_items': items['total'],
+        'available_food_items': items['available'],
+        'total_orders': orders['total'],
+        'pending_orders': orders['pending'],
+        'today_orders': orders['today'],
+        'today_date': today,
+    }
+
+
+def compute_global_stats():
+    """
+    Count the site-wide counters straight from the source tables
+    """
+    shops = Shop.objects.aggregate(
+        total=Count('id'),
+        pending=Count('id', filter=Q(status='pending')),
+        approved=Count('id', filter=Q(status='approved')),
+    )
+    return {
+        'total_shops': shops['total'],
+        'pending_shops': shops['pending'],
+        'approved_shops': shops['approved'],
+        'total_food_items': FoodItem.objects.count(),
+        'total_orders': Order.objects.count(),
+    }
+
+
+# ============= INCREMENTAL UPDATES =============
+
+def _deltas(**deltas):
+    return {field: F(field) + delta for field, delta in deltas.items() if delta}
+
+
+# Statements a write adds when it finds neither counter row (a shop's first
+# order, in tests): each row is created from a full count in a savepoint,
+# 2 counts for the shop row and 3 for the global row
+CREATE_ROWS_QUERIES = 11
+
+
+def _apply(model, lookup, compute, changes):
+    """
+    Apply column updates to a counter row in one UPDATE statement
+    A missing row is created from a full count, which already includes
+    the write being recorded.
+    """
+    if not changes:
+        return
+    changes['updated_at'] = timezone.now()
+    if model.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **compute())
+    except IntegrityError:
+        # Another request created the row first
+        model.objects.filter(**lookup).update(**changes)
+
+
+def _adjust_shop(shop_id, **deltas):
+    _apply(ShopStats, {'shop_id': shop_id}, lambda: compute_shop_stats(shop_id), _deltas(**deltas))
+
+
+def _adjust_global(**deltas):
+    _apply(GlobalStats, {'id': GlobalStats.SINGLETON_ID}, compute_global_stats, _deltas(**deltas))
+
+
+def record_food_item_added(food_item):
+    _adjust_shop(
+        food_item.shop_id,
+        total_food_items=1,
+        available_food_items=int(food_item.is_available),
+    )
+    _adjust_global(total_food_items=1)
+
+
+def record_food_item_changed(food_item, was_available):
+    _adjust_shop(
+        food_item.shop_id,
+        available_food_items=int(food_item.is_available) - int(was_available),
+    )
+
+
+def record_food_item_moved(food_item, old_shop_id, was_available):
+    """
+    The item was reassigned from old_shop_id to its current shop
+    """
+    _adjust_shop(old_shop_id, total_food_items=-1, available_food_items=-int(was_available))
+    _adjust_shop(
+        food_item.shop_id,
+        total_food_items=1,
+        available_food_items=int(food_item.is_available),
+    )
+
+
+def record_availability_changed(shop_deltas):
+    """
+    Apply {shop id: change in available items} after a bulk update that
+    switched items on or off (menu.stock)
+    """
+    for shop_id, delta in shop_deltas.items():
+        _adjust_shop(shop_id, available_food_items=delta)
+
+
+def record_food_item_removed(food_item):
+    _adjust_shop(
+        food_item.shop_id,
+        total_food_items=-1,
+        available_food_items=-int(food_item.is_available),
+    )
+    _adjust_global(total_food_items=-1)
+
+
+def record_order_placed(order):
+    today = timezone.localdate()
+    changes = _deltas(total_orders=1, pending_orders=int(order.status == 'pending'))
+    # Both sides of the CASE see the old today_date, so a new day restarts at 1
+    changes['today_orders'] = Case(
+        When(today_date=today, then=F('today_orders') + 1),
+        default=Value(1),
+    )
+    changes['today_date'] = Value(today)
+    _apply(ShopStats, {'shop_id': order.shop_id}, lambda: compute_shop_stats(order.shop_id), changes)
+    _adjust_global(total_orders=1)
+    # Orders are placed pending, but the admin can add one already closed
+    rollups.record_order_status_changed(order, None)
+
+
+def record_order_removed(order):
+    today = timezone.localdate()
+    changes = _deltas(total_orders=-1, pending_orders=-int(order.status == 'pending'))
+    if timezone.localdate(order.created_at) == today:
+        changes['today_orders'] = Case(
+            When(today_date=today, then=F('today_orders') - 1),
+            default=F('today_orders'),
+        )
+    _apply(ShopStats, {'shop_id': order.shop_id}, lambda: compute_shop_stats(order.shop_id), changes)
+    _adjust_global(total_orders=-1)
+    rollups.record_order_removed(order)
+
+
+def record_order_status_changed(order, old_status):
+    _adjust_shop(
+        order.shop_id,
+        pending_orders=int(order.status == 'pending') - int(old_status == 'pending'),
+    )
+    rollups.record_order_status_changed(order, old_status)
+
+
+def record_shop_added(shop):
+    _adjust_global(
+        total_shops=1,
+        pending_shops=int(shop.status == 'pending'),
+        approved_shops=int(shop.status == 'approved'),
+    )
+
+
+def record_shop_status_changed(shop, old_status):
+    _adjust_global(
+        pending_shops=int(shop.status == 'pending') - int(old_status == 'pending'),
+        approved_shops=int(shop.status == 'approved') - int(old_status == 'approved'),
+    )
+
+
+def record_shop_removed(shop):
+    """
+    Must run before the delete, while the shop's items and orders still exist
+    """
+    counts = compute_shop_stats(shop.id)
+    _adjust_global(
+        total_shops=-1,
+        pending_shops=-int(shop.status == 'pending'),
+        approved_shops=-int(shop.status == 'approved'),
+        total_food_items=-counts['total_food_items'],
+        total_orders=-counts['total_orders'],
+    )
+
+
+def record_user_removed(user):
+    """
+    Must run before the delete, which takes the user's shop and orders with it
+    """
+    for shop in Shop.objects.filter(vendor=user):
+        record_shop_removed(shop)
+    # Orders at the user's own shop went out with it
+    for order in Order.objects.filter(user=user).exclude(shop__vendor=user):
+        record_order_removed(order)
+
+
+# ============= READS =============
+
+def get_shop_stats(shop):
+    """
+    Return the counter row for a shop, creating it on first use
+    """
+    stats = ShopStats.objects.filter(shop=shop).first()
+    if stats is None:
+        try:
+            with transaction.atomic():
+                stats = ShopStats.objects.create(shop=shop, **compute_shop_stats(shop.id))
+        except IntegrityError:
+            stats = ShopStats.objects.get(shop=shop)
+    return stats
+
+
+def get_global_stats():
+    """
+    Return the site-wide counter row, creating it on first use
+    """
+    stats = GlobalStats.objects.filter(id=GlobalStats.SINGLETON_ID).first()
+    if stats is None:
+        try:
+            with transaction.atomic():
+                stats = GlobalStats.objects.create(id=GlobalStats.SINGLETON_ID, **compute_global_stats())
+        except IntegrityError:
+            stats = GlobalStats.objects.get(id=GlobalStats.SINGLETON_ID)
+    return stats
+
+
+# ============= RECONCILIATION =============
+
+def reconcile(apply=True):
+    """
+    Recompute every counter row and return a list of (label, stored, expected)
+    for rows that had drifted. With apply=False nothing is written.
+    """
+    today = timezone.localdate()
+    start, end = day_range(today)
+    item_counts = {
+        row['shop']: row
+        for row in FoodItem.objects.order_by().values('shop').annotate(
+            total=Count('id'),
+            available=Count('id', filter=Q(is_available=True)),
+        )
+    }
+    order_counts = {
+        row['shop']: row
+        for row in Order.objects.order_by().values('shop').annotate(
+            total=Count('id'),
+            pending=Count('id', filter=Q(status='pending')),
+            today=Count('id', filter=Q(created_at__gte=start, created_at__lt=end)),
+        )
+    }
+    existing = {row.shop_id: row for row in ShopStats.objects.all()}
+    drift = []
+
+    with transaction.atomic():
+        for shop_id in Shop.objects.order_by('id').values_list('id', flat=True):
+            items = item_counts.get(shop_id, {})
+            orders = order_counts.get(shop_id, {})
+            expected = {
+                'total_food_items': items.get('total', 0),
+                'available_food_items': items.get('available', 0),
+                'total_orders': orders.get('total', 0),
+                'pending_orders': orders.get('pending', 0),
+                'today_orders': orders.get('today', 0),
+            }
+            row = existing.get(shop_id)
+            stored = None
+            if row is not None:
+                stored = {field: getattr(row, field) for field in SHOP_FIELDS}
+                stored['today_orders'] = row.orders_today
+            if stored != expected:
+                drift.append((f'shop {shop_id}', stored, expected))
+                if apply:
+                    ShopStats.objects.update_or_create(
+                        shop_id=shop_id,
+                        defaults={**expected, 'today_date': today},
+                    )
+
+        expected = compute_global_stats()
+        row = GlobalStats.objects.filter(id=GlobalStats.SINGLETON_ID).first()
+        stored = {field: getattr(row, field) for field in GLOBAL_FIELDS} if row else None
+        if stored != expected:
+            drift.append(('global', stored, expected))
+            if apply:
+                GlobalStats.objects.update_or_create(id=GlobalStats.SINGLETON_ID, defaults=expected)
+
+    return drift
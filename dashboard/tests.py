@@ -1,3 +1,233 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from decimal import Decimal
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from accounts.models import User
+from vendors.models import Shop
+from menu.models import Category, FoodItem
+from orders.models import Cart, Order, OrderItem
+from . import rollups, stats
+from .models import DailyItemSales, DailyShopSales, GlobalStats, ShopStats
 
-# Create your tests here.
+
+@override_settings(QUERY_BUDGET_MODE='raise')
+class DashboardStatsTests(TestCase):
+    def setUp(self):
+        self.vendor = User.objects.create_user('vendor', role='vendor')
+        self.student = User.objects.create_user('student', role='student')
+        self.shop = Shop.objects.create(
+            vendor=self.vendor, shop_name='Dosa Corner', description='South Indian',
+            phone='123', email='dosa@example.com', address='Block A',
+            status='approved', is_active=True,
+        )
+
+    def test_menu_writes_update_shop_counters(self):
+        category = Category.objects.create(name='Breakfast')
+        self.client.force_login(self.vendor)
+        self.client.post(reverse('vendor_add_food'), {
+            'category': category.id, 'name': 'Masala Dosa', 'description': 'Crispy',
+            'price': '60.00', 'is_available': 'on',
+        })
+        food_item = FoodItem.objects.get()
+        self.client.post(reverse('vendor_edit_food', args=[food_item.id]), {
+            'category': category.id, 'name': 'Masala Dosa', 'description': 'Crispy', 'price': '60.00',
+        })
+
+        shop_stats = ShopStats.objects.get(shop=self.shop)
+        self.assertEqual(shop_stats.total_food_items, 1)
+        self.assertEqual(shop_stats.available_food_items, 0)
+        self.assertEqual(GlobalStats.objects.get().total_food_items, 1)
+
+    def test_order_writes_update_shop_counters(self):
+        food_item = FoodItem.objects.create(shop=self.shop, name='Idli', description='Soft', price='30.00')
+        Cart.objects.create(user=self.student, food_item=food_item, quantity=2)
+        self.client.force_login(self.student)
+        self.client.post(reverse('checkout', args=[self.shop.id]))
+
+        shop_stats = ShopStats.objects.get(shop=self.shop)
+        self.assertEqual(shop_stats.total_orders, 1)
+        self.assertEqual(shop_stats.pending_orders, 1)
+        self.assertEqual(shop_stats.orders_today, 1)
+
+        order = Order.objects.get()
+        self.client.post(reverse('cancel_order', args=[order.id]))
+        shop_stats.refresh_from_db()
+        self.assertEqual(shop_stats.pending_orders, 0)
+        self.assertEqual(shop_stats.total_orders, 1)
+
+    def test_reconcile_repairs_drift(self):
+        FoodItem.objects.create(shop=self.shop, name='Vada', description='Fried', price='20.00')
+        ShopStats.objects.create(shop=self.shop, total_food_items=7)
+
+        drift = stats.reconcile(apply=False)
+        self.assertEqual(ShopStats.objects.get().total_food_items, 7)
+        self.assertEqual({label for label, _, _ in drift}, {f'shop {self.shop.id}', 'global'})
+
+        stats.reconcile()
+        self.assertEqual(ShopStats.objects.get().total_food_items, 1)
+        self.assertEqual(GlobalStats.objects.get().total_shops, 1)
+        self.assertEqual(stats.reconcile(), [])
+
+    def create_order(self, user, shop, number, status='pending'):
+        return Order.objects.create(
+            order_number=f'ORD{number}', user=user, shop=shop, total_amount=Decimal('30.00'), status=status,
+        )
+
+    def test_account_deletion_updates_counters(self):
+        other_vendor = User.objects.create_user('other', role='vendor')
+        other_shop = Shop.objects.create(
+            vendor=other_vendor, shop_name='Chaat Stop', description='Snacks',
+            phone='456', email='chaat@example.com', address='Block B', status='approved', is_active=True,
+        )
+        FoodItem.objects.create(shop=self.shop, name='Idli', description='Soft', price='30.00')
+        self.create_order(self.student, self.shop, 1)
+        self.create_order(self.student, other_shop, 2)
+        self.create_order(self.student, other_shop, 3, status='completed')
+        stats.reconcile()
+
+        self.student.set_password('pass')
+        self.student.save()
+        self.client.force_login(self.student)
+        self.client.post(reverse('delete_account'), {'password': 'pass'})
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(stats.reconcile(apply=False), [])
+
+        admin = User.objects.create_superuser('boss', 'boss@example.com', 'pass')
+        self.client.force_login(admin)
+        self.client.post(reverse('admin:accounts_user_delete', args=[self.vendor.id]), {'post': 'yes'})
+        self.assertFalse(Shop.objects.filter(id=self.shop.id).exists())
+        self.assertEqual(stats.reconcile(apply=False), [])
+
+    def test_admin_reassigning_an_item_moves_its_counts(self):
+        other_vendor = User.objects.create_user('other', role='vendor')
+        other_shop = Shop.objects.create(
+            vendor=other_vendor, shop_name='Chaat Stop', description='Snacks',
+            phone='456', email='chaat@example.com', address='Block B', status='approved', is_active=True,
+        )
+        category = Category.objects.create(name='Breakfast')
+        food_item = FoodItem.objects.create(
+            shop=self.shop, category=category, name='Idli', description='Soft', price='30.00',
+        )
+        stats.reconcile()
+
+        self.client.force_login(User.objects.create_superuser('boss', 'boss@example.com', 'pass'))
+        response = self.client.post(reverse('admin:menu_fooditem_change', args=[food_item.id]), {
+            'shop': other_shop.id, 'category': category.id, 'name': 'Idli', 'description': 'Soft',
+            'price': '30.00', 'is_available': 'on',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(ShopStats.objects.get(shop=other_shop).available_food_items, 1)
+        self.assertEqual(stats.reconcile(apply=False), [])
+
+    def test_vendor_dashboard_reads_counter_row(self):
+        ShopStats.objects.create(shop=self.shop, total_food_items=42, available_food_items=40)
+        self.client.force_login(self.vendor)
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['total_food_items'], 42)
+        self.assertEqual(response.context['available_items'], 40)
+        self.assertEqual(response.context['today_orders'], 0)
+
+
+
+class SalesRollupTests(TestCase):
+    def setUp(self):
+        self.vendor = User.objects.create_user('vendor', role='vendor')
+        self.student = User.objects.create_user('student', role='student')
+        self.shop = Shop.objects.create(
+            vendor=self.vendor, shop_name='Dosa Corner', description='South Indian',
+            phone='123', email='dosa@example.com', address='Block A',
+            status='approved', is_active=True,
+        )
+        self.dosa = FoodItem.objects.create(shop=self.shop, name='Dosa', description='Crispy', price=Decimal('60.00'))
+        self.idli = FoodItem.objects.create(shop=self.shop, name='Idli', description='Soft', price=Decimal('30.00'))
+
+    def place(self, *lines, days_ago=0):
+        order = Order.objects.create(
+            order_number=f'T{Order.objects.count()}', user=self.student, shop=self.shop,
+            total_amount=sum(food_item.price * quantity for food_item, quantity in lines),
+        )
+        for food_item, quantity in lines:
+            OrderItem.objects.create(order=order, food_item=food_item, quantity=quantity, price=food_item.price)
+        if days_ago:
+            Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+            order.refresh_from_db()
+        return order
+
+    def set_status(self, order, status):
+        self.client.force_login(self.vendor)
+        self.client.post(reverse('update_order_status', args=[order.id]), {'status': status})
+        order.refresh_from_db()
+
+    def test_closing_orders_updates_rollups(self):
+        first = self.place((self.dosa, 2), (self.idli, 1))
+        second = self.place((self.idli, 3))
+        self.set_status(first, 'completed')
+        self.set_status(second, 'cancelled')
+
+        day = DailyShopSales.objects.get(shop=self.shop, date=timezone.localdate())
+        self.assertEqual((day.completed_orders, day.cancelled_orders, day.items_sold), (1, 1, 3))
+        self.assertEqual(day.revenue, Decimal('150.00'))
+        self.assertEqual(DailyItemSales.objects.get(food_item=self.dosa).quantity, 2)
+
+        # An admin reopening an order (OrderAdmin.save_model) takes it back out
+        first.status = 'ready'
+        first.save()
+        stats.record_order_status_changed(first, 'completed')
+        day.refresh_from_db()
+        self.assertEqual((day.completed_orders, day.items_sold, day.revenue), (0, 0, Decimal('0')))
+        self.assertEqual(DailyItemSales.objects.get(food_item=self.dosa).quantity, 0)
+
+    def test_rebuild_matches_incremental_rows(self):
+        for days_ago in (0, 1, 40):
+            self.set_status(self.place((self.dosa, 1), (self.idli, 2), days_ago=days_ago), 'completed')
+        self.set_status(self.place((self.dosa, 5), days_ago=1), 'cancelled')
+        self.place((self.dosa, 9))  # still open: not counted
+
+        def snapshot():
+            shops = DailyShopSales.objects.order_by('date').values_list(
+                'date', 'completed_orders', 'cancelled_orders', 'revenue', 'items_sold')
+            items = DailyItemSales.objects.order_by('date', 'food_item').values_list('date', 'food_item', 'quantity', 'revenue')
+            return list(shops), list(items)
+
+        incremental = snapshot()
+        DailyShopSales.objects.all().delete()
+        DailyItemSales.objects.all().delete()
+        call_command('backfill_sales_rollups', stdout=StringIO())
+        self.assertEqual(snapshot(), incremental)
+        self.assertEqual(len(incremental[0]), 3)
+
+        # A ranged rebuild leaves other days alone
+        DailyShopSales.objects.update(items_sold=0)
+        today = timezone.localdate()
+        self.assertEqual(rollups.rebuild(start=today, end=today), (1, 2))
+        self.assertEqual(DailyShopSales.objects.filter(items_sold=0).count(), 2)
+
+    def test_analytics_reads_rollups(self):
+        self.set_status(self.place((self.dosa, 2)), 'completed')
+        self.set_status(self.place((self.idli, 1), days_ago=200), 'completed')
+
+        self.client.force_login(self.vendor)
+        with self.assertNumQueries(5):  # session, user, shop, series, top items
+            response = self.client.get(reverse('sales_analytics'), {'days': 30})
+        report = response.context['report']
+        self.assertEqual(report['totals']['revenue'], Decimal('120.00'))
+        self.assertEqual([row['food_item__name'] for row in report['top_items']], ['Dosa'])
+        self.assertEqual(report['granularity'], 'day')
+
+        response = self.client.get(reverse('sales_analytics'), {'days': 365})
+        report = response.context['report']
+        self.assertEqual(report['granularity'], 'month')
+        self.assertEqual(len(report['series']), 2)
+        self.assertEqual(report['totals']['completed_orders'], 2)
+
+    def test_analytics_access(self):
+        self.client.force_login(self.student)
+        self.assertRedirects(self.client.get(reverse('sales_analytics')), reverse('dashboard'))
+
+        admin = User.objects.create_user('boss', role='admin')
+        self.client.force_login(admin)
+        response = self.client.get(reverse('sales_analytics'), {'shop': self.shop.id})
+        self.assertEqual(response.context['shop'], self.shop)
@@ -5,4 +5,5 @@ from . import views
 
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
+    path('analytics/', views.sales_analytics, name='sales_analytics'),
 ]
\ No newline at end of file
@@ -1,5 +1,6 @@
 # dashboard/views.py
 
+from datetime import date, timedelta
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
@@ -7,8 +8,11 @@ from django.utils import timezone
 from vendors.models import Shop
 from menu.models import FoodItem
 from orders.models import Order
+from . import rollups, stats
+from perf.budget import query_budget
 
 @login_required
+@query_budget(queries=10)
 def dashboard(request):
     """
     Role-based dashboard view
@@ -17,12 +21,13 @@ def dashboard(request):
     
     # Admin Dashboard
     if user.is_admin:
+        global_stats = stats.get_global_stats()
         context = {
-            'total_vendors': Shop.objects.count(),
-            'pending_shops': Shop.objects.filter(status='pending').count(),
-            'approved_shops': Shop.objects.filter(status='approved').count(),
-            'total_food_items': FoodItem.objects.count(),
-            'total_orders': Order.objects.count(),
+            'total_vendors': global_stats.total_shops,
+            'pending_shops': global_stats.pending_shops,
+            'approved_shops': global_stats.approved_shops,
+            'total_food_items': global_stats.total_food_items,
+            'total_orders': global_stats.total_orders,
         }
         return render(request, 'dashboard/admin_dashboard.html', context)
     
@@ -30,17 +35,14 @@ def dashboard(request):
     elif user.is_vendor:
         try:
             shop = user.shop
-            today_orders = Order.objects.filter(
-                shop=shop, 
-                created_at__date=timezone.now().date()
-            )
+            shop_stats = stats.get_shop_stats(shop)
             context = {
                 'shop': shop,
-                'total_food_items': FoodItem.objects.filter(shop=shop).count(),
-                'available_items': FoodItem.objects.filter(shop=shop, is_available=True).count(),
-                'total_orders': Order.objects.filter(shop=shop).count(),
-                'today_orders': today_orders.count(),
-                'pending_orders': Order.objects.filter(shop=shop, status='pending').count(),
+                'total_food_items': shop_stats.total_food_items,
+                'available_items': shop_stats.available_food_items,
+                'total_orders': shop_stats.total_orders,
+                'today_orders': shop_stats.orders_today,
+                'pending_orders': shop_stats.pending_orders,
             }
             return render(request, 'dashboard/vendor_dashboard.html', context)
         except Shop.DoesNotExist:
@@ -50,15 +52,80 @@ def dashboard(request):
     # Student Dashboard
     elif user.is_student:
         context = {
-            'total_shops': Shop.objects.filter(status='approved', is_active=True).count(),
-            'total_food_items': FoodItem.objects.filter(is_available=True, shop__status='approved').count(),
-            'my_orders': Order.objects.filter(user=user).count(),
-            'active_orders': Order.objects.filter(
-                user=user, 
-                status__in=['pending', 'confirmed', 'preparing', 'ready']
-            ).count(),
+            'total_shops': Shop.objects.active().count(),
+            'total_food_items': FoodItem.objects.browsable().count(),
+            'my_orders': Order.objects.for_student(user).count(),
+            'active_orders': Order.objects.for_student(user).active().count(),
         }
         return render(request, 'dashboard/student_dashboard.html', context)
     
     # Default (shouldn't reach here normally)
-    return render(request, 'dashboard/dashboard.html')
\ No newline at end of file
+    return render(request, 'dashboard/dashboard.html')
+
+
+ANALYTICS_RANGES = (7, 30, 90, 365)
+DEFAULT_ANALYTICS_RANGE = 30
+
+
+def _analytics_range(request):
+    """
+    (start, end, days) from ?start=&end= (ISO dates) or ?days=
+    """
+    today = timezone.localdate()
+    try:
+        start = date.fromisoformat(request.GET['start'])
+        end = date.fromisoformat(request.GET.get('end') or today.isoformat())
+        if start <= end:
+            return start, end, None
+    except (KeyError, ValueError):
+        pass
+    try:
+        days = int(request.GET.get('days', DEFAULT_ANALYTICS_RANGE))
+    except ValueError:
+        days = DEFAULT_ANALYTICS_RANGE
+    if days not in ANALYTICS_RANGES:
+        days = DEFAULT_ANALYTICS_RANGE
+    return today - timedelta(days=days - 1), today, days
+
+
+@login_required
+@query_budget(queries=8)
+def sales_analytics(request):
+    """
+    Revenue, order counts and top items over a date range, from the daily
+    sales rollups (vendors see their shop, admins every shop or ?shop=)
+    """
+    user = request.user
+    shop = None
+    if user.is_vendor:
+        try:
+            shop = user.shop
+        except Shop.DoesNotExist:
+            messages.info(request, 'Please apply for a shop first.')
+            return redirect('apply_shop')
+    elif user.is_admin:
+        shop_id = request.GET.get('shop')
+        if shop_id and shop_id.isdigit():
+            shop = Shop.objects.filter(id=shop_id).first()
+    else:
+        messages.error(request, 'Sales analytics are for vendors and admins.')
+        return redirect('dashboard')
+
+    start, end, days = _analytics_range(request)
+    report = rollups.sales_report([shop.id] if shop else None, start, end)
+    date_format = '%b %Y' if report['granularity'] == 'month' else '%d %b'
+    context = {
+        'shop': shop,
+        'shops': Shop.objects.approved().only('id', 'shop_name').order_by('shop_name') if user.is_admin else None,
+        'start': start,
+        'end': end,
+        'days': days,
+        'ranges': ANALYTICS_RANGES,
+        'report': report,
+        'chart': {
+            'labels': [row['period'].strftime(date_format) for row in report['series']],
+            'revenue': [str(row['revenue']) for row in report['series']],
+            'orders': [row['completed_orders'] for row in report['series']],
+        },
+    }
+    return render(request, 'dashboard/sales_analytics.html', context)
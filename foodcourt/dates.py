@@ -0,0 +1,17 @@
+# foodcourt/dates.py
+
+from datetime import datetime, time, timedelta
+from django.utils import timezone
+
+
+def day_range(first, last=None):
+    """
+    (start, end) aware datetimes spanning local days first..last
+    Filter with created_at__gte=start, created_at__lt=end: unlike
+    created_at__date, which wraps the column in a function, the range can
+    use an index on created_at.
+    """
+    last = last or first
+    start = timezone.make_aware(datetime.combine(first, time.min))
+    end = timezone.make_aware(datetime.combine(last + timedelta(days=1), time.min))
+    return start, end
@@ -0,0 +1,60 @@
+# foodcourt/db.py
+
+"""
+SQLite under concurrent writes
+
+settings.DATABASES opens every connection with WAL (readers never wait for
+the writer), synchronous=NORMAL, a memory map and a busy timeout, and
+begins atomic() blocks with BEGIN IMMEDIATE. A transaction then takes the
+write lock up front and queues for it on the busy timeout, instead of
+reading under a shared lock and failing with "database is locked" when a
+second transaction tries to upgrade at the same time.
+
+A writer can still wait past the timeout when the queue is long.
+@retry_when_locked reruns the whole transaction up to DB_LOCK_RETRIES more
+times, sleeping DB_LOCK_BACKOFF seconds, doubled per attempt and jittered,
+in between. It only retries a transaction it owns: called inside an outer
+atomic() block it lets the error through, for that block to retry as a
+whole.
+
+alist() is a helper for async views, which read through the async ORM.
+"""
+
+import random
+import time
+from functools import wraps
+from django.conf import settings
+from django.db import OperationalError, connection
+
+DEFAULT_LOCK_RETRIES = 3
+DEFAULT_LOCK_BACKOFF = 0.05
+
+
+def is_locked_error(error):
+    message = str(error).lower()
+    return 'locked' in message or 'busy' in message
+
+
+def retry_when_locked(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if connection.in_atomic_block:
+            return func(*args, **kwargs)
+        retries = getattr(settings, 'DB_LOCK_RETRIES', DEFAULT_LOCK_RETRIES)
+        backoff = getattr(settings, 'DB_LOCK_BACKOFF', DEFAULT_LOCK_BACKOFF)
+        for attempt in range(retries + 1):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as e:
+                if attempt == retries or not is_locked_error(e):
+                    raise
+            time.sleep(backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+    return wrapper
+
+
+async def alist(queryset):
+    """
+    list(queryset) through the async ORM, as an awaitable that
+    asyncio.gather() can run next to other queries
+    """
+    return [obj async for obj in queryset.aiterator()]
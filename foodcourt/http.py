@@ -0,0 +1,110 @@
+# foodcourt/http.py
+
+from functools import wraps
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+DEFAULT_PUBLIC_PAGE_MAX_AGE = 60
+
+
+def public_page(etag_func=None, last_modified_func=None):
+    """
+    Conditional GET and shared caching for pages anyone may see
+
+    Anonymous requests get validators (a 304 when they still match) and
+    `Cache-Control: public, max-age=PUBLIC_PAGE_MAX_AGE`, so a reverse proxy
+    or the browser can serve repeats. Logged-in pages carry the cart badge
+    and the user's menu, so they are `private, no-cache` without validators,
+    and every response varies on Cookie: the proxy keys anonymous and
+    logged-in visitors apart. A response that sets a cookie (a flashed
+    message, a new session) is never shared either: PublicPageMiddleware
+    checks the cookies once the session, messages and CSRF middleware have
+    added theirs.
+
+    Async views are supported; their validators still run sync, in a
+    thread.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            return _async_public_page(view, etag_func, last_modified_func)
+        conditional_view = condition(etag_func=etag_func, last_modified_func=last_modified_func)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.user.is_authenticated:
+                response = view(request, *args, **kwargs)
+                return _private(response)
+            return _public(conditional_view(request, *args, **kwargs))
+        return wrapper
+    return decorator
+
+
+def _async_public_page(view, etag_func, last_modified_func):
+    # condition() would call the validators, which query, on the event loop
+    def validators(request, *args, **kwargs):
+        return (
+            etag_func(request, *args, **kwargs) if etag_func else None,
+            last_modified_func(request, *args, **kwargs) if last_modified_func else None,
+        )
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await request.auser()
+        if user.is_authenticated:
+            response = await view(request, *args, **kwargs)
+            return _private(response)
+        etag, last_modified = await sync_to_async(validators)(request, *args, **kwargs)
+        conditional_view = condition(
+            etag_func=lambda *args, **kwargs: etag,
+            last_modified_func=lambda *args, **kwargs: last_modified,
+        )(view)
+        return _public(await conditional_view(request, *args, **kwargs))
+    return wrapper
+
+
+def _private(response):
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+def _public(response):
+    if response.cookies or response.status_code not in (200, 304):
+        return _private(response)
+    max_age = getattr(settings, 'PUBLIC_PAGE_MAX_AGE', DEFAULT_PUBLIC_PAGE_MAX_AGE)
+    patch_cache_control(response, public=True, max_age=max_age)
+    patch_vary_headers(response, ('Cookie',))
+    response.public_page = True
+    return response
+
+
+class PublicPageMiddleware:
+    """
+    Make a @public_page response private if it leaves with cookies
+    Place it above every middleware that sets cookies (ReplicaPinMiddleware,
+    SessionMiddleware, CsrfViewMiddleware, MessageMiddleware): the view
+    decorator runs before they add theirs.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.check(self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.check(await self.get_response(request))
+
+    def check(self, response):
+        if getattr(response, 'public_page', False) and response.cookies:
+            del response.headers['Cache-Control']
+            _private(response)
+        return response
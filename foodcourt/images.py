@@ -0,0 +1,214 @@
+# foodcourt/images.py
+
+"""
+Resized image variants for uploaded pictures
+
+Models list their image fields in IMAGE_VARIANTS:
+
+    IMAGE_VARIANTS = {'image': ('image_variants', ('thumb', 'card'))}
+
+i.e. field name -> (JSONField holding the variant paths, sizes to build).
+sync_variants(instance) builds every size at 1x and 2x (2x only when the
+original is big enough) in WebP and JPEG, saved next to the original as
+<name>_<size>[-2x].<ext>, and records them in the JSON field:
+
+    {'source': 'food_items/dosa.jpg',
+     'card': {'width': 400, 'height': 240,
+              'webp': {'1': 'food_items/dosa_card.webp', '2': ...},
+              'jpeg': {'1': 'food_items/dosa_card.jpg', '2': ...}}}
+
+plus 'status': pending while queued, then ready, or failed if Pillow could
+not read the upload.
+
+post_save receivers call schedule_variants(), which marks changed fields
+pending and queues a build_variants job for the run_jobs worker, so the
+upload request never waits on Pillow. variants_built is sent once a job's
+variants are stored. The {% picture %} tag in menu/templatetags/images.py
+turns ready variants into srcsets and otherwise serves the original.
+"""
+
+import logging
+import os
+from io import BytesIO
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.dispatch import Signal
+from PIL import Image, ImageOps
+from jobs.queue import enqueue
+
+logger = logging.getLogger(__name__)
+
+# width, height in CSS pixels; variants are cropped to fill
+SIZES = {
+    'thumb': (160, 160),
+    'card': (400, 240),
+    'banner': (1200, 300),
+}
+DENSITIES = (1, 2)
+FORMATS = {
+    # key: (Pillow format, file extension, MIME type)
+    'webp': ('WEBP', 'webp', 'image/webp'),
+    'jpeg': ('JPEG', 'jpg', 'image/jpeg'),
+}
+
+DEFAULT_QUALITY = 80
+
+PENDING = 'pending'
+READY = 'ready'
+FAILED = 'failed'
+
+# Sent with sender=model, instance, field once a job has stored variants
+variants_built = Signal()
+
+
+def variant_name(source_name, size, density, extension):
+    stem, _ = os.path.splitext(source_name)
+    suffix = size if density == 1 else f'{size}-{density}x'
+    return f'{stem}_{suffix}.{extension}'
+
+
+def _load(field_file):
+    field_file.open('rb')
+    try:
+        image = Image.open(field_file)
+        image.load()
+    finally:
+        field_file.close()
+    image = ImageOps.exif_transpose(image)
+    has_alpha = image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+    return image.convert('RGBA' if has_alpha else 'RGB')
+
+
+def _encode(image, pillow_format):
+    if pillow_format == 'JPEG' and image.mode == 'RGBA':
+        # JPEG has no alpha channel: flatten onto white
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    buffer = BytesIO()
+    quality = getattr(settings, 'IMAGE_VARIANT_QUALITY', DEFAULT_QUALITY)
+    image.save(buffer, pillow_format, quality=quality, optimize=pillow_format == 'JPEG')
+    return ContentFile(buffer.getvalue())
+
+
+def generate_variants(field_file, sizes):
+    """
+    Build and store the variants of field_file; return the JSON to record
+    """
+    storage = field_file.storage
+    image = _load(field_file)
+    variants = {'source': field_file.name}
+    for size in sizes:
+        width, height = SIZES[size]
+        entry = {'width': width, 'height': height, **{key: {} for key in FORMATS}}
+        for density in DENSITIES:
+            target = (width * density, height * density)
+            if density > 1 and (image.width < target[0] or image.height < target[1]):
+                break
+            resized = ImageOps.fit(image, target, Image.Resampling.LANCZOS)
+            for key, (pillow_format, extension, _) in FORMATS.items():
+                name = variant_name(field_file.name, size, density, extension)
+                entry[key][str(density)] = storage.save(name, _encode(resized, pillow_format))
+        variants[size] = entry
+    return variants
+
+
+def delete_variants(storage, variants):
+    for size in SIZES:
+        for key in FORMATS:
+            for name in variants.get(size, {}).get(key, {}).values():
+                storage.delete(name)
+
+
+def _build(field_file, sizes):
+    """
+    Variant JSON for field_file with its status: ready, or failed for an
+    upload Pillow cannot read
+    """
+    try:
+        variants = generate_variants(field_file, sizes)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        # Templates fall back to the original
+        logger.warning('Could not build variants for %s', field_file.name, exc_info=True)
+        return {'source': field_file.name, 'status': FAILED}
+    variants['status'] = READY
+    return variants
+
+
+def schedule_variants(instance):
+    """
+    Queue variant builds for image fields that changed (from post_save)
+    Marks their variants pending right away so pages show the original until
+    the worker is done; returns the names of the fields queued.
+    """
+    changed, queued = {}, []
+    for field_name, (variants_field, _) in type(instance).IMAGE_VARIANTS.items():
+        field_file = getattr(instance, field_name)
+        current = getattr(instance, variants_field) or {}
+        if current.get('source') == (field_file.name or None):
+            continue
+
+        delete_variants(field_file.storage, current)
+        variants = {'source': field_file.name, 'status': PENDING} if field_file else {}
+        setattr(instance, variants_field, variants)
+        changed[variants_field] = variants
+        if field_file:
+            queued.append(field_name)
+
+    if changed:
+        type(instance).objects.filter(pk=instance.pk).update(**changed)
+    for field_name in queued:
+        enqueue(build_variants, model=instance._meta.label, pk=instance.pk, field=field_name)
+    return queued
+
+
+def build_variants(model, pk, field):
+    """
+    Job: build the variants of one image field
+    Does nothing if the object is gone or its image was replaced meanwhile
+    (the replacement has its own job).
+    """
+    model = apps.get_model(model)
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return
+    variants_field, sizes = model.IMAGE_VARIANTS[field]
+    field_file = getattr(instance, field)
+    if not field_file or (getattr(instance, variants_field) or {}).get('source') != field_file.name:
+        return
+
+    variants = _build(field_file, sizes)
+    # Only land on the upload we built from
+    updated = model.objects.filter(pk=pk, **{f'{variants_field}__source': field_file.name}).update(
+        **{variants_field: variants}
+    )
+    if updated:
+        setattr(instance, variants_field, variants)
+        variants_built.send(sender=model, instance=instance, field=field)
+    else:
+        delete_variants(field_file.storage, variants)
+
+
+def sync_variants(instance, force=False):
+    """
+    Build out-of-date variants on the calling thread (backfills)
+    Saves changes with a queryset update (no signals); returns the names of
+    the fields that changed.
+    """
+    changed = {}
+    for field_name, (variants_field, sizes) in type(instance).IMAGE_VARIANTS.items():
+        field_file = getattr(instance, field_name)
+        current = getattr(instance, variants_field) or {}
+        up_to_date = current.get('source') == (field_file.name or None) and current.get('status') != PENDING
+        if up_to_date and not force:
+            continue
+
+        delete_variants(field_file.storage, current)
+        variants = _build(field_file, sizes) if field_file else {}
+        setattr(instance, variants_field, variants)
+        changed[variants_field] = variants
+
+    if changed:
+        type(instance).objects.filter(pk=instance.pk).update(**changed)
+    return list(changed)
@@ -0,0 +1,194 @@
+# foodcourt/pagination.py
+
+"""
+Keyset (cursor) pagination for newest-first listings
+
+Pages are addressed by the (created_at, id) of the row at their edge rather
+than by an offset, so every page is one indexed range scan of at most
+per_page + 1 rows no matter how deep the user goes. Cursors are opaque,
+URL-safe strings; an unreadable cursor simply yields the first page.
+"""
+
+import base64
+import binascii
+from datetime import datetime
+from django.db.models import Q
+
+NEXT = 'n'
+PREVIOUS = 'p'
+OFFSET = 'o'
+
+
+class Page:
+    """
+    One page of results plus the cursors of its neighbours
+    """
+
+    def __init__(self, items, next_cursor=None, previous_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def as_dict(self, serializer):
+        return {
+            'results': [serializer(obj) for obj in self.items],
+            'next': self.next_cursor,
+            'previous': self.previous_cursor,
+        }
+
+
+def encode_cursor(*parts):
+    raw = '|'.join(str(part) for part in parts)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Return the cursor's parts, or None if it cannot be read
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset newest first on (created_at, id)
+    """
+
+    def __init__(self, queryset, per_page=20):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def _parse(self, cursor):
+        parts = decode_cursor(cursor)
+        if not parts or len(parts) != 3 or parts[0] not in (NEXT, PREVIOUS):
+            return None
+        try:
+            return parts[0], datetime.fromisoformat(parts[1]), int(parts[2])
+        except ValueError:
+            return None
+
+    def page(self, cursor=None):
+        first, queryset, newer = self._plan(cursor)
+        if newer is not None:
+            page = self._backward(list(self._backward_rows(newer)))
+            if page is not None:
+                return page
+        return self._forward(list(self._forward_rows(queryset)), first)
+
+    async def apage(self, cursor=None):
+        """
+        page() for async views
+        """
+        first, queryset, newer = self._plan(cursor)
+        if newer is not None:
+            page = self._backward([row async for row in self._backward_rows(newer)])
+            if page is not None:
+                return page
+        return self._forward([row async for row in self._forward_rows(queryset)], first)
+
+    def _plan(self, cursor):
+        """
+        (first page?, queryset to walk forward, queryset to walk back or None)
+        """
+        parsed = self._parse(cursor)
+        if parsed is None:
+            return True, self.queryset, None
+
+        direction, created_at, pk = parsed
+        if direction == NEXT:
+            older = Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+            return False, self.queryset.filter(older), None
+        newer = Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk)
+        return True, self.queryset, self.queryset.filter(newer)
+
+    def _forward_rows(self, queryset):
+        return queryset.order_by('-created_at', '-pk')[:self.per_page + 1]
+
+    def _forward(self, rows, first):
+        items = rows[:self.per_page]
+        next_cursor = previous_cursor = None
+        if len(rows) > self.per_page:
+            next_cursor = encode_cursor(NEXT, items[-1].created_at.isoformat(), items[-1].pk)
+        if items and not first:
+            previous_cursor = encode_cursor(PREVIOUS, items[0].created_at.isoformat(), items[0].pk)
+        return Page(items, next_cursor, previous_cursor)
+
+    def _backward_rows(self, queryset):
+        return queryset.order_by('created_at', 'pk')[:self.per_page + 1]
+
+    def _backward(self, rows):
+        """
+        Flip rows walked towards newer ones back into newest-first order
+        Returns None once the walk reaches the start of the listing, so the
+        caller serves a full first page instead of a short one.
+        """
+        if len(rows) <= self.per_page:
+            return None
+        items = rows[:self.per_page][::-1]
+        return Page(
+            items,
+            next_cursor=encode_cursor(NEXT, items[-1].created_at.isoformat(), items[-1].pk),
+            previous_cursor=encode_cursor(PREVIOUS, items[0].created_at.isoformat(), items[0].pk),
+        )
+
+
+class RankedPaginator:
+    """
+    Paginate an already ranked, bounded queryset (e.g. search results)
+    Relevance order has no column to seek on, so the cursor is an offset;
+    the ranked set is capped upstream, which keeps deep pages cheap.
+    """
+
+    def __init__(self, queryset, per_page=20):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def page(self, cursor=None):
+        offset = self._offset(cursor)
+        return self._page(list(self.queryset[offset:offset + self.per_page + 1]), offset)
+
+    async def apage(self, cursor=None):
+        """
+        page() for async views
+        """
+        offset = self._offset(cursor)
+        return self._page([row async for row in self.queryset[offset:offset + self.per_page + 1]], offset)
+
+    def _offset(self, cursor):
+        parts = decode_cursor(cursor)
+        if parts and len(parts) == 2 and parts[0] == OFFSET and parts[1].isdigit():
+            return int(parts[1])
+        return 0
+
+    def _page(self, rows, offset):
+        items = rows[:self.per_page]
+        next_cursor = previous_cursor = None
+        if len(rows) > self.per_page:
+            next_cursor = encode_cursor(OFFSET, offset + self.per_page)
+        if offset > 0:
+            previous_cursor = encode_cursor(OFFSET, max(0, offset - self.per_page))
+        return Page(items, next_cursor, previous_cursor)
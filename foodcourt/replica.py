@@ -0,0 +1,173 @@
+# foodcourt/replica.py
+
+"""
+Catalog reads from a read replica
+
+When settings.REPLICA_DATABASE names a DATABASES alias (settings define
+one only if REPLICA_DB_PATH is set), that database is a copy of default
+that lags behind it. Views decorated with @replica_reads (the public browse,
+shop and food pages) read the REPLICA_APPS models from it. Everything
+else, including sessions, users and carts, reads from default, and every
+write goes to default.
+
+Read your own writes: ReplicaRouter notes every write made during a
+request. ReplicaPinMiddleware then sets a cookie that keeps the browser on
+default for REPLICA_PIN_SECONDS, which must be longer than the replica
+lags. A request that has written reads from default for the rest of the
+request too.
+
+Locally the replica is a second SQLite file that `manage.py sync_replica`
+refreshes, standing in for replication. Without a replica, or with an
+alias that names the same database as default, as a test mirror does,
+every read goes to default.
+
+Menu fragments are cached under versions that are bumped on the primary.
+A page rendered from the replica right after a change can therefore cache
+the old menu under the new version, until the next bump or
+MENU_CACHE_TIMEOUT. Keep the replica lag well below that.
+"""
+
+import contextvars
+from functools import wraps
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'primary_pin'
+DEFAULT_PIN_SECONDS = 10
+DEFAULT_REPLICA_APPS = ('menu', 'vendors')
+
+
+class _RequestState:
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.catalog = False
+        self.wrote = False
+
+
+_state = contextvars.ContextVar('replica_state', default=None)
+
+
+def replica_alias():
+    """
+    The replica's alias, or None when there is no separate replica
+    """
+    alias = getattr(settings, 'REPLICA_DATABASE', None)
+    if not alias or alias not in connections.settings:
+        return None
+    if connections.settings[alias]['NAME'] == connections.settings[DEFAULT_DB_ALIAS]['NAME']:
+        return None
+    return alias
+
+
+def replica_reads(view):
+    """
+    Let the view's catalog reads go to the replica
+    Put it outside @public_page so the validators read the replica too.
+    """
+    def enter():
+        state = _state.get()
+        token = None
+        if state is None:
+            state = _RequestState()
+            token = _state.set(state)
+        state.catalog = True
+        return state, token
+
+    def leave(state, token):
+        state.catalog = False
+        if token is not None:
+            _state.reset(token)
+
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            state, token = enter()
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                leave(state, token)
+    else:
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            state, token = enter()
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                leave(state, token)
+    return wrapper
+
+
+class ReplicaRouter:
+    """
+    Send the reads of @replica_reads views to the replica, everything else
+    to default
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.catalog or state.pinned or state.wrote:
+            return None
+        if model._meta.app_label not in getattr(settings, 'REPLICA_APPS', DEFAULT_REPLICA_APPS):
+            return None
+        return replica_alias()
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both hold the same rows
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # The replica is a copy of default, never migrated on its own
+        if db == getattr(settings, 'REPLICA_DATABASE', None):
+            return False
+        return None
+
+
+class ReplicaPinMiddleware:
+    """
+    Pin a browser to default for a while after it writes
+    Place it above SessionMiddleware so session saves count as writes.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = _RequestState(pinned=PIN_COOKIE in request.COOKIES)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.pin(state, response)
+
+    async def __acall__(self, request):
+        # Code run through sync_to_async sees the same state object
+        state = _RequestState(pinned=PIN_COOKIE in request.COOKIES)
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.pin(state, response)
+
+    def pin(self, state, response):
+        if state.wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=getattr(settings, 'REPLICA_PIN_SECONDS', DEFAULT_PIN_SECONDS),
+                httponly=True, samesite='Lax',
+            )
+        return response
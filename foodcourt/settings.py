@@ -26,6 +26,8 @@ INSTALLED_APPS = [
     'menu',
     'orders',
     'dashboard',
+    'jobs',
+    'perf',
     
     # Third party apps
     'crispy_forms',
@@ -33,7 +35,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'perf.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'perf.middleware.QueryBudgetMiddleware',
+    'foodcourt.http.PublicPageMiddleware',
+    'foodcourt.replica.ReplicaPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -55,6 +61,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'orders.context_processors.cart_summary',
             ],
         },
     },
@@ -63,10 +70,51 @@ TEMPLATES = [
 WSGI_APPLICATION = 'foodcourt.wsgi.application'
 
 # Database
+# SQLite tuned for concurrent requests (foodcourt.db): WAL, and write
+# transactions that queue for the lock (BEGIN IMMEDIATE + busy timeout)
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'timeout': 5,  # seconds to wait for the write lock
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                'PRAGMA mmap_size=134217728;'  # 128 MiB
+                'PRAGMA temp_store=MEMORY;'
+            ),
+        },
+        # A real file, so concurrency tests see SQLite's own locking
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+    },
+}
+
+# Read replica for catalog pages (foodcourt.replica), off unless
+# REPLICA_DB_PATH names one; locally a copy of db.sqlite3 refreshed by
+# `manage.py sync_replica`
+REPLICA_DB_PATH = os.environ.get('REPLICA_DB_PATH')
+if REPLICA_DB_PATH:
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': REPLICA_DB_PATH,
+        'OPTIONS': {
+            'timeout': 5,
+            'init_command': 'PRAGMA query_only=ON;PRAGMA mmap_size=134217728;',
+        },
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['foodcourt.replica.ReplicaRouter']
+
+# Cache
+# Local memory is per process; point this at Redis or Memcached in production
+# so menu fragments and their version tokens are shared by every worker.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'foodcourt',
     }
 }
 
@@ -114,4 +162,77 @@ CRISPY_TEMPLATE_PACK = "bootstrap4"
 # Login URLs
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard'
-LOGOUT_REDIRECT_URL = 'home'
\ No newline at end of file
+LOGOUT_REDIRECT_URL = 'home'
+
+# Menu
+MENU_SEARCH_RESULT_LIMIT = 200
+MENU_CACHE_TIMEOUT = 60 * 10  # seconds a rendered menu fragment may live
+
+# Orders
+ORDER_NUMBER_GENERATOR = 'orders.order_numbers.SnowflakeGenerator'
+# A distinct value (0-1023) per process pins worker ids explicitly (the
+# ORDER_NUMBER_WORKER_ID environment variable works too); left unset, each
+# process leases a free id under ORDER_NUMBER_LEASE_DIR (default: temp dir).
+ORDER_NUMBER_WORKER_ID = None
+ORDER_NUMBER_LEASE_DIR = None
+# Live order events for vendors (orders.events); the local broker only
+# reaches subscribers in the same process
+ORDER_EVENTS_BACKEND = 'orders.events.LocalBroker'
+ORDER_EVENTS_BUFFER_SIZE = 100  # recent events per shop kept for Last-Event-ID resume
+ORDER_EVENTS_HEARTBEAT = 15  # seconds between keep-alive comments
+# Where cart lines live between checkouts: 'orders.cart.DatabaseCartStore'
+# or 'orders.cart.SessionCartStore' (written to the Cart table at checkout,
+# logout and at most every CART_PERSIST_INTERVAL seconds)
+CART_STORE = 'orders.cart.DatabaseCartStore'
+CART_PERSIST_INTERVAL = 60 * 5
+CART_SUMMARY_TIMEOUT = 60 * 5  # seconds the cached navbar badge may live
+
+# Images
+IMAGE_VARIANT_QUALITY = 80  # WebP/JPEG quality of resized variants (foodcourt.images)
+
+# Background jobs (jobs app, run by `manage.py run_jobs`)
+JOBS_WORKER_CONCURRENCY = 4
+JOBS_POLL_INTERVAL = 1.0  # seconds between polls of an idle queue
+JOBS_MAX_ATTEMPTS = 3
+JOBS_RETRY_DELAY = 10  # seconds before the first retry, doubled per attempt
+JOBS_LOCK_TIMEOUT = 60 * 10  # running jobs older than this are assumed orphaned
+
+# Query budgets (perf.budget): views declare theirs with @query_budget;
+# views we don't own are budgeted here by view name
+QUERY_BUDGET_MODE = 'log'  # 'log' a warning, 'raise' QueryBudgetExceeded, or 'off'
+QUERY_BUDGETS = {
+    'admin:index': {'queries': 6},
+    'admin:accounts_user_changelist': {'queries': 8},
+    'admin:vendors_shop_changelist': {'queries': 8},
+    'admin:menu_category_changelist': {'queries': 8},
+    'admin:menu_fooditem_changelist': {'queries': 10},
+    'admin:orders_cart_changelist': {'queries': 8},
+    'admin:orders_order_changelist': {'queries': 10},
+    'admin:jobs_job_changelist': {'queries': 8},
+}
+
+# Request profiling (perf.profiling): requests carrying PROFILING_HEADER with
+# a token from /admin/perf/profiles/, plus a random PROFILING_SAMPLE_RATE
+# fraction (0-1) of all requests, are profiled into PROFILING_DIR
+PROFILING_DIR = BASE_DIR / 'profiles'
+PROFILING_HEADER = 'X-Profile'
+PROFILING_TOKEN_MAX_AGE = 60 * 60  # seconds a profiling token stays valid
+PROFILING_SAMPLE_RATE = 0
+PROFILING_STACK_INTERVAL = 0.001  # seconds between stack samples for flame graphs
+PROFILING_KEEP = 200  # newest profiles kept on disk
+
+# Public pages (foodcourt.http.public_page): seconds a browser or reverse
+# proxy may reuse an anonymous shop/menu page before revalidating it
+PUBLIC_PAGE_MAX_AGE = 60
+
+# Database locks (foodcourt.db.retry_when_locked): extra attempts for a write
+# transaction that timed out waiting for the lock, and the first pause
+DB_LOCK_RETRIES = 3
+DB_LOCK_BACKOFF = 0.05  # seconds, doubled per attempt
+
+# Read replica (foodcourt.replica): catalog apps whose reads may go to the
+# REPLICA_DATABASE alias (None without one), and how long a browser reads
+# from default after writing; keep it above the replica's lag
+REPLICA_DATABASE = 'replica' if REPLICA_DB_PATH else None
+REPLICA_APPS = ('menu', 'vendors')
+REPLICA_PIN_SECONDS = 10
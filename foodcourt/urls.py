@@ -6,12 +6,15 @@ from django.conf import settings
 from django.conf.urls.static import static
 
 urlpatterns = [
+    # Before admin/, whose catch-all would otherwise claim admin/perf/
+    path('admin/perf/', include('perf.urls')),
     path('admin/', admin.site.urls),
     path('', include('accounts.urls')),
     path('vendors/', include('vendors.urls')),
     path('menu/', include('menu.urls')),
     path('orders/', include('orders.urls')),
     path('dashboard/', include('dashboard.urls')),
+    path('api/v1/', include('menu.api_urls')),
 ]
 
 # Serve media files in development
@@ -0,0 +1,23 @@
+# jobs/admin.py
+
+from django.contrib import admin
+from django.utils import timezone
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """
+    Admin interface for background jobs
+    """
+    list_display = ['id', 'task', 'status', 'attempts', 'run_after', 'created_at', 'finished_at']
+    list_filter = ['status', 'task']
+    readonly_fields = ['task', 'kwargs', 'attempts', 'worker', 'last_error', 'created_at', 'started_at', 'finished_at']
+    actions = ['requeue']
+
+    @admin.action(description='Requeue selected jobs')
+    def requeue(self, request, queryset):
+        count = queryset.exclude(status=Job.RUNNING).update(
+            status=Job.QUEUED, attempts=0, run_after=timezone.now(), last_error=''
+        )
+        self.message_user(request, f'{count} job(s) requeued.')
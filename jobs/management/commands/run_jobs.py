@@ -0,0 +1,28 @@
+# jobs/management/commands/run_jobs.py
+
+import signal
+from django.core.management.base import BaseCommand
+from jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (image processing, ...) on a thread pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, help='Worker threads (default JOBS_WORKER_CONCURRENCY)')
+        parser.add_argument('--poll-interval', type=float, help='Seconds between polls of an idle queue')
+        parser.add_argument('--burst', action='store_true', help='Exit once no due job is left')
+
+    def handle(self, *args, **options):
+        worker = Worker(concurrency=options['concurrency'], poll_interval=options['poll_interval'])
+
+        def shutdown(signum, frame):
+            # Finish the jobs in hand, claim no more
+            worker.stop()
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+
+        self.stdout.write(f'Worker {worker.name} running {worker.concurrency} thread(s).')
+        worker.run(burst=options['burst'])
+        self.stdout.write(self.style.SUCCESS('Worker stopped.'))
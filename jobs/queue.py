@@ -0,0 +1,98 @@
+# jobs/queue.py
+
+"""
+Database-backed job queue
+
+enqueue(task, **kwargs) inserts a Job row in the caller's transaction, so a
+job only becomes visible to workers if the work that queued it commits.
+Tasks are plain functions taking JSON-serialisable keyword arguments,
+referenced by dotted path. They should be idempotent: a job whose worker
+dies is run again once JOBS_LOCK_TIMEOUT has passed.
+
+A failing job is retried with exponential backoff (JOBS_RETRY_DELAY,
+doubled per attempt) until it has run max_attempts times, then left FAILED
+with the traceback in last_error.
+"""
+
+import traceback
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import Job
+
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_RETRY_DELAY = 10
+DEFAULT_LOCK_TIMEOUT = 60 * 10
+
+
+def task_path(task):
+    return task if isinstance(task, str) else f'{task.__module__}.{task.__qualname__}'
+
+
+def enqueue(task, run_after=None, max_attempts=None, **kwargs):
+    """
+    Queue task(**kwargs) for the worker and return the Job
+    """
+    return Job.objects.create(
+        task=task_path(task),
+        kwargs=kwargs,
+        run_after=run_after or timezone.now(),
+        max_attempts=max_attempts or getattr(settings, 'JOBS_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS),
+    )
+
+
+def claim(worker, limit):
+    """
+    Mark up to limit due jobs as running for worker; return their ids
+    Each claim is a conditional UPDATE, so concurrent workers never both
+    win the same job.
+    """
+    now = timezone.now()
+    candidates = list(
+        Job.objects.filter(status=Job.QUEUED, run_after__lte=now)
+        .order_by('run_after', 'id')
+        .values_list('id', flat=True)[:limit]
+    )
+    claimed = []
+    for job_id in candidates:
+        won = Job.objects.filter(id=job_id, status=Job.QUEUED).update(
+            status=Job.RUNNING, worker=worker, started_at=now, attempts=F('attempts') + 1,
+        )
+        if won:
+            claimed.append(job_id)
+    return claimed
+
+
+def run(job_id):
+    """
+    Run a claimed job and record the outcome; returns the final status
+    """
+    job = Job.objects.get(id=job_id)
+    try:
+        import_string(job.task)(**job.kwargs)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            job.status = Job.FAILED
+            job.finished_at = timezone.now()
+        else:
+            delay = getattr(settings, 'JOBS_RETRY_DELAY', DEFAULT_RETRY_DELAY) * 2 ** (job.attempts - 1)
+            job.status = Job.QUEUED
+            job.run_after = timezone.now() + timedelta(seconds=delay)
+    else:
+        job.status = Job.DONE
+        job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'last_error', 'run_after', 'finished_at'])
+    return job.status
+
+
+def requeue_stale():
+    """
+    Put back jobs whose worker went away mid-run; returns how many
+    """
+    timeout = getattr(settings, 'JOBS_LOCK_TIMEOUT', DEFAULT_LOCK_TIMEOUT)
+    return Job.objects.filter(
+        status=Job.RUNNING, started_at__lt=timezone.now() - timedelta(seconds=timeout),
+    ).update(status=Job.QUEUED, worker='')
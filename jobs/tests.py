@@ -0,0 +1,62 @@
+from datetime import timedelta
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from .models import Job
+from .queue import claim, enqueue, run
+from .worker import Worker
+
+CALLS = []
+
+
+def record(value):
+    CALLS.append(value)
+
+
+def explode():
+    raise RuntimeError('boom')
+
+
+class QueueTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_enqueue_and_run_pending(self):
+        enqueue(record, value=1)
+        enqueue('jobs.tests.record', value=2)
+        enqueue(record, value=3, run_after=timezone.now() + timedelta(hours=1))
+        self.assertEqual(Worker().run_pending(), 2)
+        self.assertEqual(CALLS, [1, 2])
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 2)
+
+    def test_a_job_is_claimed_once(self):
+        job = enqueue(record, value=1)
+        self.assertEqual(claim('a', 5), [job.id])
+        self.assertEqual(claim('b', 5), [])
+
+    def test_failures_back_off_then_fail(self):
+        job = enqueue(explode, max_attempts=2)
+        claim('a', 1)
+        self.assertEqual(run(job.id), Job.QUEUED)
+        job.refresh_from_db()
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIn('RuntimeError: boom', job.last_error)
+
+        Job.objects.filter(id=job.id).update(run_after=timezone.now())
+        claim('a', 1)
+        self.assertEqual(run(job.id), Job.FAILED)
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 2)
+
+
+class ThreadPoolWorkerTests(TransactionTestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_burst_run_on_threads(self):
+        for value in range(10):
+            enqueue(record, value=value)
+        enqueue(explode, max_attempts=1)
+        Worker(concurrency=3, poll_interval=0.01).run(burst=True)
+        self.assertCountEqual(CALLS, range(10))
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 10)
+        self.assertEqual(Job.objects.filter(status=Job.FAILED).count(), 1)
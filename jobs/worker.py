@@ -0,0 +1,76 @@
+# jobs/worker.py
+
+"""
+Job worker
+
+Worker.run() polls the queue and runs jobs on a thread pool; each thread
+has its own database connection. Worker.run_pending() runs due jobs one by
+one on the calling thread, which is what tests use.
+"""
+
+import os
+import socket
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from django.conf import settings
+from django.db import close_old_connections, connection
+from . import queue
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_POLL_INTERVAL = 1.0
+
+
+class Worker:
+    def __init__(self, concurrency=None, poll_interval=None):
+        self.concurrency = concurrency or getattr(settings, 'JOBS_WORKER_CONCURRENCY', DEFAULT_CONCURRENCY)
+        self.poll_interval = poll_interval or getattr(settings, 'JOBS_POLL_INTERVAL', DEFAULT_POLL_INTERVAL)
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self.stop_event = threading.Event()
+
+    def run_pending(self):
+        """
+        Run every due job on this thread until none is left; returns how many ran
+        """
+        ran = 0
+        while True:
+            claimed = queue.claim(self.name, 1)
+            if not claimed:
+                return ran
+            queue.run(claimed[0])
+            ran += 1
+
+    def _run_in_thread(self, job_id):
+        close_old_connections()
+        try:
+            return queue.run(job_id)
+        finally:
+            # Pool threads outlive jobs; don't leave their connections open
+            connection.close()
+
+    def run(self, burst=False):
+        """
+        Poll and run jobs until stop() is called, or, with burst, until the
+        queue has no due job left
+        """
+        queue.requeue_stale()
+        running = set()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='jobs') as pool:
+            while not self.stop_event.is_set():
+                free = self.concurrency - len(running)
+                claimed = queue.claim(self.name, free) if free else []
+                running.update(pool.submit(self._run_in_thread, job_id) for job_id in claimed)
+
+                if not running:
+                    if burst:
+                        break
+                    self.stop_event.wait(self.poll_interval)
+                    continue
+                done, running = wait(running, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    # queue.run() records task errors itself; anything raised
+                    # here is a bookkeeping failure worth surfacing
+                    future.result()
+            wait(running)
+
+    def stop(self):
+        self.stop_event.set()
@@ -2,7 +2,10 @@
 
 from django.contrib import admin
 from django.utils.html import format_html
+from django.db import transaction
+from django.db.models import Count
 from .models import Category, FoodItem
+from dashboard import stats
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -14,9 +17,13 @@ class CategoryAdmin(admin.ModelAdmin):
     search_fields = ['name', 'description']
     list_editable = ['is_active']
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(food_count=Count('food_items'))
+    
     def food_count(self, obj):
-        return obj.food_items.count()
+        return obj.food_count
     food_count.short_description = 'Total Items'
+    food_count.admin_order_field = 'food_count'
 
 
 @admin.register(FoodItem)
@@ -28,6 +35,7 @@ class FoodItemAdmin(admin.ModelAdmin):
     list_filter = ['is_available', 'is_vegetarian', 'is_vegan', 'category', 'created_at']
     search_fields = ['name', 'shop__shop_name', 'description']
     list_editable = ['is_available']
+    list_select_related = ['shop__vendor', 'category']
     readonly_fields = ['created_at', 'updated_at']
     
     fieldsets = (
@@ -56,6 +64,30 @@ class FoodItemAdmin(admin.ModelAdmin):
         )
     availability_badge.short_description = 'Status'
     
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        
+        # Covers list_editable toggles of is_available as well as the change form
+        if change:
+            was_available = form.initial.get('is_available', obj.is_available)
+            old_shop_id = form.initial.get('shop', obj.shop_id)
+            if old_shop_id != obj.shop_id:
+                stats.record_food_item_moved(obj, old_shop_id, was_available)
+            else:
+                stats.record_food_item_changed(obj, was_available)
+        else:
+            stats.record_food_item_added(obj)
+    
+    def delete_model(self, request, obj):
+        stats.record_food_item_removed(obj)
+        super().delete_model(request, obj)
+    
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            for food_item in queryset:
+                stats.record_food_item_removed(food_item)
+            super().delete_queryset(request, queryset)
+    
     def dietary_info(self, obj):
         badges = []
         if obj.is_vegetarian:
@@ -0,0 +1,104 @@
+# menu/api.py
+
+"""
+Read-only JSON menu API (v1), for kiosks and mobile clients that poll
+
+    shops/                 approved, active shops
+    categories/            active categories
+    shops/<id>/items/      a shop's available items
+
+Every response carries a strong ETag, and a request whose If-None-Match
+still matches gets a 304 before any list is built:
+
+    shops/                 latest Shop.updated_at and the number of shops
+    categories/            the global menu version (menu.cache)
+    shops/<id>/items/      the global and shop menu versions, so the check
+                           reads the cache only
+
+Item bodies are cached under the same versions as the HTML fragments. Keys
+are part of the public contract (menu.serializers): add new ones, never
+rename; anything breaking gets a new API_VERSION.
+"""
+
+import json
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_safe
+from vendors.models import Shop
+from perf.budget import query_budget
+from .models import Category, FoodItem
+from .serializers import serialize_api_category, serialize_api_item, serialize_api_shop
+from . import cache as menu_cache
+from . import conditional
+
+API_VERSION = 'v1'
+
+ITEM_FIELDS = (
+    'id', 'name', 'price', 'category_id', 'image',
+    'is_vegetarian', 'is_vegan', 'preparation_time',
+)
+
+
+def _etag(*parts):
+    return menu_cache.variant_key(API_VERSION, *parts)
+
+
+def _json(data):
+    return json.dumps(data, separators=(',', ':'))
+
+
+def _response(body):
+    return HttpResponse(body, content_type='application/json')
+
+
+# ============= ETAGS =============
+
+def shops_etag(request):
+    return _etag(conditional.shops_etag(request))
+
+
+def categories_etag(request):
+    return _etag(menu_cache.get_global_version())
+
+
+def shop_items_etag(request, shop_id):
+    return _etag(*menu_cache.get_versions(shop_id))
+
+
+# ============= VIEWS =============
+# Clients may keep a response but must revalidate it before each use
+
+@require_safe
+@cache_control(public=True, no_cache=True)
+@condition(etag_func=shops_etag)
+@query_budget(queries=2)
+def shops(request):
+    shops = Shop.objects.active().only('id', 'shop_name', 'shop_logo').order_by('shop_name')
+    return _response(_json({'shops': [serialize_api_shop(shop) for shop in shops]}))
+
+
+@require_safe
+@cache_control(public=True, no_cache=True)
+@condition(etag_func=categories_etag)
+@query_budget(queries=1)
+def categories(request):
+    categories = Category.objects.filter(is_active=True)
+    return _response(_json({'categories': [serialize_api_category(category) for category in categories]}))
+
+
+@require_safe
+@cache_control(public=True, no_cache=True)
+@condition(etag_func=shop_items_etag)
+@query_budget(queries=2)
+def shop_items(request, shop_id):
+    shop = get_object_or_404(Shop.objects.active().only('id', 'shop_name'), id=shop_id)
+
+    def render_items():
+        items = FoodItem.objects.available().filter(shop=shop).only(*ITEM_FIELDS).order_by('name', 'id')
+        return _json({
+            'shop': {'id': shop.id, 'name': shop.shop_name},
+            'items': [serialize_api_item(item) for item in items],
+        })
+
+    return _response(menu_cache.get_fragment(shop.id, 'api_items', API_VERSION, render_items))
@@ -0,0 +1,10 @@
+# menu/api_urls.py
+
+from django.urls import path
+from . import api
+
+urlpatterns = [
+    path('shops/', api.shops, name='api_shops'),
+    path('categories/', api.categories, name='api_categories'),
+    path('shops/<int:shop_id>/items/', api.shop_items, name='api_shop_items'),
+]
@@ -0,0 +1,180 @@
+# menu/cache.py
+
+"""
+Rendered menu fragment cache
+
+Each shop has a menu version token, and there is one global token for
+changes that touch every menu (categories). Fragment keys embed both
+tokens, so bumping a token retires every fragment built from the old menu
+without having to find and delete them. Tokens are fresh random values
+rather than counters: if the cache evicts a token, the replacement can never
+collide with fragments rendered under the old one. The a-prefixed functions
+are the same for async views, on the cache's async API.
+
+menu.signals bumps the tokens from FoodItem, Category and Shop saves and
+deletes once the surrounding transaction commits. Code that changes menu
+rows with QuerySet.update() must call bump_shop()/bump_all() itself.
+"""
+
+import hashlib
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+GLOBAL_VERSION_KEY = 'menu:version:global'
+SHOP_VERSION_KEY = 'menu:version:shop:%s'
+FRAGMENT_KEY = 'menu:fragment:%s:%s:%s:%s:%s'
+HITS_KEY = 'menu:stats:hits'
+MISSES_KEY = 'menu:stats:misses'
+
+DEFAULT_TIMEOUT = 60 * 10
+
+
+def _new_token():
+    return uuid.uuid4().hex[:12]
+
+
+# ============= VERSIONS =============
+
+def get_versions(shop_id):
+    """
+    Return (global token, shop token), minting any that are missing
+    """
+    shop_key = SHOP_VERSION_KEY % shop_id
+    found = cache.get_many([GLOBAL_VERSION_KEY, shop_key])
+    missing = {}
+    if GLOBAL_VERSION_KEY not in found:
+        missing[GLOBAL_VERSION_KEY] = _new_token()
+    if shop_key not in found:
+        missing[shop_key] = _new_token()
+    for key, token in missing.items():
+        # add() keeps a token another process minted in the meantime
+        if not cache.add(key, token, timeout=None):
+            missing[key] = cache.get(key, token)
+    found.update(missing)
+    return found[GLOBAL_VERSION_KEY], found[shop_key]
+
+
+async def aget_versions(shop_id):
+    """
+    get_versions() for async views
+    """
+    shop_key = SHOP_VERSION_KEY % shop_id
+    found = await cache.aget_many([GLOBAL_VERSION_KEY, shop_key])
+    for key in (GLOBAL_VERSION_KEY, shop_key):
+        if key not in found:
+            token = _new_token()
+            if not await cache.aadd(key, token, timeout=None):
+                token = await cache.aget(key, token)
+            found[key] = token
+    return found[GLOBAL_VERSION_KEY], found[shop_key]
+
+
+def get_global_version():
+    """
+    The global token alone, for data that belongs to no shop (categories)
+    """
+    token = cache.get(GLOBAL_VERSION_KEY)
+    if token is None:
+        token = _new_token()
+        if not cache.add(GLOBAL_VERSION_KEY, token, timeout=None):
+            token = cache.get(GLOBAL_VERSION_KEY, token)
+    return token
+
+
+def bump_shop(shop_id):
+    """
+    Retire every cached fragment of one shop's menu (after commit)
+    """
+    transaction.on_commit(lambda: cache.set(SHOP_VERSION_KEY % shop_id, _new_token(), timeout=None))
+
+
+def bump_all():
+    """
+    Retire every cached menu fragment (after commit)
+    """
+    transaction.on_commit(lambda: cache.set(GLOBAL_VERSION_KEY, _new_token(), timeout=None))
+
+
+# ============= FRAGMENTS =============
+
+def variant_key(*parts):
+    """
+    Compact key for everything besides the shop that shapes a fragment
+    (template, page cursor, filters, ...)
+    """
+    raw = '\x1f'.join(str(part) for part in parts)
+    return hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+
+
+def get_fragment(shop_id, name, variant, render):
+    """
+    Return the cached fragment, or call render() and cache its result
+    render() runs only on a miss, so a hit touches no database tables.
+    """
+    global_version, shop_version = get_versions(shop_id)
+    key = FRAGMENT_KEY % (name, shop_id, global_version, shop_version, variant)
+    fragment = cache.get(key)
+    if fragment is not None:
+        _count(HITS_KEY)
+        return fragment
+
+    _count(MISSES_KEY)
+    fragment = render()
+    timeout = getattr(settings, 'MENU_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+    cache.set(key, fragment, timeout=timeout)
+    return fragment
+
+
+async def aget_fragment(shop_id, name, variant, render):
+    """
+    get_fragment() for async views; render is a coroutine function
+    """
+    global_version, shop_version = await aget_versions(shop_id)
+    key = FRAGMENT_KEY % (name, shop_id, global_version, shop_version, variant)
+    fragment = await cache.aget(key)
+    if fragment is not None:
+        await _acount(HITS_KEY)
+        return fragment
+
+    await _acount(MISSES_KEY)
+    fragment = await render()
+    timeout = getattr(settings, 'MENU_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+    await cache.aset(key, fragment, timeout=timeout)
+    return fragment
+
+
+# ============= STATS =============
+
+def _count(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        # First event since the counter was reset or evicted
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+async def _acount(key):
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        if not await cache.aadd(key, 1, timeout=None):
+            await cache.aincr(key)
+
+
+def get_stats():
+    counts = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits = counts.get(HITS_KEY, 0)
+    misses = counts.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / total if total else 0.0,
+    }
+
+
+def reset_stats():
+    cache.delete_many([HITS_KEY, MISSES_KEY])
@@ -0,0 +1,77 @@
+# menu/conditional.py
+
+"""
+Validators for the public shop and menu pages (foodcourt.http.public_page)
+
+Last-Modified is the latest updated_at of the shop and its items; item
+deletes touch the shop (menu.signals), so it never moves backwards. The
+ETag is built from the menu cache versions, which also move for changes
+that leave updated_at alone: categories, image variants and QuerySet
+updates that bump the versions themselves.
+
+Each function takes the view's arguments, as condition() passes them.
+"""
+
+from django.db.models import Count, Max
+from vendors.models import Shop
+from .models import FoodItem
+from . import cache as menu_cache
+
+
+# ============= SHOP LIST =============
+
+def _shops_state(request):
+    # One read of the shop_updated index for both validators
+    if not hasattr(request, '_menu_shops_state'):
+        request._menu_shops_state = Shop.objects.order_by().aggregate(updated_at=Max('updated_at'), count=Count('id'))
+    return request._menu_shops_state
+
+
+def shops_last_modified(request):
+    return _shops_state(request)['updated_at']
+
+
+def shops_etag(request):
+    # Deleting a shop lowers the count even if the latest updated_at stays
+    state = _shops_state(request)
+    return menu_cache.variant_key(state['updated_at'], state['count'])
+
+
+# ============= ONE SHOP'S MENU =============
+
+def shop_last_modified(request, shop_id):
+    row = (
+        Shop.objects.filter(id=shop_id)
+        .values('id')
+        .annotate(menu_updated_at=Max('food_items__updated_at'))
+        .values_list('updated_at', 'menu_updated_at')
+        .first()
+    )
+    if row is None:
+        return None
+    return max(filter(None, row))
+
+
+def shop_etag(request, shop_id):
+    # Validators are compared per URL, so the versions alone will do
+    return menu_cache.variant_key(*menu_cache.get_versions(shop_id))
+
+
+# ============= FOOD ITEM =============
+# The page shows more of the shop's menu, so it changes with the shop's
+
+def _item_shop_id(request, food_id):
+    # Looked up once per request for both validators
+    if not hasattr(request, '_menu_item_shop_id'):
+        request._menu_item_shop_id = FoodItem.objects.filter(id=food_id).values_list('shop_id', flat=True).first()
+    return request._menu_item_shop_id
+
+
+def food_item_last_modified(request, food_id):
+    shop_id = _item_shop_id(request, food_id)
+    return shop_last_modified(request, shop_id) if shop_id else None
+
+
+def food_item_etag(request, food_id):
+    shop_id = _item_shop_id(request, food_id)
+    return shop_etag(request, shop_id) if shop_id else None
@@ -11,7 +11,8 @@ class FoodItemForm(forms.ModelForm):
     class Meta:
         model = FoodItem
         fields = ['category', 'name', 'description', 'price', 'image', 
-                  'is_available', 'is_vegetarian', 'is_vegan', 'preparation_time']
+                  'is_available', 'is_vegetarian', 'is_vegan', 'preparation_time',
+                  'stock', 'daily_stock']
         
         widgets = {
             'category': forms.Select(attrs={
@@ -38,6 +39,14 @@ class FoodItemForm(forms.ModelForm):
                 'class': 'form-control',
                 'placeholder': 'Minutes'
             }),
+            'stock': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'placeholder': 'Unlimited'
+            }),
+            'daily_stock': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'placeholder': 'No daily reset'
+            }),
             'is_available': forms.CheckboxInput(attrs={
                 'class': 'form-check-input'
             }),
@@ -58,4 +67,13 @@ class FoodItemForm(forms.ModelForm):
             'is_vegetarian': 'Vegetarian',
             'is_vegan': 'Vegan',
             'preparation_time': 'Preparation Time (minutes)',
-        }
\ No newline at end of file
+            'stock': 'Portions in Stock',
+            'daily_stock': 'Daily Stock',
+        }
+
+    def clean(self):
+        cleaned_data = super().clean()
+        # Nothing left to sell; checkout would refuse it anyway
+        if cleaned_data.get('stock') == 0:
+            cleaned_data['is_available'] = False
+        return cleaned_data
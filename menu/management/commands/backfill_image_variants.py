@@ -0,0 +1,33 @@
+# menu/management/commands/backfill_image_variants.py
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from foodcourt import images
+from menu.models import FoodItem
+from menu import cache as menu_cache
+from vendors.models import Shop
+
+
+class Command(BaseCommand):
+    help = 'Build missing resized variants for food item and shop images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Rebuild every variant, e.g. after changing the sizes')
+
+    def handle(self, *args, **options):
+        updated = 0
+        for model in (FoodItem, Shop):
+            has_image = Q()
+            for field_name in model.IMAGE_VARIANTS:
+                has_image |= ~Q(**{field_name: ''}) & Q(**{f'{field_name}__isnull': False})
+            for instance in model.objects.filter(has_image).order_by('pk').iterator():
+                if images.sync_variants(instance, force=options['force']):
+                    updated += 1
+                    self.stdout.write(f'{model._meta.verbose_name} {instance.pk}: done')
+
+        if updated:
+            # Variant fields are written with update(), which sends no
+            # signals; retire fragments rendered with the original images
+            menu_cache.bump_all()
+        self.stdout.write(self.style.SUCCESS(f'Updated variants for {updated} object(s).'))
@@ -0,0 +1,102 @@
+# menu/management/commands/benchmark_search.py
+
+import random
+import statistics
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from accounts.models import User
+from vendors.models import Shop
+from menu.models import FoodItem
+from menu import search
+
+WORDS = [
+    'masala', 'paneer', 'chicken', 'veg', 'biryani', 'dosa', 'idli', 'vada', 'burger',
+    'pizza', 'sandwich', 'noodles', 'fried', 'rice', 'curry', 'tikka', 'roll', 'wrap',
+    'spicy', 'cheese', 'butter', 'garlic', 'tandoori', 'chilli', 'mango', 'lassi',
+    'coffee', 'tea', 'cold', 'shake', 'chocolate', 'samosa', 'pav', 'bhaji', 'momos',
+]
+
+DEFAULT_QUERIES = ['dosa', 'paneer tikka', 'chi', 'spicy chicken roll', 'mango lassi', 'zzz']
+
+
+class Command(BaseCommand):
+    help = 'Compare FTS5 search against the icontains path used by browse_menu'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Add this many synthetic items for the run (rolled back afterwards)')
+        parser.add_argument('--runs', type=int, default=50, help='Timed runs per query and path')
+        parser.add_argument('--query', action='append', dest='queries',
+                            help='Query to benchmark (repeatable)')
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            raise CommandError('FTS5 is not available on this database backend.')
+
+        queries = options['queries'] or DEFAULT_QUERIES
+        with transaction.atomic():
+            if options['seed']:
+                self.seed(options['seed'])
+            self.stdout.write(f"{FoodItem.objects.count()} food items, {options['runs']} runs per query\n")
+            self.stdout.write(f"{'query':<22}{'path':<11}{'rows':>6}{'p50 ms':>10}{'p95 ms':>10}")
+            for query in queries:
+                for path in ('fts5', 'icontains'):
+                    rows, timings = self.measure(path, query, options['runs'])
+                    self.stdout.write(
+                        f"{query:<22}{path:<11}{rows:>6}"
+                        f"{statistics.median(timings):>10.2f}{self.p95(timings):>10.2f}"
+                    )
+            # Never keep the synthetic dataset
+            transaction.set_rollback(True)
+
+    def measure(self, path, query, runs):
+        base = FoodItem.objects.filter(
+            shop__status='approved',
+            shop__is_active=True,
+            is_available=True,
+        ).select_related('shop', 'category')
+        timings = []
+        rows = 0
+        for _ in range(runs):
+            start = time.perf_counter()
+            if path == 'fts5':
+                rows = len(search.filter_queryset(base, query))
+            else:
+                rows = len(base.filter(search.icontains_filter(query)))
+            timings.append((time.perf_counter() - start) * 1000)
+        return rows, timings
+
+    def p95(self, timings):
+        ordered = sorted(timings)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def seed(self, count):
+        rng = random.Random(42)
+        shops = []
+        for index in range(max(1, count // 200)):
+            vendor = User.objects.create(username=f'bench_vendor_{index}', role='vendor')
+            shops.append(Shop.objects.create(
+                vendor=vendor,
+                shop_name=f'{rng.choice(WORDS).title()} {rng.choice(WORDS).title()} Kitchen',
+                description='Benchmark shop',
+                phone='0000000000',
+                email=f'bench{index}@example.com',
+                address='Benchmark',
+                status='approved',
+                is_active=True,
+            ))
+        FoodItem.objects.bulk_create(
+            [
+                FoodItem(
+                    shop=rng.choice(shops),
+                    name=' '.join(rng.sample(WORDS, 3)).title(),
+                    description=' '.join(rng.choices(WORDS, k=25)),
+                    price=rng.randint(20, 300),
+                )
+                for _ in range(count)
+            ],
+            batch_size=500,
+        )
+        # bulk_create skips the post_save sync
+        search.rebuild()
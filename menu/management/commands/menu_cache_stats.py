@@ -0,0 +1,20 @@
+# menu/management/commands/menu_cache_stats.py
+
+from django.core.management.base import BaseCommand
+from menu import cache as menu_cache
+
+
+class Command(BaseCommand):
+    help = 'Show hit/miss counters of the rendered menu fragment cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after printing them')
+
+    def handle(self, *args, **options):
+        stats = menu_cache.get_stats()
+        self.stdout.write(
+            f"hits: {stats['hits']}  misses: {stats['misses']}  hit rate: {stats['hit_rate']:.1%}"
+        )
+        if options['reset']:
+            menu_cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS('Counters reset.'))
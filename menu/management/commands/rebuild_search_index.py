@@ -0,0 +1,20 @@
+# menu/management/commands/rebuild_search_index.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from menu import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for food items'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = search.rebuild()
+
+        if count is None:
+            self.stdout.write(self.style.WARNING(
+                'Full-text search needs SQLite with FTS5; browse_menu uses icontains filtering on this backend.'
+            ))
+            return
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} food item(s).'))
@@ -0,0 +1,12 @@
+# menu/management/commands/reset_daily_stock.py
+
+from django.core.management.base import BaseCommand
+from menu import stock
+
+
+class Command(BaseCommand):
+    help = 'Restock every food item that has a daily stock (run each morning, e.g. from cron)'
+
+    def handle(self, *args, **options):
+        restocked = stock.reset_daily()
+        self.stdout.write(self.style.SUCCESS(f'Restocked {restocked} food items.'))
@@ -0,0 +1,42 @@
+# menu/management/commands/sync_replica.py
+
+import sqlite3
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from foodcourt.replica import replica_alias
+
+
+class Command(BaseCommand):
+    help = 'Copy the SQLite database to the read replica (a local stand-in for replication)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=float, default=0,
+                            help='Keep copying, pausing this many seconds between copies')
+
+    def handle(self, *args, **options):
+        alias = replica_alias()
+        if alias is None:
+            raise CommandError('No separate replica is configured (settings.REPLICA_DATABASE).')
+        primary, replica = connections.settings[DEFAULT_DB_ALIAS], connections.settings[alias]
+        if not (primary['ENGINE'].endswith('sqlite3') and replica['ENGINE'].endswith('sqlite3')):
+            raise CommandError('Only SQLite files are copied; use the database server\'s own replication.')
+
+        while True:
+            start = time.perf_counter()
+            pages = self.copy(primary['NAME'], replica['NAME'])
+            self.stdout.write(f"Copied {pages} pages to {replica['NAME']} in {(time.perf_counter() - start) * 1000:.0f} ms")
+            if not options['every']:
+                break
+            time.sleep(options['every'])
+
+    def copy(self, source_name, target_name):
+        # The backup API copies a consistent snapshot while the site keeps writing
+        source = sqlite3.connect(source_name)
+        target = sqlite3.connect(target_name, timeout=5)
+        try:
+            source.backup(target)
+            return source.execute('PRAGMA page_count').fetchone()[0]
+        finally:
+            target.close()
+            source.close()
@@ -0,0 +1,25 @@
+# Full-text search table for menu.search (SQLite with FTS5 only)
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from menu import search
+    search.create_index(schema_editor)
+
+
+def drop_search_index(apps, schema_editor):
+    from menu import search
+    search.drop_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0001_initial'),
+        ('vendors', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
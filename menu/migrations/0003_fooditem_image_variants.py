@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-18 05:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0002_fooditem_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fooditem',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
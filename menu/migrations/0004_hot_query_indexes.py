@@ -0,0 +1,22 @@
+# Generated by Django 5.2.9 on 2026-10-18 05:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0003_fooditem_image_variants'),
+        ('vendors', '0003_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fooditem',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['shop', 'created_at'], name='fooditem_shop_available'),
+        ),
+        migrations.AddIndex(
+            model_name='fooditem',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['created_at'], name='fooditem_available_created'),
+        ),
+    ]
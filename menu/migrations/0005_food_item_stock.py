@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-18 05:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0004_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fooditem',
+            name='daily_stock',
+            field=models.PositiveIntegerField(blank=True, help_text='Portions to restock to every morning; leave empty to not reset', null=True),
+        ),
+        migrations.AddField(
+            model_name='fooditem',
+            name='stock',
+            field=models.PositiveIntegerField(blank=True, help_text='Portions left; leave empty for unlimited', null=True),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.9 on 2026-10-18 06:01
+
+from django.db import migrations, models
+
+
+def mark_sold_out(apps, schema_editor):
+    # Until now every switched-off item at zero stock was treated as sold out
+    FoodItem = apps.get_model('menu', 'FoodItem')
+    FoodItem.objects.filter(stock=0, is_available=False).update(sold_out=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0005_food_item_stock'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fooditem',
+            name='sold_out',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(mark_sold_out, migrations.RunPython.noop),
+    ]
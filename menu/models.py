@@ -1,7 +1,8 @@
 # menu/models.py
 
 from django.db import models
-from vendors.models import Shop
+from django.db.models import Q
+from vendors.models import DETAIL_FIELDS as SHOP_DETAIL_FIELDS, Shop
 
 class Category(models.Model):
     """
@@ -22,10 +23,45 @@ class Category(models.Model):
         return self.name
 
 
+class FoodItemQuerySet(models.QuerySet):
+    """
+    Shared item filters and the joins list views need
+    """
+
+    def available(self):
+        return self.filter(is_available=True)
+
+    def from_active_shops(self):
+        return self.filter(shop__status='approved', shop__is_active=True)
+
+    def browsable(self):
+        """
+        Items students can order: available, from an approved, active shop
+        """
+        return self.available().from_active_shops()
+
+    def for_listing(self):
+        """
+        Join the shop and category cards show, without the shop's long text
+        """
+        return self.select_related('shop', 'category').defer(
+            *(f'shop__{field}' for field in SHOP_DETAIL_FIELDS)
+        )
+
+    def summaries(self):
+        """
+        for_listing() without the item description: carts, JSON, order lines
+        """
+        return self.for_listing().defer('description')
+
+
 class FoodItem(models.Model):
     """
     Food Items that vendors can add to their menu
     """
+    # Resized copies built by foodcourt.images
+    IMAGE_VARIANTS = {'image': ('image_variants', ('thumb', 'card'))}
+
     shop = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name='food_items')
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, related_name='food_items')
     
@@ -34,12 +70,21 @@ class FoodItem(models.Model):
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
     image = models.ImageField(upload_to='food_items/', blank=True, null=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     
     # Availability
     is_available = models.BooleanField(default=True)
     is_vegetarian = models.BooleanField(default=False)
     is_vegan = models.BooleanField(default=False)
     
+    # Stock (menu.stock): None means unlimited
+    stock = models.PositiveIntegerField(blank=True, null=True, help_text="Portions left; leave empty for unlimited")
+    daily_stock = models.PositiveIntegerField(
+        blank=True, null=True, help_text="Portions to restock to every morning; leave empty to not reset"
+    )
+    # Switched off by menu.stock on selling out, so restocking switches it back on
+    sold_out = models.BooleanField(default=False, editable=False)
+    
     # Additional Info
     preparation_time = models.IntegerField(help_text="Time in minutes", blank=True, null=True)
     
@@ -47,10 +92,18 @@ class FoodItem(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = FoodItemQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Food Item'
         verbose_name_plural = 'Food Items'
         ordering = ['-created_at']
+        # Partial indexes: Django filters booleans as a bare `WHERE is_available`,
+        # which SQLite matches against an index's WHERE but not its columns
+        indexes = [
+            models.Index(fields=['shop', 'created_at'], condition=Q(is_available=True), name='fooditem_shop_available'),
+            models.Index(fields=['created_at'], condition=Q(is_available=True), name='fooditem_available_created'),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.shop.shop_name}"
@@ -0,0 +1,197 @@
+# menu/search.py
+
+"""
+Full-text search over food items
+
+On SQLite the searchable text of every food item (its name, description and
+shop name) is mirrored into an FTS5 virtual table keyed by the item's id.
+menu.signals keeps it in sync with FoodItem and Shop writes, and
+search_item_ids() returns matching ids best match first. On any other
+backend, or an SQLite build without FTS5, search_item_ids() returns None
+and callers fall back to icontains filtering.
+"""
+
+import re
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'menu_fooditem_fts'
+
+# Ranked ids are fed back into an IN (...) clause, so keep the list bounded
+DEFAULT_RESULT_LIMIT = 200
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+_fts5_available = {}
+
+
+def is_supported(using=connection):
+    """
+    True when the connection is SQLite compiled with FTS5
+    """
+    if using.vendor != 'sqlite':
+        return False
+    if using.alias not in _fts5_available:
+        with using.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            _fts5_available[using.alias] = bool(cursor.fetchone()[0])
+    return _fts5_available[using.alias]
+
+
+# ============= SCHEMA =============
+
+CREATE_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "name, description, shop_name, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+
+FILL_SQL = (
+    f"INSERT INTO {FTS_TABLE} (rowid, name, description, shop_name) "
+    "SELECT f.id, f.name, f.description, s.shop_name "
+    "FROM menu_fooditem f INNER JOIN vendors_shop s ON s.id = f.shop_id"
+)
+
+
+def create_index(schema_editor):
+    """
+    Create and fill the FTS table (used by the migration)
+    """
+    if not is_supported(schema_editor.connection):
+        return
+    schema_editor.execute(CREATE_SQL)
+    schema_editor.execute(FILL_SQL)
+
+
+def drop_index(schema_editor):
+    if not is_supported(schema_editor.connection):
+        return
+    schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def rebuild():
+    """
+    Refill the FTS table from menu_fooditem and return the indexed row count
+    Returns None when full-text search is unavailable.
+    """
+    if not is_supported():
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(CREATE_SQL)
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(FILL_SQL)
+        cursor.execute(f"SELECT COUNT(*) FROM {FTS_TABLE}")
+        return cursor.fetchone()[0]
+
+
+# ============= SYNC =============
+
+def index_food_item(food_item):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [food_item.id])
+        cursor.execute(FILL_SQL + " WHERE f.id = %s", [food_item.id])
+
+
+def remove_food_item(food_item_id):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [food_item_id])
+
+
+def index_shop(shop):
+    """
+    Refresh the shop name stored against each of the shop's items
+    """
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {FTS_TABLE} SET shop_name = %s "
+            "WHERE rowid IN (SELECT id FROM menu_fooditem WHERE shop_id = %s)",
+            [shop.shop_name, shop.id],
+        )
+
+
+# ============= QUERIES =============
+
+def build_match_query(text):
+    """
+    Turn free text into an FTS5 query: every word must match as a prefix
+    Words are quoted so user input can never be parsed as FTS syntax.
+    """
+    tokens = _TOKEN_RE.findall(text)
+    return ' '.join('"%s"*' % token.replace('"', '""') for token in tokens)
+
+
+def search_item_ids(text, limit=None, queryset=None):
+    """
+    Return food item ids matching text, best match first
+    With a FoodItem queryset only its items are matched, inside the same
+    SQL, so the result limit applies after the queryset's filters.
+    Returns None when full-text search is unavailable on this backend.
+    """
+    if not is_supported():
+        return None
+    match = build_match_query(text)
+    if not match:
+        return []
+    if limit is None:
+        limit = getattr(settings, 'MENU_SEARCH_RESULT_LIMIT', DEFAULT_RESULT_LIMIT)
+    where, params = f"{FTS_TABLE} MATCH %s", [match]
+    if queryset is not None:
+        candidates, candidate_params = queryset.order_by().values('id').query.sql_with_params()
+        where += f" AND rowid IN ({candidates})"
+        params += candidate_params
+    with connection.cursor() as cursor:
+        # bm25 weights: name matches count most, then shop name, then description
+        cursor.execute(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {where} "
+            f"ORDER BY bm25({FTS_TABLE}, 10.0, 1.0, 5.0) LIMIT %s",
+            params + [limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def icontains_filter(text):
+    """
+    The portable search used when FTS5 is unavailable
+    """
+    return (
+        Q(name__icontains=text) |
+        Q(description__icontains=text) |
+        Q(shop__shop_name__icontains=text)
+    )
+
+
+def rank_order(ids):
+    """
+    Order expression that keeps a FoodItem queryset in the ranked order of ids
+    A single instr() over ",id1,id2,..." compiles far faster than a CASE with
+    one WHEN per id; it is only used on SQLite, where FTS5 ranking exists.
+    """
+    ranked = ',%s,' % ','.join(str(pk) for pk in ids)
+    return RawSQL("instr(%s, ',' || menu_fooditem.id || ',')", [ranked])
+
+
+def ranked_queryset(queryset, ids):
+    """
+    Restrict a FoodItem queryset to ids, in their ranked order
+    """
+    if not ids:
+        return queryset.none()
+    return queryset.filter(id__in=ids).order_by(rank_order(ids))
+
+
+def filter_queryset(queryset, text):
+    """
+    Apply a search to a FoodItem queryset, ranked when FTS5 is available
+    """
+    ids = search_item_ids(text, queryset=queryset)
+    if ids is None:
+        return queryset.filter(icontains_filter(text))
+    return ranked_queryset(queryset, ids)
@@ -0,0 +1,50 @@
+# menu/serializers.py
+
+"""
+Plain-dict serialization for the JSON variants of menu listings
+Keys are part of the public contract: add new ones, never rename.
+"""
+
+
+def serialize_food_item(item):
+    return {
+        'id': item.id,
+        'name': item.name,
+        'price': str(item.price),
+        'image': item.image.url if item.image else None,
+        'is_vegetarian': item.is_vegetarian,
+        'is_vegan': item.is_vegan,
+        'preparation_time': item.preparation_time,
+        'shop': {'id': item.shop_id, 'name': item.shop.shop_name},
+        'category': {'id': item.category.id, 'name': item.category.name} if item.category_id else None,
+        'created_at': item.created_at.isoformat(),
+    }
+
+
+
+# ============= API (v1) =============
+# Compact: related rows are ids into the other endpoints, not nested objects
+
+def serialize_api_shop(shop):
+    return {
+        'id': shop.id,
+        'name': shop.shop_name,
+        'logo': shop.shop_logo.url if shop.shop_logo else None,
+    }
+
+
+def serialize_api_category(category):
+    return {'id': category.id, 'name': category.name, 'icon': category.icon}
+
+
+def serialize_api_item(item):
+    return {
+        'id': item.id,
+        'name': item.name,
+        'price': str(item.price),
+        'category': item.category_id,
+        'image': item.image.url if item.image else None,
+        'is_vegetarian': item.is_vegetarian,
+        'is_vegan': item.is_vegan,
+        'preparation_time': item.preparation_time,
+    }
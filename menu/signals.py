@@ -0,0 +1,90 @@
+# menu/signals.py
+
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from vendors.models import Shop
+from .models import Category, FoodItem
+from . import cache as menu_cache
+from . import search
+from foodcourt import images
+
+SEARCHABLE_FIELDS = {'name', 'description', 'shop'}
+
+
+# ============= SEARCH INDEX =============
+
+@receiver(post_save, sender=FoodItem)
+def index_food_item(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not SEARCHABLE_FIELDS.intersection(update_fields):
+        return
+    search.index_food_item(instance)
+
+
+@receiver(post_delete, sender=FoodItem)
+def unindex_food_item(sender, instance, **kwargs):
+    search.remove_food_item(instance.id)
+
+
+@receiver(post_save, sender=Shop)
+def reindex_shop_items(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        return
+    if update_fields is not None and 'shop_name' not in update_fields:
+        return
+    search.index_shop(instance)
+
+
+# ============= STOCK =============
+
+@receiver(pre_save, sender=FoodItem)
+def clear_sold_out(sender, instance, **kwargs):
+    # Switched back on by hand, the item is no longer menu.stock's to restore
+    if instance.is_available:
+        instance.sold_out = False
+
+
+# ============= MENU FRAGMENT CACHE =============
+
+@receiver(post_save, sender=FoodItem)
+@receiver(post_delete, sender=FoodItem)
+def bump_food_item_menu(sender, instance, **kwargs):
+    # Also fires for admin list_editable toggles, which save() each row
+    menu_cache.bump_shop(instance.shop_id)
+
+
+@receiver(post_delete, sender=FoodItem)
+def touch_shop(sender, instance, **kwargs):
+    # Last-Modified of the shop's pages (menu.conditional) must not go back
+    Shop.objects.filter(id=instance.shop_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Shop)
+@receiver(post_delete, sender=Shop)
+def bump_shop_menu(sender, instance, **kwargs):
+    menu_cache.bump_shop(instance.id)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_all_menus(sender, instance, **kwargs):
+    menu_cache.bump_all()
+
+
+# ============= IMAGE VARIANTS =============
+
+@receiver(post_save, sender=FoodItem)
+def build_food_item_variants(sender, instance, raw=False, **kwargs):
+    if not raw:
+        images.schedule_variants(instance)
+
+
+@receiver(images.variants_built, sender=FoodItem)
+def bump_food_item_images(sender, instance, **kwargs):
+    # Variants are stored with update(), which sends no post_save
+    menu_cache.bump_shop(instance.shop_id)
+
+
+@receiver(images.variants_built, sender=Shop)
+def bump_shop_images(sender, instance, **kwargs):
+    menu_cache.bump_shop(instance.id)
@@ -0,0 +1,149 @@
+# menu/stock.py
+
+"""
+Per-item stock
+
+FoodItem.stock counts the portions left (None: unlimited). take() removes
+the portions of a whole order in one guarded UPDATE:
+
+    UPDATE menu_fooditem
+       SET stock = stock - CASE id WHEN ... END,
+           is_available = CASE WHEN stock = <qty> THEN false ELSE is_available END
+     WHERE id IN (...) AND stock >= CASE id WHEN ... END
+
+Only rows with enough stock match, so two checkouts racing for the last
+portions cannot both succeed; if any line is short, nothing is taken and
+OutOfStockError names the short items. Items flip to unavailable in the
+same statement when they reach zero, and are marked sold_out.
+
+put_back() returns the portions of a cancelled order. reset_daily() restocks
+items with a daily_stock (`manage.py reset_daily_stock`, run each morning).
+Both switch sold_out items back on; an item the vendor switched off stays
+off (saving an item switched on clears its mark, see menu.signals).
+
+These are QuerySet updates, so they keep the dashboard counters
+(dashboard.stats) in the same transaction and bump the menu cache
+themselves when an item's availability changes; the stock count itself is
+not on public pages.
+"""
+
+from collections import Counter
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.utils import timezone
+from dashboard import stats
+from .models import FoodItem
+from . import cache as menu_cache
+
+# Switched off by take() on selling out, not by the vendor
+RESTORABLE = Q(sold_out=True, is_available=False)
+
+
+class OutOfStockError(Exception):
+    """
+    Raised when items do not have the portions asked for
+    items: the short FoodItems.
+    """
+
+    def __init__(self, items):
+        self.items = items
+        super().__init__(', '.join(item.name for item in items))
+
+
+class _Short(Exception):
+    pass
+
+
+def _per_item(quantities):
+    return Case(
+        *(When(id=food_id, then=Value(quantity)) for food_id, quantity in quantities.items()),
+        output_field=IntegerField(),
+    )
+
+
+def _record(shop_ids, delta):
+    """
+    Count items switched on or off per shop in the dashboard counters, and
+    bump those shops' menus
+    """
+    counts = Counter(shop_ids)
+    stats.record_availability_changed({shop_id: delta * count for shop_id, count in counts.items()})
+    for shop_id in counts:
+        menu_cache.bump_shop(shop_id)
+
+
+def take(quantities):
+    """
+    Remove {food item id: quantity} from stock, all or nothing
+    Every item must track stock. Raises OutOfStockError.
+    """
+    if not quantities:
+        return
+    tracked = list(quantities)
+    wanted = _per_item(quantities)
+    sells_out = Q(stock=wanted, is_available=True)
+
+    try:
+        with transaction.atomic():
+            # The items this take switches off; the write lock is already held
+            # on SQLite (BEGIN IMMEDIATE), the rows are locked elsewhere
+            sold_out = list(
+                FoodItem.objects.select_for_update().filter(sells_out, id__in=tracked).values_list('shop_id', flat=True)
+            )
+            # SET expressions all read the row as it was before the UPDATE
+            taken = FoodItem.objects.filter(id__in=tracked, stock__gte=wanted).update(
+                stock=F('stock') - wanted,
+                is_available=Case(When(sells_out, then=Value(False)), default=F('is_available')),
+                sold_out=Case(When(sells_out, then=Value(True)), default=F('sold_out')),
+                updated_at=timezone.now(),
+            )
+            if taken != len(tracked):
+                raise _Short()
+            _record(sold_out, -1)
+    except _Short:
+        short = [
+            food_item
+            for food_item in FoodItem.objects.filter(id__in=tracked).only('id', 'name', 'stock')
+            if food_item.stock is None or food_item.stock < quantities[food_item.id]
+        ]
+        raise OutOfStockError(short)
+
+
+def put_back(quantities):
+    """
+    Return {food item id: quantity} to stock, e.g. for a cancelled order
+    """
+    if not quantities:
+        return
+    returned = _per_item(quantities)
+    with transaction.atomic():
+        items = FoodItem.objects.filter(id__in=quantities, stock__isnull=False)
+        restored = list(items.select_for_update().filter(RESTORABLE).values_list('shop_id', flat=True))
+        items.update(
+            stock=F('stock') + returned,
+            is_available=Case(When(RESTORABLE, then=Value(True)), default=F('is_available')),
+            sold_out=Value(False),
+            updated_at=timezone.now(),
+        )
+        _record(restored, 1)
+
+
+def reset_daily():
+    """
+    Restock every item that has a daily_stock; returns the number restocked
+    """
+    with transaction.atomic():
+        items = FoodItem.objects.filter(daily_stock__isnull=False)
+        restorable = RESTORABLE & Q(daily_stock__gt=0)
+        restored = list(items.select_for_update().filter(restorable).values_list('shop_id', flat=True))
+        shop_ids = set(items.filter(Q(stock=0) | ~Q(stock=F('daily_stock'))).values_list('shop_id', flat=True))
+        restocked = items.update(
+            stock=F('daily_stock'),
+            is_available=Case(When(restorable, then=Value(True)), default=F('is_available')),
+            sold_out=Case(When(daily_stock__gt=0, then=Value(False)), default=F('sold_out')),
+            updated_at=timezone.now(),
+        )
+        _record(restored, 1)
+    for shop_id in shop_ids.difference(restored):
+        menu_cache.bump_shop(shop_id)
+    return restocked
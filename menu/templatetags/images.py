@@ -0,0 +1,44 @@
+# menu/templatetags/images.py
+
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+from foodcourt.images import FORMATS
+
+register = template.Library()
+
+
+def _srcset(storage, names):
+    return ', '.join(f'{storage.url(name)} {density}x' for density, name in sorted(names.items()))
+
+
+@register.simple_tag
+def picture(field_file, variants, size, **attrs):
+    """
+    <picture> for an image field using its resized variants, e.g.
+
+        {% picture item.image item.image_variants 'card' alt=item.name class="card-img-top" %}
+
+    Serves WebP where the browser supports it, JPEG otherwise, each at 1x and
+    2x density. Falls back to the original file when the size has not been
+    built (yet).
+    """
+    if not field_file:
+        return ''
+    entry = (variants or {}).get(size)
+    if not entry:
+        return format_html('<img src="{}"{}>', field_file.url, flatatt(attrs))
+
+    storage = field_file.storage
+    img_attrs = {
+        'src': storage.url(entry['jpeg']['1']),
+        'srcset': _srcset(storage, entry['jpeg']),
+        'width': entry['width'],
+        'height': entry['height'],
+        'loading': 'lazy',
+        **attrs,
+    }
+    return format_html(
+        '<picture><source type="{}" srcset="{}"><img{}></picture>',
+        FORMATS['webp'][2], _srcset(storage, entry['webp']), flatatt(img_attrs),
+    )
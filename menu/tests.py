@@ -1,3 +1,535 @@
-from django.test import TestCase
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+from PIL import Image
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.db import connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils.module_loading import import_string
+from accounts.models import User
+from foodcourt import replica
+from jobs.models import Job
+from jobs.worker import Worker
+from vendors.models import Shop
+from .models import Category, FoodItem
+from . import cache as menu_cache
+from . import search
 
-# Create your tests here.
+
+def create_shop(username='vendor', shop_name='Udupi Cafe', **kwargs):
+    vendor = User.objects.create_user(username, role='vendor')
+    defaults = {
+        'description': 'South Indian', 'phone': '123', 'email': f'{username}@example.com',
+        'address': 'Block A', 'status': 'approved', 'is_active': True,
+    }
+    defaults.update(kwargs)
+    return Shop.objects.create(vendor=vendor, shop_name=shop_name, **defaults)
+
+
+class FoodItemQuerySetTests(TestCase):
+    def setUp(self):
+        self.shop = create_shop()
+        self.blocked = create_shop('blocked', 'Closed Cafe', status='blocked')
+        self.dosa = FoodItem.objects.create(shop=self.shop, name='Masala Dosa', description='Crispy', price='60.00')
+        self.sold_out = FoodItem.objects.create(
+            shop=self.shop, name='Pongal', description='Rice', price='40.00', is_available=False,
+        )
+        self.hidden = FoodItem.objects.create(shop=self.blocked, name='Vada', description='Fried', price='25.00')
+
+    def test_browsable(self):
+        self.assertEqual(list(FoodItem.objects.browsable()), [self.dosa])
+        self.assertCountEqual(FoodItem.objects.from_active_shops(), [self.dosa, self.sold_out])
+
+    def test_summaries_join_and_defer(self):
+        with self.assertNumQueries(1):
+            item = FoodItem.objects.summaries().get(id=self.dosa.id)
+            self.assertEqual(item.shop.shop_name, 'Udupi Cafe')
+        self.assertEqual(item.get_deferred_fields(), {'description'})
+        self.assertIn('address', item.shop.get_deferred_fields())
+
+
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        self.shop = create_shop()
+        self.dosa = FoodItem.objects.create(
+            shop=self.shop, name='Masala Dosa', description='Crispy crepe with potato', price='60.00',
+        )
+        self.idli = FoodItem.objects.create(
+            shop=self.shop, name='Idli', description='Served with masala chutney', price='30.00',
+        )
+
+    def test_index_follows_saves_and_deletes(self):
+        self.assertEqual(search.search_item_ids('dosa'), [self.dosa.id])
+
+        self.dosa.name = 'Rava Uttapam'
+        self.dosa.save()
+        self.assertEqual(search.search_item_ids('dosa'), [])
+        self.assertEqual(search.search_item_ids('uttap'), [self.dosa.id])
+
+        self.idli.delete()
+        self.assertEqual(search.search_item_ids('chutney'), [])
+
+    def test_shop_rename_is_searchable(self):
+        self.shop.shop_name = 'Madras Express'
+        self.shop.save()
+        self.assertCountEqual(search.search_item_ids('madras'), [self.dosa.id, self.idli.id])
+
+    def test_name_matches_rank_first(self):
+        self.assertEqual(search.search_item_ids('masala'), [self.dosa.id, self.idli.id])
+
+    def test_user_input_is_not_fts_syntax(self):
+        self.assertEqual(search.search_item_ids('dosa" OR idli'), [])
+        self.assertEqual(search.search_item_ids('***'), [])
+
+    def test_browse_menu_search(self):
+        response = self.client.get(reverse('browse_menu'), {'search': 'masala'})
+        self.assertEqual(list(response.context['food_items']), [self.dosa, self.idli])
+
+    def test_browse_menu_falls_back_to_icontains(self):
+        with mock.patch.object(search, 'is_supported', return_value=False):
+            response = self.client.get(reverse('browse_menu'), {'search': 'sala do'})
+        self.assertEqual(list(response.context['food_items']), [self.dosa])
+
+    def test_rebuild(self):
+        FoodItem.objects.bulk_create([
+            FoodItem(shop=self.shop, name='Medu Vada', description='Fried', price='25.00'),
+        ])
+        self.assertEqual(search.search_item_ids('vada'), [])
+        self.assertEqual(search.rebuild(), 3)
+        self.assertEqual(len(search.search_item_ids('vada')), 1)
+
+
+class BrowsePaginationTests(TestCase):
+    def setUp(self):
+        shop = create_shop()
+        FoodItem.objects.bulk_create([
+            FoodItem(shop=shop, name=f'Thali {number}', description='Full meal', price='90.00')
+            for number in range(30)
+        ])
+        search.rebuild()
+
+    def collect(self, params):
+        names, cursor = [], None
+        while True:
+            query = dict(params, cursor=cursor) if cursor else params
+            data = self.client.get(reverse('browse_menu_json'), query).json()
+            names += [item['name'] for item in data['results']]
+            cursor = data['next']
+            if cursor is None:
+                return names
+
+    def test_browse_pages_newest_first(self):
+        names = self.collect({})
+        self.assertEqual(len(names), 30)
+        self.assertEqual(names, [f'Thali {number}' for number in reversed(range(30))])
+
+    def test_ranked_search_pages(self):
+        names = self.collect({'search': 'thali'})
+        self.assertCountEqual(names, [f'Thali {number}' for number in range(30)])
+
+    def test_result_limit_applies_after_filters(self):
+        # More hidden matches than the result limit, all ranked above the one
+        # browsable match (a name match outranks a description match)
+        shop = Shop.objects.get()
+        FoodItem.objects.bulk_create([
+            FoodItem(shop=shop, name=f'Paneer Tikka {number}', description='-', price='90.00', is_available=False)
+            for number in range(settings.MENU_SEARCH_RESULT_LIMIT + 1)
+        ])
+        shown = FoodItem.objects.create(shop=shop, name='Chef Special', description='Paneer tikka', price='120.00')
+        search.rebuild()
+        self.assertNotIn(shown.id, search.search_item_ids('paneer tikka'))
+        self.assertEqual(self.collect({'search': 'paneer tikka'}), ['Chef Special'])
+
+    def test_html_pager_links_keep_filters(self):
+        response = self.client.get(reverse('browse_menu'), {'search': 'thali'})
+        self.assertContains(response, 'search=thali&amp;cursor=')
+
+
+class MenuFragmentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.shop = create_shop()
+        self.category = Category.objects.create(name='Breakfast')
+        self.dosa = FoodItem.objects.create(
+            shop=self.shop, category=self.category, name='Masala Dosa', description='Crispy', price='60.00',
+        )
+
+    def test_hit_skips_menu_queries(self):
+        url = reverse('shop_menu', args=[self.shop.id])
+        self.client.get(url)
+        # Only the Last-Modified check and the shop header lookup remain on a hit
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertContains(response, 'Masala Dosa')
+        self.assertEqual(menu_cache.get_stats()['hits'], 1)
+        self.assertEqual(menu_cache.get_stats()['misses'], 1)
+
+    def test_food_item_save_invalidates(self):
+        url = reverse('shop_menu', args=[self.shop.id])
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            # Same path as an admin list_editable toggle
+            self.dosa.is_available = False
+            self.dosa.save()
+        self.assertNotContains(self.client.get(url), 'Masala Dosa')
+
+    def test_category_change_invalidates_every_shop(self):
+        url = reverse('shop_public_detail', args=[self.shop.id])
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = 'Tiffin'
+            self.category.save()
+        self.assertContains(self.client.get(url), 'Tiffin')
+
+    def test_variants_are_cached_separately(self):
+        other = FoodItem.objects.create(shop=self.shop, name='Filter Coffee', description='Hot', price='20.00')
+        url = reverse('food_detail', args=[self.dosa.id])
+        self.assertContains(self.client.get(url), 'Filter Coffee')
+        response = self.client.get(reverse('food_detail', args=[other.id]))
+        self.assertContains(response, 'More from')
+        self.assertContains(response, 'Masala Dosa')
+
+
+class MenuApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.shop = create_shop()
+        self.category = Category.objects.create(name='Breakfast')
+        self.dosa = FoodItem.objects.create(
+            shop=self.shop, category=self.category, name='Masala Dosa', description='Crispy', price='60.00',
+        )
+        self.url = reverse('api_shop_items', args=[self.shop.id])
+
+    def test_items(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['Cache-Control'], 'public, no-cache')
+        self.assertFalse(response['ETag'].startswith('W/'))
+        data = response.json()
+        self.assertEqual(data['shop'], {'id': self.shop.id, 'name': 'Udupi Cafe'})
+        self.assertEqual(data['items'][0]['category'], self.category.id)
+        self.assertNotIn('description', data['items'][0])
+
+    def test_matching_etag_is_304_without_queries(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_menu_changes_move_the_etags(self):
+        urls = [self.url, reverse('api_categories'), reverse('api_shops')]
+        etags = [self.client.get(url)['ETag'] for url in urls]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dosa.price = '65.00'
+            self.dosa.save()
+            self.category.save()
+            self.shop.save()
+        for url, etag in zip(urls, etags):
+            response = self.client.get(url, headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(self.url).json()['items'][0]['price'], '65.00')
+
+    def test_inactive_shop_is_404(self):
+        self.shop.is_active = False
+        self.shop.save()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        shops = self.client.get(reverse('api_shops')).json()['shops']
+        self.assertEqual(shops, [])
+
+
+class PublicPageCachingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.shop = create_shop()
+        self.dosa = FoodItem.objects.create(shop=self.shop, name='Masala Dosa', description='Crispy', price='60.00')
+        self.idli = FoodItem.objects.create(shop=self.shop, name='Idli', description='Soft', price='30.00')
+        self.urls = [
+            reverse('shop_list'),
+            reverse('shop_public_detail', args=[self.shop.id]),
+            reverse('shop_menu', args=[self.shop.id]),
+            reverse('food_detail', args=[self.dosa.id]),
+        ]
+
+    def test_anonymous_pages_are_public_and_conditional(self):
+        for url in self.urls:
+            response = self.client.get(url)
+            self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+            self.assertIn('Cookie', response['Vary'])
+            again = self.client.get(url, headers={'If-None-Match': response['ETag']})
+            self.assertEqual(again.status_code, 304, url)
+            again = self.client.get(url, headers={'If-Modified-Since': response['Last-Modified']})
+            self.assertEqual(again.status_code, 304, url)
+
+    def test_logged_in_pages_are_private(self):
+        self.client.force_login(User.objects.create_user('student', role='student'))
+        for url in self.urls:
+            response = self.client.get(url)
+            self.assertEqual(response['Cache-Control'], 'private, no-cache')
+            self.assertFalse(response.has_header('ETag'))
+            self.assertIn('Cookie', response['Vary'])
+
+    def test_pages_setting_cookies_are_private(self):
+        self.client.force_login(User.objects.create_user('student', role='student'))
+        self.client.get(reverse('logout'))
+        # Anonymous again, with the flashed message still to show
+        response = self.client.get(reverse('shop_list'))
+        self.assertContains(response, 'You have been logged out successfully.')
+        self.assertTrue(response.cookies)
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        self.assertIn('Cookie', response['Vary'])
+
+    def test_menu_edits_invalidate(self):
+        url = reverse('shop_menu', args=[self.shop.id])
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.idli.price = '35.00'
+            self.idli.save()
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+        last_modified = response['Last-Modified']
+        later = self.idli.updated_at + timedelta(minutes=1)
+        with mock.patch('django.utils.timezone.now', return_value=later), self.captureOnCommitCallbacks(execute=True):
+            self.idli.delete()
+        response = self.client.get(url, headers={'If-Modified-Since': last_modified})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Idli')
+
+
+class AsyncCatalogViewTests(TestCase):
+    """
+    The async catalog views, through the ASGI handler
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.shop = create_shop()
+        FoodItem.objects.bulk_create([
+            FoodItem(shop=self.shop, name=f'Thali {number}', description='Full meal', price='90.00')
+            for number in range(30)
+        ])
+        search.rebuild()
+
+    def test_middleware_stays_async(self):
+        # One sync-only middleware would run every async view in a thread
+        for path in settings.MIDDLEWARE:
+            self.assertTrue(import_string(path).async_capable, path)
+
+    async def test_pages(self):
+        response = await self.async_client.get(reverse('shop_list'))
+        self.assertContains(response, 'Udupi Cafe')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+        response = await self.async_client.get(reverse('browse_menu'), {'search': 'thali'})
+        self.assertContains(response, 'search=thali&amp;cursor=')
+
+        url = reverse('shop_public_detail', args=[self.shop.id])
+        response = await self.async_client.get(url)
+        self.assertContains(response, 'View All 30 Items')
+        again = await self.async_client.get(url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(again.status_code, 304)
+
+    async def test_fragment_hit_and_query_budget(self):
+        url = reverse('shop_public_detail', args=[self.shop.id])
+        await self.async_client.get(url)
+        # Validator, shop; the preview comes from the fragment cache
+        response = await self.async_client.get(url)
+        self.assertEqual(response.query_report.queries, 2)
+        self.assertEqual(response.query_report.budget.queries, 6)
+
+    async def test_logged_in(self):
+        user = await User.objects.acreate(username='student', role='student')
+        await self.async_client.aforce_login(user)
+        response = await self.async_client.get(reverse('shop_list'))
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        self.assertFalse(response.has_header('ETag'))
+
+
+class ReadReplicaTests(TransactionTestCase):
+    """
+    Two SQLite files: the test database and a replica refreshed by sync_replica
+    """
+    @classmethod
+    def setUpClass(cls):
+        # Settings only define the replica when REPLICA_DB_PATH is set, so
+        # add the alias here, pointing at a throwaway file. It joins
+        # `databases` only now, after the test runner has set databases up;
+        # as a mirror it is never flushed.
+        cls.replica_dir = tempfile.TemporaryDirectory()
+        cls.added_alias = 'replica' not in connections.settings
+        if cls.added_alias:
+            connections.settings['replica'] = {
+                **connections.settings['default'],
+                'OPTIONS': {'init_command': 'PRAGMA query_only=ON;'},
+                'TEST': {**connections.settings['default']['TEST'], 'MIRROR': 'default'},
+            }
+        cls.databases = {'default', 'replica'}
+        cls.settings_override = override_settings(REPLICA_DATABASE='replica')
+        cls.settings_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.settings_override.disable()
+        connections['replica'].close()
+        if cls.added_alias:
+            del connections['replica']
+            del connections.settings['replica']
+        cls.replica_dir.cleanup()
+
+    def setUp(self):
+        cache.clear()
+        replica_db = connections['replica']
+        self.addCleanup(replica_db.settings_dict.__setitem__, 'NAME', replica_db.settings_dict['NAME'])
+        self.addCleanup(replica_db.close)
+        replica_db.close()
+        replica_db.settings_dict['NAME'] = f'{self.replica_dir.name}/replica.sqlite3'
+
+        self.dosa = FoodItem.objects.create(shop=create_shop(), name='Masala Dosa', description='Crispy', price='60.00')
+        call_command('sync_replica', stdout=StringIO())
+        FoodItem.objects.filter(pk=self.dosa.pk).update(name='Ghee Roast Dosa')
+        self.url = reverse('food_detail', args=[self.dosa.id])
+
+    def test_catalog_reads_lag_until_synced(self):
+        self.assertContains(self.client.get(self.url), 'Masala Dosa')
+        call_command('sync_replica', stdout=StringIO())
+        self.assertContains(self.client.get(self.url), 'Ghee Roast Dosa')
+
+    def test_writes_pin_to_primary(self):
+        student = User.objects.create_user('student', password='pass', role='student')
+        response = self.client.post(reverse('login'), {'username': 'student', 'password': 'pass'})
+        self.assertIn(replica.PIN_COOKIE, response.cookies)
+        self.assertContains(self.client.get(self.url), 'Ghee Roast Dosa')
+
+        self.client.cookies.pop(replica.PIN_COOKIE)
+        self.client.force_login(student)
+        self.assertContains(self.client.get(self.url), 'Masala Dosa')
+
+    def test_only_catalog_views_and_apps_use_the_replica(self):
+        router = replica.ReplicaRouter()
+        self.assertIsNone(router.db_for_read(FoodItem))
+        view = replica.replica_reads(lambda request: (router.db_for_read(FoodItem), router.db_for_read(User)))
+        self.assertEqual(view(None), ('replica', None))
+
+
+class NoReplicaTests(TestCase):
+    """
+    Without a replica configured, the catalog views read from default
+    """
+
+    def test_catalog_views_without_a_replica(self):
+        dosa = FoodItem.objects.create(shop=create_shop(), name='Masala Dosa', description='Crispy', price='60.00')
+        pages = [
+            (reverse('shop_list'), 'Udupi Cafe'),
+            (reverse('shop_public_detail', args=[dosa.shop_id]), 'Masala Dosa'),
+            (reverse('browse_menu'), 'Masala Dosa'),
+            (reverse('browse_menu_json'), 'Masala Dosa'),
+            (reverse('shop_menu', args=[dosa.shop_id]), 'Masala Dosa'),
+            (reverse('shop_menu_json', args=[dosa.shop_id]), 'Masala Dosa'),
+            (reverse('food_detail', args=[dosa.id]), 'Masala Dosa'),
+        ]
+        # No REPLICA_DATABASE, and a REPLICA_DATABASE naming a missing alias
+        for alias in (None, 'missing'):
+            with self.subTest(alias=alias), self.settings(REPLICA_DATABASE=alias):
+                cache.clear()
+                self.assertIsNone(replica.replica_alias())
+                for url, text in pages:
+                    self.assertContains(self.client.get(url), text)
+
+
+def image_upload(name, size, mode='RGB'):
+    buffer = BytesIO()
+    Image.new(mode, size, 'orange').save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        override = self.settings(MEDIA_ROOT=media_root.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.shop = create_shop()
+
+    def create_item(self, name, image):
+        item = FoodItem.objects.create(shop=self.shop, name=name, description='-', price='60.00', image=image)
+        Worker().run_pending()
+        item.refresh_from_db()
+        return item
+
+    def test_upload_is_processed_by_the_worker(self):
+        category = Category.objects.create(name='Meals')
+        self.client.force_login(self.shop.vendor)
+        response = self.client.post(reverse('vendor_add_food'), {
+            'category': category.id, 'name': 'Thali', 'description': 'Full meal', 'price': '120.00',
+            'image': image_upload('thali.png', (900, 600)), 'is_available': 'on',
+        })
+        self.assertEqual(response.status_code, 302)
+        item = FoodItem.objects.get(name='Thali')
+        self.assertEqual(item.image_variants['status'], 'pending')
+        self.assertContains(self.client.get(reverse('vendor_menu_list')), 'Processing image')
+
+        self.assertEqual(Worker().run_pending(), 1)
+        item.refresh_from_db()
+        self.assertEqual(item.image_variants['status'], 'ready')
+        self.assertEqual(Job.objects.get().status, Job.DONE)
+
+    def test_upload_builds_variants(self):
+        item = self.create_item('Dosa', image_upload('dosa.png', (1000, 800), 'RGBA'))
+        variants = item.image_variants
+        self.assertEqual(variants['source'], item.image.name)
+        card = variants['card']
+        self.assertEqual(sorted(card['webp']), ['1', '2'])
+        with item.image.storage.open(card['jpeg']['2']) as f:
+            self.assertEqual(Image.open(f).size, (800, 480))
+        with item.image.storage.open(variants['thumb']['webp']['1']) as f:
+            self.assertEqual(Image.open(f).format, 'WEBP')
+
+        html = Template("{% load images %}{% picture item.image item.image_variants 'card' alt=item.name %}").render(
+            Context({'item': item})
+        )
+        self.assertIn('<source type="image/webp" srcset="/media/food_items/dosa_card.webp 1x, '
+                      '/media/food_items/dosa_card-2x.webp 2x">', html)
+        self.assertIn('src="/media/food_items/dosa_card.jpg"', html)
+
+    def test_small_upload_skips_2x_and_replacement_rebuilds(self):
+        item = self.create_item('Idli', image_upload('idli.png', (500, 300)))
+        self.assertEqual(list(item.image_variants['card']['jpeg']), ['1'])
+        old = item.image_variants['card']['jpeg']['1']
+
+        item.image = image_upload('idli-new.png', (500, 300))
+        item.save()
+        self.assertFalse(item.image.storage.exists(old))
+        Worker().run_pending()
+        item.refresh_from_db()
+        self.assertEqual(item.image_variants['source'], item.image.name)
+        self.assertEqual(item.image_variants['status'], 'ready')
+
+    def test_backfill_command(self):
+        # Existing media from before variants, or queued jobs no worker ran
+        item = FoodItem.objects.create(
+            shop=self.shop, name='Vada', description='-', price='20.00', image=image_upload('vada.png', (400, 400)),
+        )
+        FoodItem.objects.filter(pk=item.pk).update(image_variants={})
+        self.shop.shop_banner = image_upload('banner.png', (1600, 400))
+        self.shop.save()
+
+        call_command('backfill_image_variants', stdout=StringIO())
+        self.assertIn('thumb', FoodItem.objects.get(pk=item.pk).image_variants)
+        self.assertIn('banner', Shop.objects.get(pk=self.shop.pk).banner_variants)
+
+    def test_unreadable_upload_falls_back_to_original(self):
+        with self.assertLogs('foodcourt.images', 'WARNING'):
+            item = self.create_item('Bad', SimpleUploadedFile('bad.png', b'not an image'))
+        self.assertEqual(item.image_variants, {'source': item.image.name, 'status': 'failed'})
+        html = Template("{% load images %}{% picture item.image item.image_variants 'card' %}").render(
+            Context({'item': item})
+        )
+        self.assertEqual(html, '<img src="/media/food_items/bad.png">')
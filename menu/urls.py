@@ -12,6 +12,8 @@ urlpatterns = [
     
     # Public/Student Views
     path('browse/', views.browse_menu, name='browse_menu'),
+    path('browse/json/', views.browse_menu_json, name='browse_menu_json'),
     path('food/<int:food_id>/', views.food_detail, name='food_detail'),
     path('shop/<int:shop_id>/menu/', views.shop_menu, name='shop_menu'),
+    path('shop/<int:shop_id>/menu/json/', views.shop_menu_json, name='shop_menu_json'),
 ]
\ No newline at end of file
@@ -1,12 +1,29 @@
 # menu/views.py
 
+import asyncio
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q
+from django.db import transaction
+from django.http import JsonResponse
+from django.template.loader import render_to_string
 from .models import FoodItem, Category
 from .forms import FoodItemForm
+from .serializers import serialize_food_item
+from . import cache as menu_cache
+from . import search
+from . import conditional
 from vendors.models import Shop
+from dashboard import stats
+from foodcourt.db import alist
+from foodcourt.http import public_page
+from foodcourt.replica import replica_reads
+from foodcourt.pagination import KeysetPaginator, RankedPaginator
+from perf.budget import query_budget
+
+BROWSE_PAGE_SIZE = 24
+SHOP_MENU_PAGE_SIZE = 24
 
 # ============= VENDOR VIEWS =============
 
@@ -60,7 +77,9 @@ def vendor_add_food(request):
         if form.is_valid():
             food_item = form.save(commit=False)
             food_item.shop = shop
-            food_item.save()
+            with transaction.atomic():
+                food_item.save()
+                stats.record_food_item_added(food_item)
             messages.success(request, f'{food_item.name} added successfully!')
             return redirect('vendor_menu_list')
     else:
@@ -85,11 +104,14 @@ def vendor_edit_food(request, food_id):
         return redirect('apply_shop')
     
     food_item = get_object_or_404(FoodItem, id=food_id, shop=shop)
+    was_available = food_item.is_available
     
     if request.method == 'POST':
         form = FoodItemForm(request.POST, request.FILES, instance=food_item)
         if form.is_valid():
-            form.save()
+            with transaction.atomic():
+                form.save()
+                stats.record_food_item_changed(food_item, was_available)
             messages.success(request, f'{food_item.name} updated successfully!')
             return redirect('vendor_menu_list')
     else:
@@ -117,7 +139,9 @@ def vendor_delete_food(request, food_id):
     
     if request.method == 'POST':
         food_name = food_item.name
-        food_item.delete()
+        with transaction.atomic():
+            stats.record_food_item_removed(food_item)
+            food_item.delete()
         messages.success(request, f'{food_name} deleted successfully!')
         return redirect('vendor_menu_list')
     
@@ -126,88 +150,158 @@ def vendor_delete_food(request, food_id):
 
 # ============= PUBLIC/STUDENT VIEWS =============
 
-def browse_menu(request):
+def _browse_menu_query(request, food_items):
     """
-    Browse all available food items
+    Filter and search the browsable items for browse_menu
+    Returns the items and the paginator class to page them with.
     """
-    food_items = FoodItem.objects.filter(
-        shop__status='approved',
-        shop__is_active=True,
-        is_available=True
-    ).select_related('shop', 'category')
-    
-    categories = Category.objects.filter(is_active=True)
     
     # Filter by category
     category_filter = request.GET.get('category')
     if category_filter:
         food_items = food_items.filter(category__id=category_filter)
     
-    # Search functionality
-    search_query = request.GET.get('search')
-    if search_query:
-        food_items = food_items.filter(
-            Q(name__icontains=search_query) |
-            Q(description__icontains=search_query) |
-            Q(shop__shop_name__icontains=search_query)
-        )
-    
     # Filter by dietary preferences
     if request.GET.get('vegetarian'):
         food_items = food_items.filter(is_vegetarian=True)
     if request.GET.get('vegan'):
         food_items = food_items.filter(is_vegan=True)
     
-    context = {
-        'food_items': food_items,
-        'categories': categories,
-        'selected_category': category_filter,
-        'search_query': search_query,
+    # Search functionality (ranked full-text search, icontains fallback)
+    search_query = request.GET.get('search')
+    if search_query:
+        # Only the filtered items are ranked, so the result cap never hides
+        # a match behind hidden or filtered-out ones
+        ranked_ids = search.search_item_ids(search_query, queryset=food_items)
+        if ranked_ids is None:
+            food_items = food_items.filter(search.icontains_filter(search_query))
+        else:
+            # Ranked results are capped, so offset paging over them stays cheap
+            return search.ranked_queryset(food_items, ranked_ids), RankedPaginator
+    return food_items, KeysetPaginator
+
+
+def _browse_menu_context(request, page):
+    return {
+        'page': page,
+        'food_items': page.items,
+        'selected_category': request.GET.get('category'),
+        'search_query': request.GET.get('search'),
     }
-    return render(request, 'menu/browse_menu.html', context)
 
 
+def _browse_menu_page(request, food_items):
+    food_items, paginator_class = _browse_menu_query(request, food_items)
+    return paginator_class(food_items, per_page=BROWSE_PAGE_SIZE).page(request.GET.get('cursor'))
+
+
+@replica_reads
+@query_budget(queries=6)
+async def browse_menu(request):
+    """
+    Browse all available food items
+    The page of items and the categories are read concurrently.
+    """
+    food_items = FoodItem.objects.browsable().for_listing()
+    if request.GET.get('search'):
+        # Full-text search runs raw SQL on the sync connection
+        food_items, paginator_class = await sync_to_async(_browse_menu_query)(request, food_items)
+    else:
+        food_items, paginator_class = _browse_menu_query(request, food_items)
+    page, categories = await asyncio.gather(
+        paginator_class(food_items, per_page=BROWSE_PAGE_SIZE).apage(request.GET.get('cursor')),
+        alist(Category.objects.filter(is_active=True)),
+    )
+    context = _browse_menu_context(request, page)
+    context['categories'] = categories
+    return await sync_to_async(render)(request, 'menu/browse_menu.html', context)
+
+
+@replica_reads
+@query_budget(queries=4)
+def browse_menu_json(request):
+    """
+    JSON variant of browse_menu (same filters, same cursors)
+    """
+    page = _browse_menu_page(request, FoodItem.objects.browsable().summaries())
+    return JsonResponse(page.as_dict(serialize_food_item))
+
+
+@replica_reads
+@public_page(etag_func=conditional.food_item_etag, last_modified_func=conditional.food_item_last_modified)
+@query_budget(queries=6)
 def food_detail(request, food_id):
     """
     Detailed view of a food item
     """
     food_item = get_object_or_404(
-        FoodItem,
-        id=food_id,
-        shop__status='approved',
-        shop__is_active=True
+        FoodItem.objects.from_active_shops().select_related('shop', 'category'),
+        id=food_id
     )
     
-    # Get related items from same shop
-    related_items = FoodItem.objects.filter(
-        shop=food_item.shop,
-        is_available=True
-    ).exclude(id=food_item.id)[:4]
+    def render_related_items():
+        # Get related items from same shop
+        related_items = FoodItem.objects.available().filter(
+            shop=food_item.shop
+        ).exclude(id=food_item.id).defer('description')[:4]
+        context = {'food_item': food_item, 'related_items': related_items}
+        return render_to_string('menu/related_items.html', context, request)
     
     context = {
         'food_item': food_item,
-        'related_items': related_items,
+        'related_items_html': menu_cache.get_fragment(
+            food_item.shop_id, 'related_items', food_item.id, render_related_items
+        ),
     }
     return render(request, 'menu/food_detail.html', context)
 
 
-def shop_menu(request, shop_id):
-    """
-    View all food items from a specific shop
-    """
-    shop = get_object_or_404(Shop, id=shop_id, status='approved', is_active=True)
-    food_items = FoodItem.objects.filter(shop=shop, is_available=True).select_related('category')
-    categories = Category.objects.filter(is_active=True, food_items__shop=shop).distinct()
+def _shop_menu_context(request, shop, food_items):
+    food_items = food_items.filter(shop=shop)
     
     # Filter by category
     category_filter = request.GET.get('category')
     if category_filter:
         food_items = food_items.filter(category__id=category_filter)
     
-    context = {
+    page = KeysetPaginator(food_items, per_page=SHOP_MENU_PAGE_SIZE).page(request.GET.get('cursor'))
+    return {
         'shop': shop,
-        'food_items': food_items,
-        'categories': categories,
+        'page': page,
+        'food_items': page.items,
         'selected_category': category_filter,
     }
-    return render(request, 'menu/shop_menu.html', context)
\ No newline at end of file
+
+
+@replica_reads
+@public_page(etag_func=conditional.shop_etag, last_modified_func=conditional.shop_last_modified)
+@query_budget(queries=6)
+def shop_menu(request, shop_id):
+    """
+    View all food items from a specific shop
+    """
+    shop = get_object_or_404(Shop.objects.active(), id=shop_id)
+    
+    def render_menu_body():
+        context = _shop_menu_context(request, shop, FoodItem.objects.available().for_listing())
+        context['categories'] = Category.objects.filter(is_active=True, food_items__shop=shop).distinct()
+        return render_to_string('menu/shop_menu_body.html', context, request)
+    
+    # Every query parameter shapes the body (filters, cursor, pager links)
+    variant = menu_cache.variant_key(*sorted(request.GET.lists()))
+    context = {
+        'shop': shop,
+        'menu_body': menu_cache.get_fragment(shop.id, 'shop_menu', variant, render_menu_body),
+    }
+    return render(request, 'menu/shop_menu.html', context)
+
+
+@replica_reads
+@query_budget(queries=4)
+def shop_menu_json(request, shop_id):
+    """
+    JSON variant of shop_menu (same filters, same cursors)
+    """
+    shop = get_object_or_404(Shop.objects.active(), id=shop_id)
+    page = _shop_menu_context(request, shop, FoodItem.objects.available().summaries())['page']
+    return JsonResponse(page.as_dict(serialize_food_item))
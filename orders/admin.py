@@ -2,7 +2,10 @@
 
 from django.contrib import admin
 from django.utils.html import format_html
+from django.db import transaction
 from .models import Cart, Order, OrderItem
+from vendors.admin import ShopListFilter
+from dashboard import stats
 
 @admin.register(Cart)
 class CartAdmin(admin.ModelAdmin):
@@ -12,6 +15,7 @@ class CartAdmin(admin.ModelAdmin):
     list_display = ['user', 'food_item', 'quantity', 'total_price', 'created_at']
     list_filter = ['created_at']
     search_fields = ['user__username', 'food_item__name']
+    list_select_related = ['user', 'food_item__shop__vendor']
     readonly_fields = ['created_at', 'updated_at']
 
 
@@ -31,8 +35,9 @@ class OrderAdmin(admin.ModelAdmin):
     Admin interface for Orders
     """
     list_display = ['order_number', 'user', 'shop', 'status_badge', 'payment_badge', 'total_amount', 'created_at']
-    list_filter = ['status', 'payment_status', 'created_at', 'shop']
+    list_filter = ['status', 'payment_status', 'created_at', ('shop', ShopListFilter)]
     search_fields = ['order_number', 'user__username', 'shop__shop_name']
+    list_select_related = ['user', 'shop__vendor']
     readonly_fields = ['order_number', 'created_at', 'updated_at']
     inlines = [OrderItemInline]
     
@@ -79,4 +84,22 @@ class OrderAdmin(admin.ModelAdmin):
             colors.get(obj.payment_status, 'gray'),
             obj.get_payment_status_display()
         )
-    payment_badge.short_description = 'Payment'
\ No newline at end of file
+    payment_badge.short_description = 'Payment'
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        
+        if change:
+            stats.record_order_status_changed(obj, form.initial.get('status'))
+        else:
+            stats.record_order_placed(obj)
+    
+    def delete_model(self, request, obj):
+        stats.record_order_removed(obj)
+        super().delete_model(request, obj)
+    
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            for order in queryset:
+                stats.record_order_removed(order)
+            super().delete_queryset(request, queryset)
\ No newline at end of file
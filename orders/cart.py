@@ -0,0 +1,326 @@
+# orders/cart.py
+
+"""
+Cart storage
+
+The cart views talk to a CartStore obtained from get_cart(request); the
+CART_STORE setting names the class:
+
+    orders.cart.DatabaseCartStore  every change is a write to the Cart table
+    orders.cart.SessionCartStore   lines live in the session (and so in the
+                                   cache with a cache SESSION_ENGINE) and are
+                                   written to Cart at checkout, at logout and
+                                   at most every CART_PERSIST_INTERVAL seconds
+                                   while the cart keeps changing
+
+Both return lines as Cart instances (unsaved ones for the session store) with
+food_item, its shop and category loaded, so templates work with either.
+
+get_summary() serves the navbar badge (line count and total) from a per-user
+cache entry; every store method that changes the cart drops that entry.
+
+add_items() is how views put items in a cart: one joined lookup keeps only
+items that can be ordered, then the store adds them all at once; for the
+database store that is a single INSERT ... ON CONFLICT DO UPDATE, so two
+concurrent adds (a double click) both count.
+"""
+
+import time
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from menu.models import FoodItem
+from .models import Cart
+
+DEFAULT_STORE = 'orders.cart.DatabaseCartStore'
+DEFAULT_PERSIST_INTERVAL = 300
+
+SUMMARY_KEY = 'cart:summary:%s'
+# Bounds how long a menu price change can leave a stale total in the badge
+DEFAULT_SUMMARY_TIMEOUT = 60 * 5
+
+
+def get_cart(request):
+    """
+    Return the configured cart store for the request's user
+    """
+    return import_string(getattr(settings, 'CART_STORE', DEFAULT_STORE))(request)
+
+
+def get_summary(request):
+    """
+    {'count': lines, 'total': Decimal} for the request's user, cached
+    """
+    key = SUMMARY_KEY % request.user.pk
+    summary = cache.get(key)
+    if summary is None:
+        summary = get_cart(request).summary()
+        cache.set(key, summary, getattr(settings, 'CART_SUMMARY_TIMEOUT', DEFAULT_SUMMARY_TIMEOUT))
+    return summary
+
+
+def invalidate_summary(user):
+    cache.delete(SUMMARY_KEY % user.pk)
+
+
+def add_items(cart, quantities):
+    """
+    Add {food item id: quantity} to cart, skipping items that cannot be
+    ordered (unavailable, or from a shop that is not approved and active)
+    Returns ({FoodItem: the line's new quantity}, [skipped ids]).
+    """
+    orderable = {
+        food_item.id: food_item
+        for food_item in FoodItem.objects.browsable().filter(id__in=quantities).only('id', 'name', 'shop_id')
+    }
+    added = cart.add_many({food_id: quantity for food_id, quantity in quantities.items() if food_id in orderable})
+    skipped = [food_id for food_id in quantities if food_id not in orderable]
+    return {orderable[food_id]: quantity for food_id, quantity in added.items()}, skipped
+
+
+class DatabaseCartStore:
+    """
+    Cart lines are rows in the Cart table
+    """
+
+    # Statements persist() and reload() add to a checkout
+    CHECKOUT_QUERIES = 0
+
+    def __init__(self, request):
+        self.user = request.user
+
+    def _queryset(self):
+        return Cart.objects.filter(user=self.user)
+
+    def lines(self, shop=None):
+        lines = self._queryset().select_related('food_item', 'food_item__shop', 'food_item__category').defer('food_item__description')
+        if shop is not None:
+            lines = lines.filter(food_item__shop=shop)
+        return list(lines.order_by('id'))
+
+    def count(self):
+        return self._queryset().count()
+
+    def summary(self):
+        line_total = ExpressionWrapper(
+            F('quantity') * F('food_item__price'),
+            output_field=DecimalField(max_digits=10, decimal_places=2),
+        )
+        summary = self._queryset().aggregate(count=Count('id'), total=Sum(line_total))
+        total = (summary['total'] or Decimal('0')).quantize(Decimal('0.01'))
+        return {'count': summary['count'], 'total': total}
+
+    def add(self, food_item, quantity=1):
+        """
+        Add quantity of food_item and return the line's new quantity
+        """
+        return self.add_many({food_item.id: quantity})[food_item.id]
+
+    def add_many(self, quantities):
+        """
+        Add {food item id: quantity} in one upsert; returns the lines' new
+        quantities by food item id
+        The increment happens in the database (ON CONFLICT ... RETURNING,
+        SQLite 3.35+ or PostgreSQL), so concurrent adds never lose one.
+        """
+        if not quantities:
+            return {}
+        qn = connection.ops.quote_name
+        table = qn(Cart._meta.db_table)
+        now = Cart._meta.get_field('updated_at').get_db_prep_value(timezone.now(), connection)
+        rows = ', '.join(['(%s, %s, %s, %s, %s)'] * len(quantities))
+        params = []
+        for food_id, quantity in quantities.items():
+            params += [self.user.pk, food_id, quantity, now, now]
+        sql = (
+            f"INSERT INTO {table} ({qn('user_id')}, {qn('food_item_id')}, {qn('quantity')}, {qn('created_at')}, {qn('updated_at')}) "
+            f"VALUES {rows} "
+            f"ON CONFLICT ({qn('user_id')}, {qn('food_item_id')}) DO UPDATE SET "
+            f"{qn('quantity')} = {table}.{qn('quantity')} + excluded.{qn('quantity')}, "
+            f"{qn('updated_at')} = excluded.{qn('updated_at')} "
+            f"RETURNING {qn('food_item_id')}, {qn('quantity')}"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            added = dict(cursor.fetchall())
+        invalidate_summary(self.user)
+        return added
+
+    def set_quantity(self, food_id, quantity):
+        """
+        Set a line's quantity; False if the item is not in the cart
+        """
+        updated = self._queryset().filter(food_item_id=food_id).update(quantity=quantity, updated_at=timezone.now())
+        invalidate_summary(self.user)
+        return updated > 0
+
+    def remove(self, food_id):
+        """
+        Remove a line and return it, or None if the item is not in the cart
+        """
+        line = self._queryset().filter(food_item_id=food_id).select_related('food_item').first()
+        if line is not None:
+            line.delete()
+            invalidate_summary(self.user)
+        return line
+
+    def clear(self):
+        self._queryset().delete()
+        invalidate_summary(self.user)
+
+    def persist(self):
+        """
+        Nothing to do: every change is already in the database
+        """
+
+    def reload(self):
+        """
+        Only the cached summary can be stale, e.g. after checkout
+        """
+        invalidate_summary(self.user)
+
+
+class SessionCartStore:
+    """
+    Cart lines are a {food item id: quantity} map in the session
+
+    The map is loaded from the Cart table on first use in a session, so a
+    cart persisted at logout comes back at the next login.
+    """
+
+    SESSION_KEY = 'cart'
+    # At most, in tests: persist() reads the items and deletes and upserts
+    # lines in a savepoint, then the session reload() changed is saved in one
+    CHECKOUT_QUERIES = 8
+
+    def __init__(self, request):
+        self.user = request.user
+        self.session = request.session
+
+    def _data(self):
+        data = self.session.get(self.SESSION_KEY)
+        if data is None:
+            lines = Cart.objects.filter(user=self.user).order_by('id').values_list('food_item_id', 'quantity')
+            data = {
+                'lines': {str(food_id): quantity for food_id, quantity in lines},
+                # Lines to delete from the Cart table at the next persist()
+                'removed': [],
+                'dirty': False,
+                'persisted_at': time.time(),
+            }
+            self.session[self.SESSION_KEY] = data
+        return data
+
+    def _removed(self, data, food_ids):
+        removed = set(data.get('removed', ()))
+        removed.update(food_ids)
+        data['removed'] = sorted(removed)
+
+    def _changed(self, data):
+        data['dirty'] = True
+        self.session.modified = True
+        invalidate_summary(self.user)
+        interval = getattr(settings, 'CART_PERSIST_INTERVAL', DEFAULT_PERSIST_INTERVAL)
+        if time.time() - data['persisted_at'] >= interval:
+            self.persist()
+
+    def lines(self, shop=None):
+        quantities = self._data()['lines']
+        food_items = FoodItem.objects.summaries().filter(id__in=quantities)
+        if shop is not None:
+            food_items = food_items.filter(shop=shop)
+        food_items = {str(food_item.id): food_item for food_item in food_items}
+        # Keep the order items were added in
+        return [
+            Cart(user=self.user, food_item=food_items[food_id], quantity=quantity)
+            for food_id, quantity in quantities.items()
+            if food_id in food_items
+        ]
+
+    def count(self):
+        return len(self._data()['lines'])
+
+    def summary(self):
+        quantities = self._data()['lines']
+        prices = FoodItem.objects.filter(id__in=quantities).values_list('id', 'price') if quantities else []
+        total = sum((price * quantities[str(food_id)] for food_id, price in prices), Decimal('0.00'))
+        return {'count': len(quantities), 'total': total}
+
+    def add(self, food_item, quantity=1):
+        return self.add_many({food_item.id: quantity})[food_item.id]
+
+    def add_many(self, quantities):
+        if not quantities:
+            return {}
+        data = self._data()
+        for food_id, quantity in quantities.items():
+            data['lines'][str(food_id)] = data['lines'].get(str(food_id), 0) + quantity
+        data['removed'] = [food_id for food_id in data.get('removed', ()) if food_id not in data['lines']]
+        self._changed(data)
+        return {food_id: data['lines'][str(food_id)] for food_id in quantities}
+
+    def set_quantity(self, food_id, quantity):
+        data = self._data()
+        if str(food_id) not in data['lines']:
+            return False
+        data['lines'][str(food_id)] = quantity
+        self._changed(data)
+        return True
+
+    def remove(self, food_id):
+        """
+        Remove a line and return it, or None if the item is not in the cart
+        The line has no food item (food_item_id None) when the item has
+        been deleted since.
+        """
+        data = self._data()
+        quantity = data['lines'].pop(str(food_id), None)
+        if quantity is None:
+            return None
+        self._removed(data, [str(food_id)])
+        self._changed(data)
+        food_item = FoodItem.objects.filter(id=food_id).first()
+        return Cart(user=self.user, food_item=food_item, quantity=quantity)
+
+    def clear(self):
+        data = self._data()
+        self._removed(data, data['lines'])
+        data['lines'].clear()
+        self._changed(data)
+
+    def persist(self):
+        """
+        Write the session's lines to the Cart table, and delete the lines
+        removed in this session
+        Rows the session never knew of, e.g. added from another device, stay.
+        """
+        data = self.session.get(self.SESSION_KEY)
+        if data is None or not data['dirty']:
+            return
+        # Items deleted since they were added would break the foreign key
+        food_ids = list(FoodItem.objects.filter(id__in=data['lines']).values_list('id', flat=True))
+        with transaction.atomic():
+            if data.get('removed'):
+                Cart.objects.filter(user=self.user, food_item_id__in=data['removed']).delete()
+            Cart.objects.bulk_create(
+                [Cart(user=self.user, food_item_id=food_id, quantity=data['lines'][str(food_id)]) for food_id in food_ids],
+                update_conflicts=True,
+                unique_fields=['user', 'food_item'],
+                update_fields=['quantity', 'updated_at'],
+            )
+        data['removed'] = []
+        data['dirty'] = False
+        data['persisted_at'] = time.time()
+        self.session.modified = True
+
+    def reload(self):
+        """
+        Drop the session copy so the next access reads the Cart table again,
+        e.g. after checkout has removed the ordered lines there
+        """
+        self.session.pop(self.SESSION_KEY, None)
+        invalidate_summary(self.user)
@@ -0,0 +1,15 @@
+# orders/context_processors.py
+
+from django.utils.functional import SimpleLazyObject
+from .cart import get_summary
+
+
+def cart_summary(request):
+    """
+    Cart badge data for students: {{ cart_summary.count }}, {{ cart_summary.total }}
+    Read from the cache, and only when a template actually uses it.
+    """
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated or not user.is_student:
+        return {}
+    return {'cart_summary': SimpleLazyObject(lambda: get_summary(request))}
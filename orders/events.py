@@ -0,0 +1,161 @@
+# orders/events.py
+
+"""
+Order events for live vendor screens
+
+Views publish order.created and order.status_changed events per shop once
+their transaction commits; the order_events view streams them to vendors as
+Server-Sent Events. ORDER_EVENTS_BACKEND names the broker class.
+
+The default LocalBroker is in-process: subscribers only see events published
+by the same process, which suits a single ASGI worker. A multi-process
+deployment needs a shared backend (e.g. Redis pub/sub) implementing the same
+publish()/subscribe() interface.
+"""
+
+import asyncio
+import itertools
+import json
+import threading
+import time
+from collections import deque
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+DEFAULT_BACKEND = 'orders.events.LocalBroker'
+DEFAULT_BUFFER_SIZE = 100
+RETRY_MS = 3000  # client reconnect delay sent at the start of a stream
+
+ORDER_CREATED = 'order.created'
+ORDER_STATUS_CHANGED = 'order.status_changed'
+
+
+class Event:
+    """
+    One published event; ids keep increasing, across restarts too
+    """
+
+    def __init__(self, id, type, data):
+        self.id = id
+        self.type = type
+        self.data = data
+
+    def encode(self):
+        """
+        Server-Sent Events wire format
+        """
+        return f"id: {self.id}\nevent: {self.type}\ndata: {json.dumps(self.data)}\n\n"
+
+
+class Subscription:
+    """
+    A subscriber's queue, fed from any thread through its event loop
+    """
+
+    def __init__(self, broker, channel, loop):
+        self.broker = broker
+        self.channel = channel
+        self.loop = loop
+        self.queue = asyncio.Queue()
+
+    def deliver(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, event)
+        except RuntimeError:
+            # The subscriber's event loop closed without unsubscribing
+            self.close()
+
+    async def get(self, timeout):
+        """
+        Next event, or None if nothing arrived within timeout seconds
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """
+    In-process pub/sub with a short replay buffer per channel
+    """
+
+    def __init__(self, buffer_size=None):
+        self.buffer_size = buffer_size or getattr(settings, 'ORDER_EVENTS_BUFFER_SIZE', DEFAULT_BUFFER_SIZE)
+        # Ids start at the start time in microseconds, so a restarted process
+        # continues above the ids clients saw before: resuming with one of
+        # those replays everything buffered since the restart
+        self._ids = itertools.count(time.time_ns() // 1000)
+        self._lock = threading.Lock()
+        self._buffers = {}
+        self._subscribers = {}
+
+    def publish(self, channel, type, data):
+        with self._lock:
+            event = Event(next(self._ids), type, data)
+            self._buffers.setdefault(channel, deque(maxlen=self.buffer_size)).append(event)
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.deliver(event)
+        return event
+
+    def subscribe(self, channel, last_event_id=None):
+        """
+        Return (subscription, missed events since last_event_id)
+        Registering and reading the buffer happen under one lock, so no
+        event can fall between the replay and the live feed.
+        """
+        subscription = Subscription(self, channel, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscription)
+            missed = []
+            if last_event_id is not None:
+                missed = [event for event in self._buffers.get(channel, ()) if event.id > last_event_id]
+        return subscription, missed
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """
+    Return the process-wide broker named by ORDER_EVENTS_BACKEND
+    """
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(getattr(settings, 'ORDER_EVENTS_BACKEND', DEFAULT_BACKEND))()
+    return _broker
+
+
+def shop_channel(shop_id):
+    return f'shop:{shop_id}'
+
+
+def publish_order_event(order, type, previous_status=None):
+    """
+    Publish an order event for the order's shop after the transaction commits
+    """
+    data = {
+        'id': order.id,
+        'order_number': order.order_number,
+        'status': order.status,
+        'previous_status': previous_status,
+        'total_amount': str(order.total_amount),
+        'updated_at': order.updated_at.isoformat() if order.updated_at else None,
+    }
+    transaction.on_commit(lambda: get_broker().publish(shop_channel(order.shop_id), type, data))
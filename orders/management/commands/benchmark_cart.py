@@ -0,0 +1,86 @@
+# orders/management/commands/benchmark_cart.py
+
+import importlib
+import random
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+from accounts.models import User
+from vendors.models import Shop
+from menu.models import FoodItem
+from orders.cart import DatabaseCartStore, SessionCartStore
+
+STORES = {
+    'database': DatabaseCartStore,
+    'session': SessionCartStore,
+}
+
+OPERATIONS = ('add', 'update', 'view', 'remove')
+
+
+class Command(BaseCommand):
+    help = 'Measure cart operations per second under each cart store'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ops', type=int, default=1000, help='Timed operations per store and operation')
+        parser.add_argument('--items', type=int, default=20, help='Distinct food items to fill the cart with')
+        parser.add_argument('--session-engine', default=settings.SESSION_ENGINE,
+                            help='Session backend to run against, e.g. django.contrib.sessions.backends.cache')
+
+    def handle(self, *args, **options):
+        # Each operation is one request: load the session, act, save it
+        engine = importlib.import_module(options['session_engine'])
+        with transaction.atomic():
+            student, food_items = self.seed(options['items'])
+            self.stdout.write(f"session engine {options['session_engine']}, {options['ops']} ops each\n")
+            self.stdout.write(f"{'store':<10}" + ''.join(f'{name:>12}' for name in OPERATIONS) + '   (ops/sec)')
+            for label, store_class in STORES.items():
+                session = engine.SessionStore()
+                session.create()
+                rates = [
+                    self.measure(store_class, engine, session.session_key, student, food_items, operation, options['ops'])
+                    for operation in OPERATIONS
+                ]
+                self.stdout.write(f'{label:<10}' + ''.join(f'{rate:>12.0f}' for rate in rates))
+            # Never keep the synthetic dataset
+            transaction.set_rollback(True)
+
+    def measure(self, store_class, engine, session_key, student, food_items, operation, ops):
+        rng = random.Random(42)
+        request = RequestFactory().get('/')
+        request.user = student
+        start = time.perf_counter()
+        for _ in range(ops):
+            request.session = engine.SessionStore(session_key)
+            store = store_class(request)
+            food_item = rng.choice(food_items)
+            if operation == 'add':
+                store.add(food_item)
+            elif operation == 'update':
+                if not store.set_quantity(food_item.id, rng.randint(1, 5)):
+                    store.add(food_item)
+            elif operation == 'view':
+                store.lines()
+            elif operation == 'remove':
+                # Put the line back so every iteration removes something
+                store.remove(food_item.id)
+                store.add(food_item)
+            if request.session.modified:
+                request.session.save()
+        return ops / (time.perf_counter() - start)
+
+    def seed(self, count):
+        vendor = User.objects.create(username='bench_cart_vendor', role='vendor')
+        student = User.objects.create(username='bench_cart_student', role='student')
+        shop = Shop.objects.create(
+            vendor=vendor, shop_name='Benchmark Kitchen', description='Benchmark shop',
+            phone='0000000000', email='bench-cart@example.com', address='Benchmark',
+            status='approved', is_active=True,
+        )
+        food_items = FoodItem.objects.bulk_create([
+            FoodItem(shop=shop, name=f'Bench item {index}', description='-', price=50)
+            for index in range(count)
+        ])
+        return student, food_items
@@ -0,0 +1,112 @@
+# orders/management/commands/benchmark_checkout.py
+
+import sqlite3
+import threading
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.test.utils import override_settings
+from accounts.models import User
+from vendors.models import Shop
+from menu.models import FoodItem
+from orders.models import Cart
+from orders.services import place_order
+
+# Plain SQLite as Django configures it by default, then settings.DATABASES
+MODES = (
+    ('baseline', 'DELETE', {}, 0),
+    ('tuned', 'WAL', None, None),
+)
+
+
+class Command(BaseCommand):
+    help = 'Orders per second with concurrent checkouts: default SQLite vs the tuned connection setup'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Students checking out at once')
+        parser.add_argument('--duration', type=float, default=3.0, help='Seconds to run each mode')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('This benchmark compares SQLite setups only.')
+        # Threads need committed data, so run against a throwaway database
+        # (the test database) rather than rolling back a transaction
+        old_name = connection.settings_dict['NAME']
+        tuned_options = dict(connection.settings_dict['OPTIONS'])
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            students, shop, food_item = self.seed(options['threads'])
+            self.stdout.write(f"{options['threads']} threads, {options['duration']:.0f}s per mode")
+            self.stdout.write(f"{'mode':<10}{'orders':>8}{'orders/s':>10}{'errors':>8}{'p95 ms':>8}")
+            for label, journal_mode, mode_options, retries in MODES:
+                self.configure(journal_mode, tuned_options if mode_options is None else mode_options)
+                if retries is None:
+                    retries = settings.DB_LOCK_RETRIES
+                with override_settings(DB_LOCK_RETRIES=retries):
+                    orders, errors, timings = self.run(students, shop, food_item, options['duration'])
+                p95 = sorted(timings)[int(len(timings) * 0.95)] * 1000 if timings else 0
+                self.stdout.write(
+                    f"{label:<10}{orders:>8}{orders / options['duration']:>10.1f}{errors:>8}{p95:>8.0f}"
+                )
+        finally:
+            connection.settings_dict['OPTIONS'] = tuned_options
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def configure(self, journal_mode, mode_options):
+        # New connections read the options; the journal mode is kept in the file
+        connection.close()
+        connection.settings_dict['OPTIONS'] = dict(mode_options)
+        raw = sqlite3.connect(connection.settings_dict['NAME'])
+        raw.execute(f'PRAGMA journal_mode={journal_mode}')
+        raw.close()
+
+    def run(self, students, shop, food_item, duration):
+        ready = threading.Barrier(len(students))
+        lock = threading.Lock()
+        totals = {'orders': 0, 'errors': 0}
+        timings = []
+
+        def checkout(student):
+            try:
+                ready.wait()
+                deadline = time.perf_counter() + duration
+                while time.perf_counter() < deadline:
+                    start = time.perf_counter()
+                    try:
+                        Cart.objects.create(user=student, food_item=food_item, quantity=1)
+                        place_order(student, shop)
+                    except OperationalError:
+                        outcome = 'errors'
+                        Cart.objects.filter(user=student).delete()
+                    else:
+                        outcome = 'orders'
+                    with lock:
+                        totals[outcome] += 1
+                        timings.append(time.perf_counter() - start)
+            except OperationalError:
+                with lock:
+                    totals['errors'] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=checkout, args=(student,)) for student in students]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return totals['orders'], totals['errors'], timings
+
+    def seed(self, count):
+        vendor = User.objects.create(username='bench_checkout_vendor', role='vendor')
+        shop = Shop.objects.create(
+            vendor=vendor, shop_name='Benchmark Kitchen', description='Benchmark shop',
+            phone='0000000000', email='bench-checkout@example.com', address='Benchmark',
+            status='approved', is_active=True,
+        )
+        food_item = FoodItem.objects.create(shop=shop, name='Bench thali', description='-', price=80)
+        students = User.objects.bulk_create([
+            User(username=f'bench_checkout_student_{index}', role='student')
+            for index in range(count)
+        ])
+        return students, shop, food_item
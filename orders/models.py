@@ -1,10 +1,14 @@
 # orders/models.py
 
 from django.db import models
+from django.db.models import Prefetch
 from django.conf import settings
 from vendors.models import Shop
 from menu.models import FoodItem
 
+CLOSED_STATUSES = ('completed', 'cancelled')
+
+
 class Cart(models.Model):
     """
     Shopping Cart for Students
@@ -28,6 +32,31 @@ class Cart(models.Model):
         return self.food_item.price * self.quantity
 
 
+class OrderQuerySet(models.QuerySet):
+    """
+    Shared order filters and the joins order pages need
+    """
+
+    def for_student(self, user):
+        return self.filter(user=user)
+
+    def for_vendor(self, user):
+        return self.filter(shop__vendor=user)
+
+    def active(self):
+        """
+        Orders still in progress (the is_active property)
+        """
+        return self.exclude(status__in=CLOSED_STATUSES)
+
+    def with_details(self):
+        """
+        Shop, customer and item lines, each in one query
+        """
+        items = OrderItem.objects.select_related('food_item').defer('food_item__description')
+        return self.select_related('shop', 'user').prefetch_related(Prefetch('items', queryset=items))
+
+
 class Order(models.Model):
     """
     Order Model
@@ -41,6 +70,17 @@ class Order(models.Model):
         ('cancelled', 'Cancelled'),
     )
     
+    # Status changes orders.services.change_status() allows: forward through
+    # the kitchen, or cancelled until completed. Closed orders stay closed.
+    TRANSITIONS = {
+        'pending': ('confirmed', 'preparing', 'ready', 'completed', 'cancelled'),
+        'confirmed': ('preparing', 'ready', 'completed', 'cancelled'),
+        'preparing': ('ready', 'completed', 'cancelled'),
+        'ready': ('completed', 'cancelled'),
+        'completed': (),
+        'cancelled': (),
+    }
+    
     PAYMENT_STATUS_CHOICES = (
         ('pending', 'Pending'),
         ('paid', 'Paid'),
@@ -66,17 +106,36 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = OrderQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Order'
         verbose_name_plural = 'Orders'
         ordering = ['-created_at']
+        # Keyset pages read (created_at, id) newest first: an ascending index
+        # scanned backwards yields exactly that order, rowid included
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='order_user_created'),
+            models.Index(fields=['shop', 'created_at'], name='order_shop_created'),
+            models.Index(fields=['shop', 'status'], name='order_shop_status'),
+        ]
     
     def __str__(self):
         return f"Order #{self.order_number} - {self.user.username}"
     
     @property
     def is_active(self):
-        return self.status not in ['completed', 'cancelled']
+        return self.status not in CLOSED_STATUSES
+    
+    def can_change_to(self, status):
+        return status in self.TRANSITIONS.get(self.status, ())
+    
+    @property
+    def next_status_choices(self):
+        """
+        (value, label) of the statuses this order can move to
+        """
+        return [(value, label) for value, label in self.STATUS_CHOICES if self.can_change_to(value)]
 
 
 class OrderItem(models.Model):
@@ -0,0 +1,196 @@
+# orders/order_numbers.py
+
+"""
+Order number generation
+
+ORDER_NUMBER_GENERATOR names the class used to mint order numbers. It is
+instantiated once per process and called with no arguments for every order.
+
+The default SnowflakeGenerator needs no database round trip. Each number is
+a 63-bit integer made of
+
+    41 bits  milliseconds since ORDER_NUMBER_EPOCH_MS (about 69 years)
+    10 bits  worker id, unique per running process
+    12 bits  per-process sequence within the millisecond
+
+written as 13 zero-padded base-36 digits after "ORD" (16 characters), so
+numbers sort in creation order. Two processes can only collide if they share
+a worker id, and the worker id is resolved to guarantee they do not:
+
+    1. ORDER_NUMBER_WORKER_ID (setting or environment variable), for
+       deployments that assign ids themselves, e.g. one range per host
+    2. otherwise an exclusive lock on one of 1024 lease files in
+       ORDER_NUMBER_LEASE_DIR, held for the life of the process
+    3. otherwise (no fcntl, e.g. Windows) the process id modulo 1024
+"""
+
+import os
+import random
+import tempfile
+import threading
+import time
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+DEFAULT_GENERATOR = 'orders.order_numbers.SnowflakeGenerator'
+
+# 2026-01-01T00:00:00Z
+DEFAULT_EPOCH_MS = 1767225600000
+
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+PREFIX = 'ORD'
+DIGITS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+WIDTH = 13  # base-36 digits needed for any 63-bit value
+
+
+class WorkerLeaseError(Exception):
+    """
+    Raised when every worker id on this host is already leased
+    """
+
+
+def encode(number):
+    """
+    Fixed-width base-36, so string order matches numeric order
+    """
+    digits = []
+    while number:
+        number, remainder = divmod(number, 36)
+        digits.append(DIGITS[remainder])
+    return ''.join(reversed(digits)).rjust(WIDTH, '0')
+
+
+def decode(text):
+    return int(text, 36)
+
+
+def lease_worker_id(lease_dir):
+    """
+    Lock the first free lease file and return (worker_id, open file)
+    The lock lives as long as the file stays open, i.e. the process.
+    """
+    os.makedirs(lease_dir, exist_ok=True)
+    for worker_id in range(MAX_WORKER_ID + 1):
+        lease = open(os.path.join(lease_dir, f'worker-{worker_id}.lock'), 'a')
+        try:
+            fcntl.flock(lease, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lease.close()
+            continue
+        return worker_id, lease
+    raise WorkerLeaseError(f'All {MAX_WORKER_ID + 1} order number worker ids in {lease_dir} are taken.')
+
+
+class SnowflakeGenerator:
+    """
+    Monotonic, collision-free order numbers without touching the database
+    """
+
+    def __init__(self, worker_id=None, lease_dir=None, epoch_ms=None):
+        self._configured_worker_id = worker_id
+        self._lease_dir = lease_dir
+        self._epoch_ms = epoch_ms if epoch_ms is not None else getattr(
+            settings, 'ORDER_NUMBER_EPOCH_MS', DEFAULT_EPOCH_MS
+        )
+        self._lock = threading.Lock()
+        self._pid = None
+        self._lease = None
+
+    def _resolve_worker_id(self):
+        worker_id = self._configured_worker_id
+        if worker_id is None:
+            worker_id = getattr(settings, 'ORDER_NUMBER_WORKER_ID', None)
+        if worker_id is None:
+            worker_id = os.environ.get('ORDER_NUMBER_WORKER_ID')
+        if worker_id is not None:
+            worker_id = int(worker_id)
+            if not 0 <= worker_id <= MAX_WORKER_ID:
+                raise ValueError(f'ORDER_NUMBER_WORKER_ID must be between 0 and {MAX_WORKER_ID}.')
+            return worker_id
+
+        if fcntl is not None:
+            lease_dir = self._lease_dir or getattr(settings, 'ORDER_NUMBER_LEASE_DIR', None) or os.path.join(
+                tempfile.gettempdir(), 'foodcourt-order-workers'
+            )
+            worker_id, self._lease = lease_worker_id(lease_dir)
+            return worker_id
+        return os.getpid() & MAX_WORKER_ID
+
+    def _start(self):
+        """
+        (Re)initialise for the current process, including after a fork,
+        where the parent's worker id and sequence must not be reused
+        """
+        self._pid = os.getpid()
+        self._lease = None
+        self.worker_id = self._resolve_worker_id()
+        self._last_ms = -1
+        self._sequence = 0
+
+    def next_id(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._start()
+
+            now_ms = time.time_ns() // 1_000_000 - self._epoch_ms
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._sequence = 0
+            else:
+                # Same millisecond, or the wall clock stepped back: keep
+                # counting on the last timestamp; on overflow borrow the next
+                # millisecond rather than sleeping
+                self._sequence += 1
+                if self._sequence > MAX_SEQUENCE:
+                    self._last_ms += 1
+                    self._sequence = 0
+
+            return (self._last_ms << (WORKER_BITS + SEQUENCE_BITS)) | (self.worker_id << SEQUENCE_BITS) | self._sequence
+
+    def __call__(self):
+        return PREFIX + encode(self.next_id())
+
+
+class TimestampRandomGenerator:
+    """
+    The original scheme: ORD + second timestamp + 4 random digits
+    Can collide within the same second; kept for deployments that need it.
+    """
+
+    def __call__(self):
+        timestamp = timezone.now().strftime('%Y%m%d%H%M%S')
+        return f"ORD{timestamp}{random.randint(0, 9999):04d}"
+
+
+_generator = None
+_generator_lock = threading.Lock()
+
+
+def get_generator():
+    """
+    Return the process-wide generator named by ORDER_NUMBER_GENERATOR
+    """
+    global _generator
+    if _generator is None:
+        with _generator_lock:
+            if _generator is None:
+                path = getattr(settings, 'ORDER_NUMBER_GENERATOR', DEFAULT_GENERATOR)
+                _generator = import_string(path)()
+    return _generator
+
+
+def generate_order_number():
+    """
+    Generate unique order number
+    """
+    return get_generator()()
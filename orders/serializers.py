@@ -0,0 +1,28 @@
+# orders/serializers.py
+
+"""
+Plain-dict serialization for the JSON variant of order listings
+Keys are part of the public contract: add new ones, never rename.
+"""
+
+
+def serialize_order(order):
+    return {
+        'id': order.id,
+        'order_number': order.order_number,
+        'status': order.status,
+        'payment_status': order.payment_status,
+        'total_amount': str(order.total_amount),
+        'shop': {'id': order.shop_id, 'name': order.shop.shop_name},
+        'customer': order.user.username,
+        'items': [
+            {
+                'food_item': item.food_item_id,
+                'name': item.food_item.name,
+                'quantity': item.quantity,
+                'price': str(item.price),
+            }
+            for item in order.items.all()
+        ],
+        'created_at': order.created_at.isoformat(),
+    }
@@ -0,0 +1,180 @@
+# orders/services.py
+
+"""
+Order placement and status changes
+
+place_order() turns a student's cart lines for one shop into an order in a
+fixed number of queries, however many lines the cart holds:
+
+    1. read the cart lines, current prices and stock (rows locked where supported)
+    2. take the stock of the items that track it (menu.stock), if any: one
+       read of what sells out, one guarded UPDATE for every line, and an
+       available-items counter update if anything sold out
+    3. insert the order
+    4. insert every order item in one bulk INSERT
+    5. set total_amount from SUM(price * quantity) in the database
+    6. read the total back
+    7. delete the ordered cart lines in one DELETE
+    8-9. bump the shop and global dashboard counters
+
+If any line is short of stock the whole order is refused (OutOfStockError)
+and nothing is written. Once the transaction commits, place_order()
+publishes an order.created event for the shop's live order stream
+(orders.events).
+
+change_status() moves an order along Order.TRANSITIONS with one conditional
+UPDATE ... WHERE status = <the status it was read with>, so a student
+cancelling while the vendor starts preparing cannot both win: the second
+write matches no row and raises StaleOrderError instead of overwriting the
+first. Admin edits are corrections and still save() directly.
+
+Both run as one transaction, retried when SQLite stays locked (foodcourt.db).
+"""
+
+import copy
+from django.db import transaction
+from django.utils import timezone
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum
+from dashboard import stats
+from foodcourt.db import retry_when_locked
+from menu import stock
+from .models import Cart, Order, OrderItem
+from .order_numbers import generate_order_number
+from . import events
+
+
+# Statements place_order() runs inside an outer transaction (so in tests):
+# steps 1 and 3-9 plus a savepoint and its release
+PLACE_ORDER_QUERIES = 10
+# At most this many more for step 2: its own savepoint pair, the read, the
+# UPDATE and the counter update
+PLACE_ORDER_STOCK_QUERIES = 5
+
+
+class EmptyCartError(Exception):
+    """
+    Raised when the user has nothing in their cart for the shop
+    """
+
+
+class InvalidTransition(Exception):
+    """
+    Raised when Order.TRANSITIONS does not allow the status change
+    """
+
+
+class StaleOrderError(Exception):
+    """
+    Raised when the order's status changed after it was read
+    The order passed to change_status() is refreshed to the current status.
+    """
+
+
+def order_total_subquery():
+    """
+    SUM(price * quantity) of an order's items, correlated to the outer Order
+    """
+    line_total = ExpressionWrapper(
+        F('price') * F('quantity'),
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+    totals = (
+        OrderItem.objects.filter(order=OuterRef('pk'))
+        .order_by()
+        .values('order')
+        .annotate(total=Sum(line_total))
+        .values('total')
+    )
+    return Subquery(totals, output_field=DecimalField(max_digits=10, decimal_places=2))
+
+
+@retry_when_locked
+def place_order(user, shop, special_instructions=''):
+    """
+    Create an order from the user's cart lines for shop and clear those lines
+    Raises EmptyCartError if there is nothing to order and
+    menu.stock.OutOfStockError if any item is short.
+    """
+    with transaction.atomic():
+        # Lock the cart lines and the prices they are ordered at
+        lines = list(
+            Cart.objects.filter(user=user, food_item__shop=shop)
+            .select_for_update(of=('self', 'food_item'))
+            .values_list('id', 'food_item_id', 'quantity', 'food_item__price', 'food_item__stock')
+        )
+        if not lines:
+            raise EmptyCartError()
+
+        stock.take({
+            food_item_id: quantity
+            for _, food_item_id, quantity, _, in_stock in lines
+            if in_stock is not None
+        })
+
+        order = Order.objects.create(
+            order_number=generate_order_number(),
+            user=user,
+            shop=shop,
+            total_amount=0,
+            special_instructions=special_instructions,
+            status='pending',
+            payment_status='pending'
+        )
+
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, food_item_id=food_item_id, quantity=quantity, price=price)
+            for _, food_item_id, quantity, price, _ in lines
+        ])
+
+        Order.objects.filter(pk=order.pk).update(total_amount=order_total_subquery())
+        order.refresh_from_db(fields=['total_amount'])
+
+        # Only the lines that were read; anything added meanwhile stays in the cart
+        Cart.objects.filter(id__in=[line[0] for line in lines]).delete()
+
+        stats.record_order_placed(order)
+        events.publish_order_event(order, events.ORDER_CREATED)
+
+    return order
+
+
+def change_status(order, status):
+    """
+    Move order from the status it was read with to status
+    Writes status and updated_at only, and only if the row still has the old
+    status; records the change in the dashboard counters and publishes an
+    order.status_changed event in the same transaction. Cancelling puts the
+    order's portions back in stock. The order passed in takes the new status
+    once the change is written.
+    """
+    old_status = order.status
+    if not order.can_change_to(status):
+        raise InvalidTransition(f'{old_status} -> {status}')
+
+    changed = _write_status(order, old_status, status)
+    order.status = changed.status
+    order.updated_at = changed.updated_at
+    return order
+
+
+@retry_when_locked
+def _write_status(order, old_status, status):
+    """
+    The transaction of change_status(), retried as a whole
+    Works on a copy, so a retry starts from the order as it was read.
+    Returns the copy, with the new status.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        changed = Order.objects.filter(pk=order.pk, status=old_status).update(status=status, updated_at=now)
+        if not changed:
+            order.refresh_from_db(fields=['status', 'updated_at'])
+            raise StaleOrderError(f'{old_status} -> {status}, but the order is now {order.status}')
+        changed = copy.copy(order)
+        changed.status = status
+        changed.updated_at = now
+        if status == 'cancelled':
+            stock.put_back(dict(OrderItem.objects.filter(order=order).values_list('food_item_id', 'quantity')))
+        stats.record_order_status_changed(changed, old_status)
+        events.publish_order_event(changed, events.ORDER_STATUS_CHANGED, old_status)
+    return changed
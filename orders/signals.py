@@ -0,0 +1,14 @@
+# orders/signals.py
+
+from django.contrib.auth.signals import user_logged_out
+from django.dispatch import receiver
+from .cart import get_cart
+
+
+@receiver(user_logged_out)
+def persist_cart(sender, request, user, **kwargs):
+    """
+    Write a session-held cart to the database before the session is flushed
+    """
+    if user is not None and user.is_student:
+        get_cart(request).persist()
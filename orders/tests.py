@@ -1,3 +1,800 @@
-from django.test import TestCase
+import asyncio
+import multiprocessing
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from decimal import Decimal
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from accounts.models import User
+from vendors.models import Shop
+from menu.models import FoodItem
+from menu import stock
+from menu.stock import OutOfStockError
+from dashboard import stats
+from dashboard.models import GlobalStats, ShopStats
+from foodcourt.db import retry_when_locked
+from perf.testing import QueryBudgetTestMixin
+from .models import Cart, Order, OrderItem
+from .cart import DatabaseCartStore, add_items
+from .services import EmptyCartError, InvalidTransition, StaleOrderError, change_status, place_order
+from . import events, order_numbers
 
-# Create your tests here.
+
+class OrdersTestMixin:
+    """
+    Shared fixtures: one approved shop with a couple of items and a student
+    """
+
+    def setUp(self):
+        self.vendor = User.objects.create_user('vendor', role='vendor')
+        self.student = User.objects.create_user('student', role='student')
+        self.shop = Shop.objects.create(
+            vendor=self.vendor, shop_name='Dosa Corner', description='South Indian',
+            phone='123', email='dosa@example.com', address='Block A',
+            status='approved', is_active=True,
+        )
+        self.dosa = FoodItem.objects.create(shop=self.shop, name='Masala Dosa', description='Crispy', price='60.00')
+        self.idli = FoodItem.objects.create(shop=self.shop, name='Idli', description='Soft', price='30.00')
+
+    def create_order(self, number, **kwargs):
+        order = Order.objects.create(
+            order_number=f'ORD{number}', user=self.student, shop=self.shop,
+            total_amount=Decimal('60.00'), **kwargs
+        )
+        OrderItem.objects.create(order=order, food_item=self.dosa, quantity=1, price=Decimal('60.00'))
+        return order
+
+
+class OrderQuerySetTests(OrdersTestMixin, TestCase):
+    def test_filters(self):
+        pending = self.create_order(1)
+        self.create_order(2, status='completed')
+        self.assertEqual(Order.objects.for_student(self.student).count(), 2)
+        self.assertEqual(Order.objects.for_vendor(self.vendor).count(), 2)
+        self.assertFalse(Order.objects.for_vendor(self.student).exists())
+        self.assertEqual(list(Order.objects.active()), [pending])
+
+    def test_with_details(self):
+        self.create_order(1)
+        with self.assertNumQueries(2):
+            order = Order.objects.with_details().get()
+            self.assertEqual(order.shop.shop_name, 'Dosa Corner')
+            self.assertEqual([item.food_item.name for item in order.items.all()], ['Masala Dosa'])
+
+
+class MyOrdersPaginationTests(OrdersTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.orders = [self.create_order(number) for number in range(45)]
+        # Identical timestamps force the id tiebreaker
+        Order.objects.update(created_at=timezone.now())
+        self.expected = [order.order_number for order in sorted(self.orders, key=lambda o: -o.id)]
+
+    def collect(self, url_name, response_key):
+        self.client.force_login(self.student)
+        seen, cursor, pages = [], None, 0
+        while True:
+            params = {'cursor': cursor} if cursor else {}
+            response = self.client.get(reverse(url_name), params)
+            pages += 1
+            if url_name.endswith('_json'):
+                data = response.json()
+                seen += [order['order_number'] for order in data['results']]
+                cursor = data['next']
+            else:
+                seen += [order.order_number for order in response.context[response_key]]
+                cursor = response.context['page'].next_cursor
+            if cursor is None:
+                return seen, pages
+
+    def test_pages_cover_every_order_once(self):
+        seen, pages = self.collect('my_orders', 'orders')
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(pages, 3)
+
+    def test_json_variant_matches_html(self):
+        seen, _ = self.collect('my_orders_json', None)
+        self.assertEqual(seen, self.expected)
+
+    def test_previous_cursor_returns_to_earlier_page(self):
+        self.client.force_login(self.student)
+        first = self.client.get(reverse('my_orders_json')).json()
+        second = self.client.get(reverse('my_orders_json'), {'cursor': first['next']}).json()
+        third = self.client.get(reverse('my_orders_json'), {'cursor': second['next']}).json()
+        back = self.client.get(reverse('my_orders_json'), {'cursor': third['previous']}).json()
+        self.assertEqual(back['results'], second['results'])
+        back = self.client.get(reverse('my_orders_json'), {'cursor': back['previous']}).json()
+        self.assertEqual(back['results'], first['results'])
+        self.assertIsNone(back['previous'])
+
+    def test_page_query_count_is_constant(self):
+        self.client.force_login(self.student)
+        first = self.client.get(reverse('my_orders_json')).json()
+        # session, user, orders page, order items joined to their food items
+        with self.assertNumQueries(4):
+            self.client.get(reverse('my_orders_json'), {'cursor': first['next']})
+
+    def test_garbage_cursor_serves_first_page(self):
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('my_orders_json'), {'cursor': 'not-a-cursor!'})
+        self.assertEqual(response.json()['results'][0]['order_number'], self.expected[0])
+
+
+class OrderStatusTests(OrdersTestMixin, TestCase):
+    def test_transition_table(self):
+        order = self.create_order(1)
+        change_status(order, 'preparing')
+        change_status(order, 'completed')
+        with self.assertRaises(InvalidTransition):
+            change_status(order, 'pending')
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'completed')
+        self.assertEqual(order.next_status_choices, [])
+
+    def test_update_writes_only_status(self):
+        order = self.create_order(1)
+        with CaptureQueriesContext(connection) as captured:
+            change_status(order, 'confirmed')
+        update = next(query['sql'] for query in captured if query['sql'].startswith('UPDATE "orders_order"'))
+        self.assertIn('"status" = ', update)
+        self.assertNotIn('total_amount', update)
+        self.assertTrue(update.endswith("\"orders_order\".\"status\" = 'pending')"), update)
+
+    def test_stale_change_is_not_applied(self):
+        order = self.create_order(1)
+        Order.objects.filter(pk=order.pk).update(status='ready')
+        with self.assertRaises(StaleOrderError):
+            change_status(order, 'cancelled')
+        self.assertEqual(order.status, 'ready')
+        self.assertEqual(Order.objects.get(pk=order.pk).status, 'ready')
+
+    def test_stale_cancel_is_reported(self):
+        order = self.create_order(1)
+
+        def vendor_first(order, status):
+            # The vendor's update lands between the view's read and its write
+            Order.objects.filter(pk=order.pk).update(status='ready')
+            return change_status(order, status)
+
+        self.client.force_login(self.student)
+        with mock.patch('orders.views.change_status', side_effect=vendor_first):
+            response = self.client.post(reverse('cancel_order', args=[order.id]), follow=True)
+        self.assertContains(response, 'was changed to Ready for Pickup while you were viewing it')
+        self.assertEqual(Order.objects.get(pk=order.pk).status, 'ready')
+
+    def test_vendor_cannot_reopen(self):
+        order = self.create_order(1, status='completed')
+        self.client.force_login(self.vendor)
+        response = self.client.post(reverse('update_order_status', args=[order.id]), {'status': 'pending'}, follow=True)
+        self.assertContains(response, 'A completed order cannot be changed to pending.')
+
+    def test_other_vendor_is_denied(self):
+        order = self.create_order(1)
+        other_vendor = User.objects.create_user('other', role='vendor')
+        Shop.objects.create(
+            vendor=other_vendor, shop_name='Chai Point', description='Tea', phone='1',
+            email='chai@example.com', address='Block B', status='approved', is_active=True,
+        )
+        self.client.force_login(other_vendor)
+        response = self.client.get(reverse('order_detail', args=[order.id]))
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        response = self.client.post(reverse('update_order_status', args=[order.id]), {'status': 'confirmed'})
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        self.assertEqual(Order.objects.get(pk=order.pk).status, 'pending')
+        response = self.client.get(reverse('my_orders_json'))
+        self.assertEqual(response.json()['results'], [])
+
+        self.client.force_login(self.vendor)
+        self.assertContains(self.client.get(reverse('order_detail', args=[order.id])), order.order_number)
+
+
+class ConcurrentOrderStatusTests(OrdersTestMixin, TransactionTestCase):
+    def race(self, targets):
+        """
+        Every thread reads the order, then all try their change at once
+        Returns {target: 'ok' | 'stale'}.
+        """
+        order_id = self.create_order(1).id
+        ready = threading.Barrier(len(targets))
+        outcomes = {}
+
+        def attempt(target):
+            try:
+                order = Order.objects.get(pk=order_id)
+                ready.wait()
+                try:
+                    change_status(order, target)
+                    outcomes[target] = 'ok'
+                except StaleOrderError:
+                    outcomes[target] = 'stale'
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=attempt, args=(target,)) for target in targets]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return order_id, outcomes
+
+    def test_cancel_racing_preparing_has_one_winner(self):
+        order_id, outcomes = self.race(['cancelled', 'preparing'])
+        self.assertCountEqual(outcomes.values(), ['ok', 'stale'])
+        winner = next(target for target, outcome in outcomes.items() if outcome == 'ok')
+        self.assertEqual(Order.objects.get(pk=order_id).status, winner)
+
+    def test_many_writers(self):
+        targets = ['confirmed', 'preparing', 'ready', 'completed', 'cancelled']
+        order_id, outcomes = self.race(targets)
+        self.assertEqual(sorted(outcomes.values()), ['ok'] + ['stale'] * 4)
+        winner = next(target for target, outcome in outcomes.items() if outcome == 'ok')
+        self.assertEqual(Order.objects.get(pk=order_id).status, winner)
+
+
+@override_settings(DB_LOCK_BACKOFF=0)
+class ChangeStatusRetryTests(OrdersTestMixin, TransactionTestCase):
+    def test_retry_starts_from_the_status_read(self):
+        FoodItem.objects.filter(pk=self.dosa.pk).update(stock=2)
+        order = self.create_order(1)
+        stats.reconcile()
+        record = stats.record_order_status_changed
+        seen = []
+
+        def locked_once(changed, old_status):
+            seen.append(old_status)
+            if len(seen) == 1:
+                raise OperationalError('database is locked')
+            record(changed, old_status)
+
+        with mock.patch.object(stats, 'record_order_status_changed', side_effect=locked_once):
+            change_status(order, 'cancelled')
+        self.assertEqual(seen, ['pending', 'pending'])
+        self.assertEqual(order.status, 'cancelled')
+        # The first attempt's stock and counter writes were rolled back
+        self.assertEqual(FoodItem.objects.get(pk=self.dosa.pk).stock, 3)
+        self.assertEqual(stats.reconcile(apply=False), [])
+
+
+# An overrun fails the checkout tests, as it would in development and CI
+@override_settings(QUERY_BUDGET_MODE='raise')
+class PlaceOrderTests(OrdersTestMixin, TestCase):
+    # cart read, order insert, item bulk insert, total update, total read,
+    # cart delete, shop + global counter updates, plus two savepoint statements
+    PLACE_ORDER_QUERIES = 10
+
+    def fill_cart(self, lines):
+        items = [
+            FoodItem(shop=self.shop, name=f'Item {number}', description='-', price=Decimal('10.50'))
+            for number in range(lines)
+        ]
+        FoodItem.objects.bulk_create(items)
+        Cart.objects.bulk_create([
+            Cart(user=self.student, food_item=item, quantity=number + 1)
+            for number, item in enumerate(FoodItem.objects.filter(name__startswith='Item '))
+        ])
+
+    def test_query_count_is_independent_of_basket_size(self):
+        # Counter rows exist on any live site; create them up front
+        stats.get_shop_stats(self.shop)
+        stats.get_global_stats()
+
+        for lines in (1, 25):
+            FoodItem.objects.filter(name__startswith='Item ').delete()
+            self.fill_cart(lines)
+            with self.assertNumQueries(self.PLACE_ORDER_QUERIES):
+                order = place_order(self.student, self.shop)
+            self.assertEqual(order.items.count(), lines)
+
+    def test_order_total_is_computed_in_database(self):
+        self.fill_cart(3)
+        order = place_order(self.student, self.shop, 'No onions')
+        # 10.50 * (1 + 2 + 3)
+        self.assertEqual(order.total_amount, Decimal('63.00'))
+        self.assertEqual(order.items.count(), 3)
+        self.assertEqual(order.special_instructions, 'No onions')
+        self.assertFalse(Cart.objects.filter(user=self.student).exists())
+
+    def test_other_shop_lines_stay_in_cart(self):
+        other_vendor = User.objects.create_user('other', role='vendor')
+        other_shop = Shop.objects.create(
+            vendor=other_vendor, shop_name='Chai Point', description='Tea', phone='1',
+            email='chai@example.com', address='Block B', status='approved', is_active=True,
+        )
+        chai = FoodItem.objects.create(shop=other_shop, name='Chai', description='Hot', price='15.00')
+        Cart.objects.create(user=self.student, food_item=chai, quantity=1)
+        Cart.objects.create(user=self.student, food_item=self.dosa, quantity=2)
+
+        order = place_order(self.student, self.shop)
+        self.assertEqual(order.total_amount, Decimal('120.00'))
+        self.assertEqual(list(Cart.objects.values_list('food_item', flat=True)), [chai.id])
+
+    def test_empty_cart(self):
+        with self.assertRaises(EmptyCartError):
+            place_order(self.student, self.shop)
+        self.assertFalse(Order.objects.exists())
+
+    def test_checkout_view(self):
+        Cart.objects.create(user=self.student, food_item=self.idli, quantity=4)
+        self.client.force_login(self.student)
+        self.assertContains(self.client.get(reverse('checkout', args=[self.shop.id])), 'Idli')
+        response = self.client.post(reverse('checkout', args=[self.shop.id]))
+        order = Order.objects.get()
+        self.assertRedirects(response, reverse('order_detail', args=[order.id]))
+        self.assertEqual(order.total_amount, Decimal('120.00'))
+
+
+
+@override_settings(QUERY_BUDGET_MODE='raise')
+class StockTests(QueryBudgetTestMixin, OrdersTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        FoodItem.objects.filter(pk=self.dosa.pk).update(stock=3, daily_stock=10)
+
+    def test_checkout_query_budget(self):
+        # Both cart stores, for a shop's first order (which creates the
+        # counter rows) and a later one, each selling out a stocked item
+        costs = []
+        for store in ('orders.cart.DatabaseCartStore', 'orders.cart.SessionCartStore'):
+            for first_order in (False, True):
+                with self.subTest(store=store, first_order=first_order), self.settings(CART_STORE=store):
+                    ShopStats.objects.all().delete()
+                    GlobalStats.objects.all().delete()
+                    if not first_order:
+                        stats.get_shop_stats(self.shop)
+                        stats.get_global_stats()
+                    FoodItem.objects.filter(pk=self.dosa.pk).update(stock=3, is_available=True, sold_out=False)
+                    self.client.force_login(self.student)
+                    self.client.get(reverse('add_to_cart', args=[self.dosa.id]))
+                    self.client.post(reverse('update_cart', args=[self.dosa.id]), {'quantity': 3})
+                    # Leaves a removal for the session store to persist
+                    self.client.get(reverse('add_to_cart', args=[self.idli.id]))
+                    self.client.get(reverse('remove_from_cart', args=[self.idli.id]))
+                    report = self.assertWithinBudget(self.client.post(reverse('checkout', args=[self.shop.id])))
+                    self.assertFalse(FoodItem.objects.get(pk=self.dosa.pk).is_available)
+                    costs.append(report.queries)
+                    self.client.logout()
+        # The budget covers the most expensive path with two spare
+        self.assertEqual(max(costs) + 2, report.budget.queries)
+
+    def test_checkout_takes_stock_and_sells_out(self):
+        Cart.objects.create(user=self.student, food_item=self.dosa, quantity=3)
+        Cart.objects.create(user=self.student, food_item=self.idli, quantity=5)
+        place_order(self.student, self.shop)
+        self.dosa.refresh_from_db()
+        self.idli.refresh_from_db()
+        self.assertEqual(self.dosa.stock, 0)
+        self.assertFalse(self.dosa.is_available)
+        self.assertIsNone(self.idli.stock)
+        self.assertTrue(self.idli.is_available)
+
+    def test_short_line_refuses_whole_order(self):
+        FoodItem.objects.filter(pk=self.idli.pk).update(stock=10)
+        Cart.objects.create(user=self.student, food_item=self.dosa, quantity=4)
+        Cart.objects.create(user=self.student, food_item=self.idli, quantity=2)
+        with self.assertRaises(OutOfStockError) as raised:
+            place_order(self.student, self.shop)
+        self.assertEqual([item.name for item in raised.exception.items], ['Masala Dosa'])
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(Cart.objects.count(), 2)
+        self.assertEqual(FoodItem.objects.get(pk=self.idli.pk).stock, 10)
+
+    def test_checkout_view_names_short_items(self):
+        Cart.objects.create(user=self.student, food_item=self.dosa, quantity=5)
+        self.client.force_login(self.student)
+        response = self.client.post(reverse('checkout', args=[self.shop.id]), follow=True)
+        self.assertRedirects(response, reverse('view_cart'))
+        self.assertContains(response, 'Not enough left of: Masala Dosa')
+
+    def test_cancel_puts_stock_back(self):
+        Cart.objects.create(user=self.student, food_item=self.dosa, quantity=3)
+        order = place_order(self.student, self.shop)
+        change_status(order, 'cancelled')
+        self.dosa.refresh_from_db()
+        self.assertEqual(self.dosa.stock, 3)
+        self.assertTrue(self.dosa.is_available)
+
+    def test_daily_reset(self):
+        FoodItem.objects.filter(pk=self.dosa.pk).update(stock=0, is_available=False, sold_out=True)
+        call_command('reset_daily_stock', stdout=StringIO())
+        self.dosa.refresh_from_db()
+        self.assertEqual(self.dosa.stock, 10)
+        self.assertTrue(self.dosa.is_available)
+        self.assertFalse(self.dosa.sold_out)
+        self.assertIsNone(FoodItem.objects.get(pk=self.idli.pk).stock)
+
+    def test_items_switched_off_by_hand_stay_off(self):
+        Cart.objects.create(user=self.student, food_item=self.dosa, quantity=3)
+        order = place_order(self.student, self.shop)
+        self.dosa.refresh_from_db()
+        self.assertTrue(self.dosa.sold_out)
+        # The vendor switches it back on, then off again
+        for is_available in (True, False):
+            self.dosa.is_available = is_available
+            self.dosa.save()
+        change_status(order, 'cancelled')
+        stock.reset_daily()
+        self.dosa.refresh_from_db()
+        self.assertEqual(self.dosa.stock, 10)
+        self.assertFalse(self.dosa.is_available)
+
+    def test_counters_follow_stock(self):
+        stats.reconcile()
+        Cart.objects.create(user=self.student, food_item=self.dosa, quantity=3)
+        order = place_order(self.student, self.shop)
+        self.assertEqual(stats.get_shop_stats(self.shop).available_food_items, 1)
+        self.assertEqual(stats.reconcile(apply=False), [])
+        change_status(order, 'cancelled')
+        self.assertEqual(stats.get_shop_stats(self.shop).available_food_items, 2)
+        self.assertEqual(stats.reconcile(apply=False), [])
+
+        Cart.objects.create(user=self.student, food_item=self.dosa, quantity=3)
+        place_order(self.student, self.shop)
+        stock.reset_daily()
+        self.assertEqual(stats.reconcile(apply=False), [])
+
+
+@unittest.skipIf(connection.vendor == 'sqlite' and connection.is_in_memory_db(), 'needs a file-backed database')
+class ConcurrentStockTests(OrdersTestMixin, TransactionTestCase):
+    def test_no_oversell(self):
+        students, portions = 20, 30
+        FoodItem.objects.filter(pk=self.dosa.pk).update(stock=portions)
+        users = [User.objects.create_user(f'hungry{number}', role='student') for number in range(students)]
+        Cart.objects.bulk_create([Cart(user=user, food_item=self.dosa, quantity=2) for user in users])
+        ready = threading.Barrier(students)
+        outcomes = []
+
+        def checkout(user):
+            try:
+                ready.wait()
+                # Checkouts queue for the write lock (foodcourt.db)
+                place_order(user, self.shop)
+                outcomes.append('ok')
+            except OutOfStockError:
+                outcomes.append('short')
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=checkout, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(outcomes.count('ok'), portions // 2)
+        self.assertEqual(outcomes.count('short'), students - portions // 2)
+        self.assertEqual(Order.objects.count(), portions // 2)
+        self.dosa.refresh_from_db()
+        self.assertEqual(self.dosa.stock, 0)
+        self.assertFalse(self.dosa.is_available)
+
+
+class DatabaseLockTests(SimpleTestCase):
+    def flaky(self, *errors):
+        calls = mock.Mock(side_effect=[*errors, 'done'])
+        return retry_when_locked(calls), calls
+
+    def test_retries_a_locked_transaction(self):
+        func, calls = self.flaky(OperationalError('database is locked'), OperationalError('database is locked'))
+        with mock.patch('foodcourt.db.time.sleep') as sleep:
+            self.assertEqual(func(), 'done')
+        self.assertEqual(calls.call_count, 3)
+        self.assertEqual(sleep.call_count, 2)
+
+    @override_settings(DB_LOCK_RETRIES=1)
+    def test_gives_up(self):
+        func, calls = self.flaky(*[OperationalError('database is locked')] * 2)
+        with mock.patch('foodcourt.db.time.sleep'), self.assertRaises(OperationalError):
+            func()
+        self.assertEqual(calls.call_count, 2)
+
+    def test_other_errors_and_outer_transactions_are_not_retried(self):
+        func, calls = self.flaky(OperationalError('no such table: orders_order'))
+        with self.assertRaises(OperationalError):
+            func()
+        func, calls = self.flaky(OperationalError('database is locked'))
+        with mock.patch.object(connection, 'in_atomic_block', True), self.assertRaises(OperationalError):
+            func()
+        self.assertEqual(calls.call_count, 1)
+
+
+class ConnectionSetupTests(TransactionTestCase):
+    def test_pragmas_and_immediate_transactions(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+
+
+@override_settings(QUERY_BUDGET_MODE='raise')
+class CartStoreTests(OrdersTestMixin, TestCase):
+    def exercise(self):
+        self.client.force_login(self.student)
+        self.client.get(reverse('add_to_cart', args=[self.dosa.id]))
+        self.client.get(reverse('add_to_cart', args=[self.dosa.id]))
+        self.client.get(reverse('add_to_cart', args=[self.idli.id]))
+        self.client.post(reverse('update_cart', args=[self.idli.id]), {'quantity': 3})
+        response = self.client.get(reverse('view_cart'))
+        return {item.food_item.name: item.quantity for item in response.context['cart_items']}
+
+    def test_database_store_writes_every_change(self):
+        with self.settings(CART_STORE='orders.cart.DatabaseCartStore'):
+            self.assertEqual(self.exercise(), {'Masala Dosa': 2, 'Idli': 3})
+            self.assertEqual(Cart.objects.get(food_item=self.idli).quantity, 3)
+            self.client.get(reverse('remove_from_cart', args=[self.dosa.id]))
+            self.assertFalse(Cart.objects.filter(food_item=self.dosa).exists())
+
+    def test_session_store_writes_at_logout(self):
+        with self.settings(CART_STORE='orders.cart.SessionCartStore'):
+            self.assertEqual(self.exercise(), {'Masala Dosa': 2, 'Idli': 3})
+            self.assertFalse(Cart.objects.exists())
+            self.client.get(reverse('logout'))
+            self.assertEqual(
+                dict(Cart.objects.values_list('food_item__name', 'quantity')),
+                {'Masala Dosa': 2, 'Idli': 3},
+            )
+            # The next session starts from the persisted lines
+            self.client.force_login(self.student)
+            response = self.client.get(reverse('view_cart'))
+            self.assertEqual(response.context['item_count'], 2)
+
+    def test_session_store_checkout(self):
+        with self.settings(CART_STORE='orders.cart.SessionCartStore'):
+            self.exercise()
+            response = self.client.post(reverse('checkout', args=[self.shop.id]))
+            order = Order.objects.get()
+            self.assertRedirects(response, reverse('order_detail', args=[order.id]))
+            self.assertEqual(order.total_amount, Decimal('210.00'))
+            self.assertEqual(self.client.get(reverse('view_cart')).context['item_count'], 0)
+
+    def test_session_store_persists_periodically(self):
+        with self.settings(CART_STORE='orders.cart.SessionCartStore', CART_PERSIST_INTERVAL=0):
+            self.exercise()
+            self.assertEqual(Cart.objects.get(food_item=self.idli).quantity, 3)
+
+    def test_session_store_keeps_rows_it_did_not_remove(self):
+        with self.settings(CART_STORE='orders.cart.SessionCartStore'):
+            self.exercise()
+            # Added from another device after this session loaded the cart
+            vada = FoodItem.objects.create(shop=self.shop, name='Medu Vada', description='Fried', price='25.00')
+            Cart.objects.create(user=self.student, food_item=vada, quantity=1)
+            Cart.objects.create(user=self.student, food_item=self.dosa, quantity=2)
+            self.client.get(reverse('remove_from_cart', args=[self.dosa.id]))
+            self.client.get(reverse('logout'))
+            self.assertEqual(
+                dict(Cart.objects.values_list('food_item__name', 'quantity')),
+                {'Idli': 3, 'Medu Vada': 1},
+            )
+
+    def test_session_store_removes_deleted_items(self):
+        with self.settings(CART_STORE='orders.cart.SessionCartStore'):
+            self.exercise()
+            url = reverse('remove_from_cart', args=[self.dosa.id])
+            self.dosa.delete()
+            response = self.client.get(url, follow=True)
+            self.assertContains(response, 'Item removed from cart!')
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 404)
+
+    def test_missing_line_is_404(self):
+        self.client.force_login(self.student)
+        response = self.client.post(reverse('update_cart', args=[self.dosa.id]), {'quantity': 2})
+        self.assertEqual(response.status_code, 404)
+
+
+
+class CartUpsertTests(OrdersTestMixin, TestCase):
+    def store(self):
+        return DatabaseCartStore(mock.Mock(user=self.student))
+
+    def test_add_to_cart_queries(self):
+        self.client.force_login(self.student)
+        self.client.get(reverse('add_to_cart', args=[self.dosa.id]))
+        # session, user, the joined availability lookup, the upsert
+        with self.assertNumQueries(4):
+            self.client.get(reverse('add_to_cart', args=[self.dosa.id]))
+        self.assertEqual(Cart.objects.get(food_item=self.dosa).quantity, 2)
+
+    def test_batch_skips_unorderable_items(self):
+        closed = Shop.objects.create(
+            vendor=User.objects.create_user('closed', role='vendor'), shop_name='Closed', description='-',
+            phone='1', email='closed@example.com', address='-', status='blocked',
+        )
+        vada = FoodItem.objects.create(shop=closed, name='Vada', description='Fried', price='20.00')
+        Cart.objects.create(user=self.student, food_item=self.dosa, quantity=1)
+        with self.assertNumQueries(2):
+            added, skipped = add_items(self.store(), {self.dosa.id: 2, self.idli.id: 1, vada.id: 1})
+        self.assertEqual({food_item.name: quantity for food_item, quantity in added.items()}, {'Masala Dosa': 3, 'Idli': 1})
+        self.assertEqual(skipped, [vada.id])
+
+    def test_line_added_meanwhile_is_incremented(self):
+        add_many = DatabaseCartStore.add_many
+
+        def other_click_first(store, quantities):
+            # A double click's first request lands between lookup and write
+            Cart.objects.create(user=self.student, food_item=self.dosa, quantity=1)
+            return add_many(store, quantities)
+
+        with mock.patch.object(DatabaseCartStore, 'add_many', other_click_first):
+            added, _ = add_items(self.store(), {self.dosa.id: 1})
+        self.assertEqual(list(added.values()), [2])
+        self.assertEqual(Cart.objects.get(food_item=self.dosa).quantity, 2)
+
+    def test_reorder(self):
+        order = self.create_order(1, status='completed')
+        OrderItem.objects.create(order=order, food_item=self.idli, quantity=2, price=Decimal('30.00'))
+        self.client.force_login(self.student)
+        self.client.post(reverse('reorder', args=[order.id]))
+        self.assertEqual(dict(Cart.objects.values_list('food_item__name', 'quantity')), {'Masala Dosa': 1, 'Idli': 2})
+
+
+class CartBadgeTests(OrdersTestMixin, TestCase):
+    PAGES = ['home', 'browse_menu', 'shop_list', 'dashboard', 'my_orders', 'profile']
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        Cart.objects.create(user=self.student, food_item=self.dosa, quantity=2)
+        self.client.force_login(self.student)
+
+    def test_warm_badge_costs_no_queries(self):
+        for name in self.PAGES:
+            self.client.get(reverse(name))
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse(name))
+            self.assertEqual(response.status_code, 200, name)
+            self.assertContains(response, 'title="₹120.00"')
+            cart_queries = [query['sql'] for query in queries if 'orders_cart' in query['sql']]
+            self.assertEqual(cart_queries, [], name)
+
+    def test_cart_changes_refresh_badge(self):
+        self.client.get(reverse('home'))
+        self.client.get(reverse('add_to_cart', args=[self.idli.id]))
+        self.assertContains(self.client.get(reverse('home')), 'title="₹150.00"')
+        self.client.get(reverse('clear_cart'))
+        self.assertNotContains(self.client.get(reverse('home')), 'title="₹')
+
+
+def _generate_order_numbers(lease_dir, count):
+    generator = order_numbers.SnowflakeGenerator(lease_dir=lease_dir)
+    return [generator() for _ in range(count)]
+
+
+class OrderNumberTests(SimpleTestCase):
+    def test_numbers_are_unique_sorted_and_fit_the_column(self):
+        generator = order_numbers.SnowflakeGenerator(worker_id=7)
+        numbers = [generator() for _ in range(50000)]
+        self.assertEqual(len(set(numbers)), len(numbers))
+        self.assertEqual(numbers, sorted(numbers))
+        self.assertLessEqual(len(numbers[0]), Order._meta.get_field('order_number').max_length)
+        worker_id = (order_numbers.decode(numbers[0][3:]) >> order_numbers.SEQUENCE_BITS) & order_numbers.MAX_WORKER_ID
+        self.assertEqual(worker_id, 7)
+
+    def test_clock_going_backwards_stays_monotonic(self):
+        generator = order_numbers.SnowflakeGenerator(worker_id=1)
+        first = generator.next_id()
+        with mock.patch.object(order_numbers.time, 'time_ns', return_value=0):
+            second = generator.next_id()
+        self.assertGreater(second, first)
+
+    def test_leases_are_exclusive(self):
+        with tempfile.TemporaryDirectory() as lease_dir:
+            first, lease = order_numbers.lease_worker_id(lease_dir)
+            second, other = order_numbers.lease_worker_id(lease_dir)
+            self.assertNotEqual(first, second)
+            lease.close()
+            other.close()
+
+    @unittest.skipUnless(sys.platform.startswith('linux'), 'needs fork and fcntl')
+    def test_multiprocess_stress_has_no_collisions(self):
+        processes, per_process = 8, 250000
+        context = multiprocessing.get_context('fork')
+        with tempfile.TemporaryDirectory() as lease_dir, context.Pool(processes) as pool:
+            batches = pool.starmap(_generate_order_numbers, [(lease_dir, per_process)] * processes)
+        numbers = set()
+        for batch in batches:
+            numbers.update(batch)
+        self.assertEqual(len(numbers), processes * per_process)
+
+
+class OrderEventsTests(OrdersTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(events, '_broker', events.LocalBroker(buffer_size=10))
+        self.broker = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def read_events(self, response, count):
+        chunks = []
+        async for chunk in response.streaming_content:
+            chunks.append(chunk.decode())
+            if len(chunks) == count:
+                break
+        await response.streaming_content.aclose()
+        return chunks
+
+    def published(self):
+        return [(event.type, event.data['status']) for event in self.broker._buffers.get(events.shop_channel(self.shop.id), ())]
+
+    def test_views_publish_after_commit(self):
+        Cart.objects.create(user=self.student, food_item=self.dosa, quantity=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            order = place_order(self.student, self.shop)
+        self.client.force_login(self.vendor)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('update_order_status', args=[order.id]), {'status': 'preparing'})
+        self.client.force_login(self.student)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('cancel_order', args=[order.id]))
+        self.assertEqual(self.published(), [
+            (events.ORDER_CREATED, 'pending'),
+            (events.ORDER_STATUS_CHANGED, 'preparing'),
+            (events.ORDER_STATUS_CHANGED, 'cancelled'),
+        ])
+
+    async def test_stream_resumes_after_last_event_id(self):
+        first = self.broker.publish(events.shop_channel(self.shop.id), events.ORDER_CREATED, {'id': 1})
+        self.broker.publish(events.shop_channel(self.shop.id), events.ORDER_CREATED, {'id': 2})
+        await self.async_client.aforce_login(self.vendor)
+        response = await self.async_client.get(
+            reverse('order_events', args=[self.shop.id]), headers={'Last-Event-ID': str(first.id)}
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        retry, replayed = await self.read_events(response, 2)
+        self.assertTrue(retry.startswith('retry:'))
+        self.assertEqual(replayed, f'id: {first.id + 1}\nevent: order.created\ndata: {{"id": 2}}\n\n')
+
+    def test_ids_keep_increasing_across_restarts(self):
+        channel = events.shop_channel(self.shop.id)
+        seen = self.broker.publish(channel, events.ORDER_CREATED, {'id': 1})
+        restarted = events.LocalBroker(buffer_size=10)
+        after_restart = restarted.publish(channel, events.ORDER_CREATED, {'id': 2})
+        self.assertGreater(after_restart.id, seen.id)
+
+        async def resume():
+            subscription, missed = restarted.subscribe(channel, seen.id)
+            subscription.close()
+            return missed
+
+        self.assertEqual(asyncio.run(resume()), [after_restart])
+
+    def test_subscribers_on_closed_loops_are_dropped(self):
+        channel = events.shop_channel(self.shop.id)
+
+        async def subscribe():
+            return self.broker.subscribe(channel)
+
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(subscribe())
+        loop.close()
+        self.broker.publish(channel, events.ORDER_CREATED, {'id': 1})
+        self.assertNotIn(channel, self.broker._subscribers)
+
+    async def test_stream_sends_heartbeat_and_live_events(self):
+        await self.async_client.aforce_login(self.vendor)
+        with self.settings(ORDER_EVENTS_HEARTBEAT=0.01):
+            response = await self.async_client.get(reverse('order_events', args=[self.shop.id]))
+            stream = response.streaming_content
+            await anext(stream)  # retry
+            self.assertEqual(await anext(stream), b': heartbeat\n\n')
+            self.broker.publish(events.shop_channel(self.shop.id), events.ORDER_STATUS_CHANGED, {'id': 3})
+            chunk = await anext(stream)
+            while chunk == b': heartbeat\n\n':
+                chunk = await anext(stream)
+            self.assertIn(b'event: order.status_changed', chunk)
+            await stream.aclose()
+
+    async def test_other_users_are_refused(self):
+        await self.async_client.aforce_login(self.student)
+        response = await self.async_client.get(reverse('order_events', args=[self.shop.id]))
+        self.assertEqual(response.status_code, 403)
@@ -3,18 +3,30 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db import transaction
-from django.utils import timezone
+from django.conf import settings
+from django.db import OperationalError
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from decimal import Decimal
-import random
-import string
-from .models import Cart, Order, OrderItem
-from menu.models import FoodItem
+from .models import Order
+from .cart import SessionCartStore, add_items, get_cart
+from .serializers import serialize_order
+from .services import (
+    PLACE_ORDER_QUERIES, PLACE_ORDER_STOCK_QUERIES,
+    EmptyCartError, InvalidTransition, StaleOrderError, change_status, place_order,
+)
+from . import events
 from vendors.models import Shop
+from menu.stock import OutOfStockError
+from dashboard import stats
+from foodcourt.pagination import KeysetPaginator
+from perf.budget import query_budget
+
+ORDERS_PAGE_SIZE = 20
 
 # ============= CART VIEWS =============
 
 @login_required
+@query_budget(queries=8)
 def view_cart(request):
     """
     View shopping cart
@@ -23,7 +35,7 @@ def view_cart(request):
         messages.error(request, 'Only students can use the cart.')
         return redirect('home')
     
-    cart_items = Cart.objects.filter(user=request.user).select_related('food_item', 'food_item__shop')
+    cart_items = get_cart(request).lines()
     
     # Calculate totals
     subtotal = sum(item.total_price for item in cart_items)
@@ -42,7 +54,7 @@ def view_cart(request):
         'shops_dict': shops_dict,
         'subtotal': subtotal,
         'total': total,
-        'item_count': cart_items.count(),
+        'item_count': len(cart_items),
     }
     return render(request, 'orders/cart.html', context)
 
@@ -56,24 +68,14 @@ def add_to_cart(request, food_id):
         messages.error(request, 'Only students can add items to cart.')
         return redirect('home')
     
-    food_item = get_object_or_404(FoodItem, id=food_id, is_available=True)
-    
-    # Check if shop is approved
-    if not food_item.shop.is_approved:
+    added, _ = add_items(get_cart(request), {food_id: 1})
+    if not added:
         messages.error(request, 'This item is not available.')
         return redirect('browse_menu')
     
-    # Get or create cart item
-    cart_item, created = Cart.objects.get_or_create(
-        user=request.user,
-        food_item=food_item,
-        defaults={'quantity': 1}
-    )
-    
-    if not created:
-        cart_item.quantity += 1
-        cart_item.save()
-        messages.success(request, f'Increased {food_item.name} quantity to {cart_item.quantity}')
+    [(food_item, quantity)] = added.items()
+    if quantity > 1:
+        messages.success(request, f'Increased {food_item.name} quantity to {quantity}')
     else:
         messages.success(request, f'{food_item.name} added to cart!')
     
@@ -81,34 +83,41 @@ def add_to_cart(request, food_id):
 
 
 @login_required
-def update_cart(request, cart_id):
+def update_cart(request, food_id):
     """
     Update cart item quantity
     """
     if request.method == 'POST':
-        cart_item = get_object_or_404(Cart, id=cart_id, user=request.user)
-        quantity = int(request.POST.get('quantity', 1))
+        cart = get_cart(request)
+        try:
+            quantity = int(request.POST.get('quantity', 1))
+        except ValueError:
+            messages.error(request, 'Invalid quantity.')
+            return redirect('view_cart')
         
         if quantity > 0:
-            cart_item.quantity = quantity
-            cart_item.save()
+            if not cart.set_quantity(food_id, quantity):
+                raise Http404('Item is not in your cart.')
             messages.success(request, 'Cart updated successfully!')
         else:
-            cart_item.delete()
+            if cart.remove(food_id) is None:
+                raise Http404('Item is not in your cart.')
             messages.success(request, 'Item removed from cart!')
     
     return redirect('view_cart')
 
 
 @login_required
-def remove_from_cart(request, cart_id):
+def remove_from_cart(request, food_id):
     """
     Remove item from cart
     """
-    cart_item = get_object_or_404(Cart, id=cart_id, user=request.user)
-    item_name = cart_item.food_item.name
-    cart_item.delete()
-    messages.success(request, f'{item_name} removed from cart!')
+    cart_item = get_cart(request).remove(food_id)
+    if cart_item is None:
+        raise Http404('Item is not in your cart.')
+    # A session cart can hold an item deleted from the menu since
+    name = cart_item.food_item.name if cart_item.food_item_id else 'Item'
+    messages.success(request, f'{name} removed from cart!')
     return redirect('view_cart')
 
 
@@ -117,23 +126,21 @@ def clear_cart(request):
     """
     Clear all items from cart
     """
-    Cart.objects.filter(user=request.user).delete()
+    get_cart(request).clear()
     messages.success(request, 'Cart cleared successfully!')
     return redirect('view_cart')
 
 
 # ============= ORDER VIEWS =============
 
-def generate_order_number():
-    """
-    Generate unique order number
-    """
-    timestamp = timezone.now().strftime('%Y%m%d%H%M%S')
-    random_str = ''.join(random.choices(string.digits, k=4))
-    return f"ORD{timestamp}{random_str}"
-
-
 @login_required
+# Session, user and shop; the session cart store's writes; place_order()
+# selling out a stocked item as a shop's first order, which creates the
+# dashboard counter rows; two spare
+@query_budget(queries=(
+    3 + SessionCartStore.CHECKOUT_QUERIES + PLACE_ORDER_QUERIES + PLACE_ORDER_STOCK_QUERIES
+    + stats.CREATE_ROWS_QUERIES + 2
+))
 def checkout(request, shop_id):
     """
     Checkout for a specific shop
@@ -142,15 +149,38 @@ def checkout(request, shop_id):
         messages.error(request, 'Only students can place orders.')
         return redirect('home')
     
-    shop = get_object_or_404(Shop, id=shop_id, status='approved', is_active=True)
+    shop = get_object_or_404(Shop.objects.active(), id=shop_id)
+    
+    if request.method == 'POST':
+        special_instructions = request.POST.get('special_instructions', '')
+        cart = get_cart(request)
+        
+        try:
+            # place_order works from the Cart table
+            cart.persist()
+            order = place_order(request.user, shop, special_instructions)
+        except EmptyCartError:
+            messages.error(request, 'Your cart is empty for this shop.')
+            return redirect('view_cart')
+        except OutOfStockError as e:
+            messages.error(request, f'Not enough left of: {e}. Please update your cart.')
+            return redirect('view_cart')
+        except OperationalError:
+            # Still locked after retrying (foodcourt.db); the cart is intact
+            messages.error(request, 'We are very busy right now. Please place your order again in a moment.')
+            return redirect('view_cart')
+        except Exception as e:
+            messages.error(request, 'Error placing order. Please try again.')
+            return redirect('view_cart')
+        
+        cart.reload()
+        messages.success(request, f'Order placed successfully! Order #{order.order_number}')
+        return redirect('order_detail', order_id=order.id)
     
     # Get cart items for this shop only
-    cart_items = Cart.objects.filter(
-        user=request.user,
-        food_item__shop=shop
-    ).select_related('food_item')
+    cart_items = get_cart(request).lines(shop=shop)
     
-    if not cart_items.exists():
+    if not cart_items:
         messages.error(request, 'Your cart is empty for this shop.')
         return redirect('view_cart')
     
@@ -158,41 +188,6 @@ def checkout(request, shop_id):
     subtotal = sum(item.total_price for item in cart_items)
     total = subtotal
     
-    if request.method == 'POST':
-        special_instructions = request.POST.get('special_instructions', '')
-        
-        try:
-            with transaction.atomic():
-                # Create order
-                order = Order.objects.create(
-                    order_number=generate_order_number(),
-                    user=request.user,
-                    shop=shop,
-                    total_amount=total,
-                    special_instructions=special_instructions,
-                    status='pending',
-                    payment_status='pending'
-                )
-                
-                # Create order items
-                for cart_item in cart_items:
-                    OrderItem.objects.create(
-                        order=order,
-                        food_item=cart_item.food_item,
-                        quantity=cart_item.quantity,
-                        price=cart_item.food_item.price
-                    )
-                
-                # Clear cart items for this shop
-                cart_items.delete()
-                
-                messages.success(request, f'Order placed successfully! Order #{order.order_number}')
-                return redirect('order_detail', order_id=order.id)
-        
-        except Exception as e:
-            messages.error(request, 'Error placing order. Please try again.')
-            return redirect('view_cart')
-    
     context = {
         'shop': shop,
         'cart_items': cart_items,
@@ -202,42 +197,70 @@ def checkout(request, shop_id):
     return render(request, 'orders/checkout.html', context)
 
 
+def _orders_queryset(user):
+    """
+    Orders visible to the user on my_orders, or None if they have none
+    """
+    if user.is_student:
+        orders = Order.objects.for_student(user)
+    elif user.is_vendor:
+        if not Shop.objects.filter(vendor=user).exists():
+            return None
+        orders = Order.objects.for_vendor(user)
+    else:
+        return None
+    return orders.with_details()
+
+
 @login_required
+@query_budget(queries=8)
 def my_orders(request):
     """
     View user's order history
     """
-    if request.user.is_student:
-        orders = Order.objects.filter(user=request.user).select_related('shop').prefetch_related('items')
-    elif request.user.is_vendor:
-        try:
-            shop = request.user.shop
-            orders = Order.objects.filter(shop=shop).select_related('user').prefetch_related('items')
-        except:
+    orders = _orders_queryset(request.user)
+    if orders is None:
+        if request.user.is_vendor:
             messages.error(request, 'You don\'t have a shop.')
             return redirect('dashboard')
-    else:
         messages.error(request, 'Access denied.')
         return redirect('home')
     
+    page = KeysetPaginator(orders, per_page=ORDERS_PAGE_SIZE).page(request.GET.get('cursor'))
     context = {
-        'orders': orders,
+        'page': page,
+        'orders': page.items,
     }
     return render(request, 'orders/my_orders.html', context)
 
 
 @login_required
+@query_budget(queries=8)
+def my_orders_json(request):
+    """
+    JSON variant of my_orders (same cursors)
+    """
+    orders = _orders_queryset(request.user)
+    if orders is None:
+        return JsonResponse({'error': 'Access denied.'}, status=403)
+    
+    page = KeysetPaginator(orders, per_page=ORDERS_PAGE_SIZE).page(request.GET.get('cursor'))
+    return JsonResponse(page.as_dict(serialize_order))
+
+
+@login_required
+@query_budget(queries=10)
 def order_detail(request, order_id):
     """
     View order details
     """
+    orders = Order.objects.with_details()
     if request.user.is_student:
-        order = get_object_or_404(Order, id=order_id, user=request.user)
+        order = get_object_or_404(orders.for_student(request.user), id=order_id)
     elif request.user.is_vendor:
         try:
-            shop = request.user.shop
-            order = get_object_or_404(Order, id=order_id, shop=shop)
-        except:
+            order = orders.for_vendor(request.user).get(id=order_id)
+        except Order.DoesNotExist:
             messages.error(request, 'Access denied.')
             return redirect('dashboard')
     else:
@@ -250,6 +273,50 @@ def order_detail(request, order_id):
     return render(request, 'orders/order_detail.html', context)
 
 
+def _change_status(request, order, status, success_message=None):
+    """
+    change_status() with the outcome reported as a message; True on success
+    """
+    old_display = order.get_status_display()
+    try:
+        change_status(order, status)
+    except InvalidTransition:
+        messages.error(request, f'A {old_display.lower()} order cannot be changed to {dict(Order.STATUS_CHOICES)[status].lower()}.')
+        return False
+    except StaleOrderError:
+        messages.warning(
+            request,
+            f'This order was changed to {order.get_status_display()} while you were viewing it. Nothing was updated.'
+        )
+        return False
+    except OperationalError:
+        messages.error(request, 'We are very busy right now. Please try again in a moment.')
+        return False
+    messages.success(request, success_message or f'Order status updated to {order.get_status_display()}')
+    return True
+
+
+@login_required
+def reorder(request, order_id):
+    """
+    Add every item of a past order to the cart again
+    """
+    order = get_object_or_404(Order.objects.for_student(request.user), id=order_id)
+    if request.method != 'POST':
+        return redirect('order_detail', order_id=order.id)
+    
+    quantities = {}
+    for food_id, quantity in order.items.values_list('food_item_id', 'quantity'):
+        quantities[food_id] = quantities.get(food_id, 0) + quantity
+    added, skipped = add_items(get_cart(request), quantities)
+    
+    if added:
+        messages.success(request, f'Added {len(added)} item(s) from order #{order.order_number} to your cart.')
+    if skipped:
+        messages.warning(request, f'{len(skipped)} item(s) from that order are no longer available.')
+    return redirect('view_cart')
+
+
 @login_required
 def update_order_status(request, order_id):
     """
@@ -260,18 +327,15 @@ def update_order_status(request, order_id):
         return redirect('home')
     
     try:
-        shop = request.user.shop
-        order = get_object_or_404(Order, id=order_id, shop=shop)
-    except:
+        order = Order.objects.for_vendor(request.user).get(id=order_id)
+    except Order.DoesNotExist:
         messages.error(request, 'Access denied.')
         return redirect('dashboard')
     
     if request.method == 'POST':
         new_status = request.POST.get('status')
         if new_status in dict(Order.STATUS_CHOICES):
-            order.status = new_status
-            order.save()
-            messages.success(request, f'Order status updated to {order.get_status_display()}')
+            _change_status(request, order, new_status)
         else:
             messages.error(request, 'Invalid status.')
     
@@ -285,14 +349,62 @@ def cancel_order(request, order_id):
     """
     order = get_object_or_404(Order, id=order_id, user=request.user)
     
-    if order.status in ['completed', 'cancelled']:
+    if not order.can_change_to('cancelled'):
         messages.error(request, 'This order cannot be cancelled.')
         return redirect('order_detail', order_id=order.id)
     
     if request.method == 'POST':
-        order.status = 'cancelled'
-        order.save()
-        messages.success(request, 'Order cancelled successfully.')
+        if not _change_status(request, order, 'cancelled', 'Order cancelled successfully.'):
+            return redirect('order_detail', order_id=order.id)
         return redirect('my_orders')
     
-    return render(request, 'orders/cancel_order.html', {'order': order})
\ No newline at end of file
+    return render(request, 'orders/cancel_order.html', {'order': order})
+
+
+# ============= ORDER EVENTS =============
+
+def _last_event_id(request):
+    """
+    Resume point: the Last-Event-ID header EventSource sends on reconnect,
+    or ?last_event_id= for the first connection
+    """
+    value = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@login_required
+async def order_events(request, shop_id):
+    """
+    Server-Sent Events stream of a shop's order events for its vendor
+    Needs an ASGI server; under WSGI the stream would be buffered forever.
+    """
+    user = await request.auser()
+    is_owner = user.is_vendor and await Shop.objects.filter(id=shop_id, vendor=user).aexists()
+    if not (is_owner or user.is_admin):
+        return JsonResponse({'error': 'Access denied.'}, status=403)
+
+    broker = events.get_broker()
+    channel = events.shop_channel(shop_id)
+    last_event_id = _last_event_id(request)
+    heartbeat = getattr(settings, 'ORDER_EVENTS_HEARTBEAT', 15)
+
+    async def stream():
+        subscription, missed = broker.subscribe(channel, last_event_id)
+        try:
+            yield f"retry: {events.RETRY_MS}\n\n"
+            for event in missed:
+                yield event.encode()
+            while True:
+                event = await subscription.get(timeout=heartbeat)
+                # A comment line keeps proxies from closing an idle connection
+                yield event.encode() if event is not None else ': heartbeat\n\n'
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,209 @@
+# perf/bench.py
+
+"""
+Per-view benchmark
+
+run() requests every named GET route in foodcourt/urls.py (plus the admin
+index and changelists) as each role through the test client and records,
+per (role, view):
+
+    status    HTTP status of the last run
+    p50_ms    median wall time of the timed runs
+    p95_ms    95th percentile
+    queries   queries issued (median)
+    bytes     size of the response body
+
+URL arguments come from the seeded Dataset. Each URL runs inside a
+savepoint that is rolled back, so views that change data on GET measure the
+same thing every time. compare() diffs two result files.
+
+throughput() and asgi_throughput() measure requests per second of one URL,
+through the test client or straight through the ASGI application.
+"""
+
+import asyncio
+import statistics
+import time
+from django.contrib import admin
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver, reverse
+
+ROLES = ('anonymous', 'student', 'vendor', 'admin')
+
+# Routes a GET benchmark cannot measure meaningfully
+SKIP = {
+    'logout': 'ends the session for every later request',
+    'order_events': 'an open-ended event stream',
+    'remove_from_cart': 'only the first run finds the line',
+}
+
+
+def discover_urls(dataset):
+    """
+    [(view name, url)] for every benchmarkable route
+    """
+    arguments = {
+        'food_id': dataset.food_item.id,
+        'shop_id': dataset.shop.id,
+        'order_id': dataset.order.id,
+    }
+    urls = []
+    for name, parameters in _walk(get_resolver().url_patterns):
+        if name in SKIP or not set(parameters) <= set(arguments):
+            continue
+        urls.append((name, reverse(name, kwargs={key: arguments[key] for key in parameters})))
+
+    urls.append(('admin:index', reverse('admin:index')))
+    for model in admin.site._registry:
+        name = f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist'
+        urls.append((name, reverse(name)))
+    return urls
+
+
+def _walk(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            if pattern.namespace == 'admin':
+                continue
+            yield from _walk(pattern.url_patterns)
+        elif pattern.name:
+            yield pattern.name, list(pattern.pattern.converters)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def measure(client, url, runs, warmup):
+    timings, queries = [], []
+    with transaction.atomic():
+        for run in range(warmup + runs):
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = client.get(url)
+                body = b''.join(response.streaming_content) if response.streaming else response.content
+                elapsed = (time.perf_counter() - start) * 1000
+            if run >= warmup:
+                timings.append(elapsed)
+                queries.append(len(captured))
+        transaction.set_rollback(True)
+    return {
+        'status': response.status_code,
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'queries': int(statistics.median(queries)),
+        'bytes': len(body),
+    }
+
+
+def throughput(client, url, duration=1.0, headers=None):
+    """
+    Requests per second of sequential GETs of url over about duration
+    seconds; returns (status, requests/s, bytes)
+    """
+    headers = headers or {}
+    count = 0
+    start = time.perf_counter()
+    while True:
+        response = client.get(url, headers=headers)
+        count += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= duration:
+            return response.status_code, round(count / elapsed, 1), len(response.content)
+
+
+def asgi_throughput(application, path, concurrency=10, duration=1.0, query_string=''):
+    """
+    Requests per second of GETs of path straight through an ASGI
+    application, keeping concurrency requests in flight for about duration
+    seconds; returns ({status: count}, requests/s)
+    """
+    statuses = {}
+
+    async def request():
+        status = None
+        sent = False
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            # The client never disconnects
+            await asyncio.Future()
+
+        async def send(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+
+        await application({
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+            'query_string': query_string.encode(), 'root_path': '',
+            'headers': [(b'host', b'testserver')],
+            'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+        }, receive, send)
+        statuses[status] = statuses.get(status, 0) + 1
+
+    async def worker(deadline):
+        loop = asyncio.get_running_loop()
+        while loop.time() < deadline:
+            await request()
+
+    async def main():
+        start = asyncio.get_running_loop().time()
+        await asyncio.gather(*(worker(start + duration) for _ in range(concurrency)))
+        return asyncio.get_running_loop().time() - start
+
+    elapsed = asyncio.run(main())
+    return statuses, round(sum(statuses.values()) / elapsed, 1)
+
+
+def run(dataset, runs=20, warmup=2, roles=ROLES, views=None, progress=None):
+    """
+    Benchmark every URL for every role; returns a list of result dicts
+    """
+    results = []
+    urls = discover_urls(dataset)
+    if views:
+        urls = [(name, url) for name, url in urls if any(view in name for view in views)]
+    for role in roles:
+        client = Client()
+        if role != 'anonymous':
+            client.force_login(dataset.users[role])
+        for name, url in urls:
+            result = {'role': role, 'view': name, 'url': url, **measure(client, url, runs, warmup)}
+            results.append(result)
+            if progress:
+                progress(result)
+    return results
+
+
+def compare(baseline, current, threshold=0.2, min_ms=1.0):
+    """
+    Regressions of current against baseline: [(role, view, metric, old, new)]
+
+    Latency regresses when it grew by more than threshold (a fraction) and by
+    at least min_ms; bytes when they grew by more than threshold; queries
+    on any increase; status on any change.
+    """
+    previous = {(result['role'], result['view']): result for result in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        old = previous.get((result['role'], result['view']))
+        if old is None:
+            continue
+        if result['status'] != old['status']:
+            regressions.append((result['role'], result['view'], 'status', old['status'], result['status']))
+        for metric in ('p50_ms', 'p95_ms'):
+            if result[metric] > old[metric] * (1 + threshold) and result[metric] - old[metric] >= min_ms:
+                regressions.append((result['role'], result['view'], metric, old[metric], result[metric]))
+        if result['queries'] > old['queries']:
+            regressions.append((result['role'], result['view'], 'queries', old['queries'], result['queries']))
+        if result['bytes'] > old['bytes'] * (1 + threshold):
+            regressions.append((result['role'], result['view'], 'bytes', old['bytes'], result['bytes']))
+    return regressions
@@ -0,0 +1,95 @@
+# perf/budget.py
+
+"""
+Per-view query budgets
+
+Declare a budget on a view with the decorator (below login_required and
+the like, which copy it onto their wrapper):
+
+    @login_required
+    @query_budget(queries=8, db_time_ms=50)
+    def my_orders(request): ...
+
+or, for views we don't own such as admin changelists, in settings by view
+name:
+
+    QUERY_BUDGETS = {'admin:orders_order_changelist': {'queries': 10}}
+
+QueryBudgetMiddleware counts every query of a request, on every database
+alias, including session and user loading, and checks it against the
+budget. QUERY_BUDGET_MODE picks what happens on overrun: 'log' a warning,
+'raise' QueryBudgetExceeded (for development and CI), or 'off'.
+"""
+
+from django.conf import settings
+
+DEFAULT_MODE = 'log'
+
+
+class QueryBudgetExceeded(Exception):
+    """
+    Raised in 'raise' mode when a request goes over its view's budget
+    """
+
+
+class Budget:
+    def __init__(self, queries=None, db_time_ms=None):
+        self.queries = queries
+        self.db_time_ms = db_time_ms
+
+    def violations(self, queries, db_time_ms):
+        """
+        Human-readable reasons the measurement breaks this budget
+        """
+        problems = []
+        if self.queries is not None and queries > self.queries:
+            problems.append(f'{queries} queries > {self.queries}')
+        if self.db_time_ms is not None and db_time_ms > self.db_time_ms:
+            problems.append(f'{db_time_ms:.1f} ms in the database > {self.db_time_ms} ms')
+        return problems
+
+    def __repr__(self):
+        return f'Budget(queries={self.queries}, db_time_ms={self.db_time_ms})'
+
+
+def query_budget(queries=None, db_time_ms=None):
+    """
+    Attach a query budget to a view function
+    """
+    def decorator(view):
+        view.query_budget = Budget(queries, db_time_ms)
+        return view
+    return decorator
+
+
+def get_budget(resolver_match):
+    """
+    The budget for a resolved view: settings first, then the decorator
+    """
+    configured = getattr(settings, 'QUERY_BUDGETS', {}).get(resolver_match.view_name)
+    if configured is not None:
+        return Budget(**configured)
+    return getattr(resolver_match.func, 'query_budget', None)
+
+
+class QueryReport:
+    """
+    What one request cost, attached to the response as query_report
+    """
+
+    def __init__(self, view_name, queries, db_time_ms, budget):
+        self.view_name = view_name
+        self.queries = queries
+        self.db_time_ms = db_time_ms
+        self.budget = budget
+        self.violations = budget.violations(queries, db_time_ms) if budget else []
+
+    @property
+    def exceeded(self):
+        return bool(self.violations)
+
+    def __str__(self):
+        text = f'{self.view_name}: {self.queries} queries, {self.db_time_ms:.1f} ms'
+        if self.violations:
+            text += f" (over budget: {'; '.join(self.violations)})"
+        return text
@@ -0,0 +1,41 @@
+# perf/management/commands/perf_api_bench.py
+
+import logging
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from perf import bench
+from perf.seed import seed
+
+
+class Command(BaseCommand):
+    help = 'Requests per second of the JSON menu API: full responses vs If-None-Match 304s'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1, help='Dataset size (1 = 20 shops, 2000 orders)')
+        parser.add_argument('--duration', type=float, default=2.0, help='Seconds to run each measurement')
+
+    def handle(self, *args, **options):
+        logging.getLogger('perf.budget').setLevel(logging.ERROR)
+        self.stdout.write(f"{'endpoint':<32}{'miss req/s':>12}{'hit req/s':>12}{'speedup':>9}{'bytes':>9}")
+        # The test client's host name
+        with override_settings(ALLOWED_HOSTS=['testserver']), transaction.atomic():
+            dataset = seed(options['scale'])
+            client = Client()
+            for name, kwargs in (
+                ('api_shops', {}),
+                ('api_categories', {}),
+                ('api_shop_items', {'shop_id': dataset.shop.id}),
+            ):
+                url = reverse(name, kwargs=kwargs)
+                etag = client.get(url)['ETag']
+                # A miss builds the full body (the item body from the fragment cache)
+                _, misses, size = bench.throughput(client, url, options['duration'])
+                status, hits, _ = bench.throughput(client, url, options['duration'], {'If-None-Match': etag})
+                if status != 304:
+                    self.stderr.write(f'{url} answered {status} to a matching If-None-Match')
+                self.stdout.write(f'{url:<32}{misses:>12.1f}{hits:>12.1f}{hits / misses:>8.1f}x{size:>9}')
+            # Never keep the synthetic dataset
+            transaction.set_rollback(True)
@@ -0,0 +1,83 @@
+# perf/management/commands/perf_asgi_bench.py
+
+import logging
+import re
+import types
+from asgiref.sync import async_to_sync
+from django.core.asgi import get_asgi_application
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from django.urls import include, re_path, resolve, reverse
+from perf import bench
+from perf.seed import seed
+
+# The async catalog views, by URL name
+CATALOG_VIEWS = ('shop_list', 'browse_menu', 'shop_public_detail')
+
+
+def sync_twin(view):
+    """
+    The same async view served as a sync view: Django runs it in a thread
+    that it holds for the whole request, as it does any sync view
+    """
+    def sync_view(request, *args, **kwargs):
+        return async_to_sync(view)(request, *args, **kwargs)
+    sync_view.query_budget = getattr(view, 'query_budget', None)
+    return sync_view
+
+
+def sync_urlconf(urls):
+    """
+    A URLconf serving the sync twins at urls, then the site as usual
+    """
+    module = types.ModuleType('perf_asgi_bench_urls')
+    module.urlpatterns = [
+        re_path(f'^{re.escape(url.lstrip("/"))}$', sync_twin(match.func), match.kwargs, name=match.url_name)
+        for url, match in ((url, resolve(url)) for url in urls)
+    ] + [re_path('', include('foodcourt.urls'))]
+    return module
+
+
+class Command(BaseCommand):
+    help = 'ASGI requests per second of the catalog views, async vs the same views served sync'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=0.25, help='Dataset size (1 = 20 shops, 2000 orders)')
+        parser.add_argument('--concurrency', type=int, default=20, help='Requests in flight')
+        parser.add_argument('--duration', type=float, default=3.0, help='Seconds to run each measurement')
+
+    def handle(self, *args, **options):
+        logging.getLogger('perf.budget').setLevel(logging.ERROR)
+        # Every ASGI request runs its sync code in a thread of its own, so the
+        # dataset must be committed: use a throwaway database
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            dataset = seed(options['scale'])
+            urls = [
+                reverse('shop_list'),
+                reverse('browse_menu'),
+                reverse('shop_public_detail', args=[dataset.shop.id]),
+            ]
+            connection.close()
+            application = get_asgi_application()
+            self.stdout.write(f"{options['concurrency']} in flight, {options['duration']:.0f}s per measurement")
+            self.stdout.write(f"{'url':<24}{'sync req/s':>12}{'async req/s':>13}{'speedup':>9}")
+            with override_settings(ALLOWED_HOSTS=['testserver'], REPLICA_DATABASE=None):
+                for url in urls:
+                    rates = {}
+                    for mode, urlconf in (('sync', sync_urlconf(urls)), ('async', None)):
+                        cache.clear()
+                        with override_settings(**({'ROOT_URLCONF': urlconf} if urlconf else {})):
+                            statuses, rates[mode] = bench.asgi_throughput(
+                                application, url, options['concurrency'], options['duration'],
+                            )
+                        if set(statuses) != {200}:
+                            self.stderr.write(f'{url} ({mode}) answered {statuses}')
+                    self.stdout.write(
+                        f"{url:<24}{rates['sync']:>12.1f}{rates['async']:>13.1f}{rates['async'] / rates['sync']:>8.2f}x"
+                    )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
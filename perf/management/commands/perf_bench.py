@@ -0,0 +1,66 @@
+# perf/management/commands/perf_bench.py
+
+import json
+import logging
+import platform
+import django
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+from perf import bench
+from perf.seed import seed
+
+
+class Command(BaseCommand):
+    help = 'Benchmark every view as each role on a seeded dataset (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1, help='Dataset size (1 = 20 shops, 2000 orders)')
+        parser.add_argument('--runs', type=int, default=20, help='Timed requests per view and role')
+        parser.add_argument('--warmup', type=int, default=2, help='Untimed requests first (fills caches)')
+        parser.add_argument('--role', action='append', dest='roles', choices=bench.ROLES,
+                            help='Only this role (repeatable)')
+        parser.add_argument('--view', action='append', dest='views',
+                            help='Only views whose name contains this (repeatable)')
+        parser.add_argument('--output', help='Write results to this JSON file')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'role':<10}{'view':<42}{'status':>7}{'p50 ms':>9}{'p95 ms':>9}{'queries':>9}{'bytes':>9}")
+
+        def progress(result):
+            self.stdout.write(
+                f"{result['role']:<10}{result['view']:<42}{result['status']:>7}"
+                f"{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}{result['queries']:>9}{result['bytes']:>9}"
+            )
+
+        # 403/404s as some roles are expected; keep them out of the table
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+        # The test client's host name; the seeded dataset never reaches the
+        # read replica, so every view reads default
+        with override_settings(ALLOWED_HOSTS=['testserver'], REPLICA_DATABASE=None), transaction.atomic():
+            dataset = seed(options['scale'])
+            results = bench.run(
+                dataset,
+                runs=options['runs'],
+                warmup=options['warmup'],
+                roles=options['roles'] or bench.ROLES,
+                views=options['views'],
+                progress=progress,
+            )
+            # Never keep the synthetic dataset
+            transaction.set_rollback(True)
+
+        if options['output']:
+            report = {
+                'created_at': timezone.now().isoformat(),
+                'scale': options['scale'],
+                'runs': options['runs'],
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'results': results,
+            }
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {len(results)} results to {options['output']}"))
@@ -0,0 +1,36 @@
+# perf/management/commands/perf_compare.py
+
+import json
+from django.core.management.base import BaseCommand, CommandError
+from perf import bench
+
+
+class Command(BaseCommand):
+    help = 'Compare two perf_bench result files and fail on regressions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('baseline', help='Earlier perf_bench --output file')
+        parser.add_argument('current', help='Later perf_bench --output file')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Allowed relative growth of latency and bytes (0.2 = 20%%)')
+        parser.add_argument('--min-ms', type=float, default=1.0,
+                            help='Ignore latency changes smaller than this many milliseconds')
+
+    def handle(self, *args, **options):
+        reports = []
+        for path in (options['baseline'], options['current']):
+            try:
+                with open(path) as f:
+                    reports.append(json.load(f))
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Cannot read {path}: {e}')
+
+        regressions = bench.compare(*reports, threshold=options['threshold'], min_ms=options['min_ms'])
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS('No regressions.'))
+            return
+
+        self.stdout.write(f"{'role':<10}{'view':<42}{'metric':<9}{'before':>10}{'after':>10}")
+        for role, view, metric, old, new in regressions:
+            self.stdout.write(f'{role:<10}{view:<42}{metric:<9}{old:>10}{new:>10}')
+        raise CommandError(f'{len(regressions)} regression(s).')
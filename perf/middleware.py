@@ -0,0 +1,131 @@
+# perf/middleware.py
+
+import logging
+import time
+from contextlib import ExitStack
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from . import profiling
+from .budget import DEFAULT_MODE, QueryBudgetExceeded, QueryReport, get_budget
+
+logger = logging.getLogger('perf.budget')
+
+
+class QueryCounter:
+    """
+    connection.execute_wrapper() hook counting queries and their time
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.seconds += time.perf_counter() - start
+
+
+class QueryBudgetMiddleware:
+    """
+    Count each request's queries, attribute them to the resolved view and
+    enforce the view's budget (see perf.budget)
+    Place it near the top of MIDDLEWARE so session and user queries count.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        mode = getattr(settings, 'QUERY_BUDGET_MODE', DEFAULT_MODE)
+        if mode == 'off':
+            return self.get_response(request)
+
+        counter = QueryCounter()
+        with ExitStack() as stack:
+            self.count_queries(stack, counter)
+            response = self.get_response(request)
+        return self.check(request, response, counter, mode)
+
+    async def __acall__(self, request):
+        mode = getattr(settings, 'QUERY_BUDGET_MODE', DEFAULT_MODE)
+        if mode == 'off':
+            return await self.get_response(request)
+
+        counter = QueryCounter()
+        with ExitStack() as stack:
+            # Connections belong to the thread the request's queries run in
+            await sync_to_async(self.count_queries)(stack, counter)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        return self.check(request, response, counter, mode)
+
+    def count_queries(self, stack, counter):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+
+    def check(self, request, response, counter, mode):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return response
+
+        report = QueryReport(match.view_name, counter.queries, counter.seconds * 1000, get_budget(match))
+        response.query_report = report
+        if settings.DEBUG:
+            response['X-Query-Count'] = str(report.queries)
+            response['X-DB-Time-Ms'] = f'{report.db_time_ms:.1f}'
+
+        if report.exceeded:
+            if mode == 'raise':
+                raise QueryBudgetExceeded(str(report))
+            logger.warning('Query budget exceeded: %s', report)
+        else:
+            logger.debug('%s', report)
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Profile opted-in requests with cProfile (see perf.profiling)
+    Place it first in MIDDLEWARE so the whole stack is profiled. An async
+    request is profiled from its sync thread, which also runs its queries
+    and template rendering.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        reason = profiling.should_profile(request)
+        if reason is None or profiling.profiler_busy():
+            return self.get_response(request)
+        return profiling.profile_request(self.get_response, request, reason)
+
+    async def __acall__(self, request):
+        reason = profiling.should_profile(request)
+        if reason is None:
+            return await self.get_response(request)
+        return await sync_to_async(self.profile)(request, reason)
+
+    def profile(self, request, reason):
+        if profiling.profiler_busy():
+            return async_to_sync(self.get_response)(request)
+        return profiling.profile_request(async_to_sync(self.get_response), request, reason)
@@ -0,0 +1,291 @@
+# perf/profiling.py
+
+"""
+On-demand request profiling
+
+ProfilingMiddleware profiles a request under cProfile when either
+
+    - it carries PROFILING_HEADER (X-Profile) with a token from
+      make_token(); tokens are signed and expire after
+      PROFILING_TOKEN_MAX_AGE seconds, so the header cannot be forged, or
+    - it falls in the PROFILING_SAMPLE_RATE fraction of requests (0-1).
+
+Each profile is written to PROFILING_DIR as <id>.prof (pstats format, for
+snakeviz or `python -m pstats`), <id>.collapsed (sampled stacks, for
+flamegraph.pl or speedscope; see StackSampler) and <id>.json: the request,
+its SQL timeline and its top functions. Only the newest PROFILING_KEEP profiles are kept.
+The staff-only page at /admin/perf/profiles/ lists them.
+"""
+
+import cProfile
+import json
+import logging
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+from django.conf import settings
+from django.core import signing
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEADER = 'X-Profile'
+DEFAULT_TOKEN_MAX_AGE = 60 * 60
+DEFAULT_KEEP = 200
+TOP_FUNCTIONS = 20
+
+TOKEN_SALT = 'perf.profiling'
+TOKEN_VALUE = 'profile'
+
+DEFAULT_STACK_INTERVAL = 0.001
+
+
+def profile_dir():
+    return str(getattr(settings, 'PROFILING_DIR', os.path.join(settings.BASE_DIR, 'profiles')))
+
+
+def get_header():
+    return getattr(settings, 'PROFILING_HEADER', DEFAULT_HEADER)
+
+
+def get_sample_rate():
+    return getattr(settings, 'PROFILING_SAMPLE_RATE', 0)
+
+
+def make_token():
+    """
+    A header value that enables profiling until it expires
+    """
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign(TOKEN_VALUE)
+
+
+def _valid_token(token):
+    max_age = getattr(settings, 'PROFILING_TOKEN_MAX_AGE', DEFAULT_TOKEN_MAX_AGE)
+    try:
+        return signing.TimestampSigner(salt=TOKEN_SALT).unsign(token, max_age=max_age) == TOKEN_VALUE
+    except signing.BadSignature:
+        return False
+
+
+def should_profile(request):
+    """
+    'header', 'sample' or None: why (or whether) to profile this request
+    """
+    header = get_header()
+    token = request.headers.get(header)
+    if token:
+        if _valid_token(token):
+            return 'header'
+        logger.warning('Ignoring invalid %s header on %s', header, request.path)
+    rate = get_sample_rate()
+    if rate and random.random() < rate:
+        return 'sample'
+    return None
+
+
+class SQLTimeline:
+    """
+    connection.execute_wrapper() hook recording when each query ran
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'alias': context['connection'].alias,
+                'start_ms': round((started - self.start) * 1000, 3),
+                'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+                'sql': sql,
+            })
+
+
+def _label(func):
+    filename, line, name = func
+    if filename == '~':
+        # Built-ins: '<built-in method time.sleep>'
+        return name.strip('<>')
+    return f'{name} ({os.path.basename(filename)}:{line})'
+
+
+def top_functions(stats, limit=TOP_FUNCTIONS):
+    """
+    The functions with the most time of their own, as JSON-ready dicts
+    """
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+    return [
+        {
+            'function': _label(func),
+            'calls': calls,
+            'self_ms': round(self_time * 1000, 3),
+            'cumulative_ms': round(cumulative * 1000, 3),
+        }
+        for func, (_, calls, self_time, cumulative, _) in rows
+    ]
+
+
+class StackSampler:
+    """
+    Samples the profiled thread's stack every PROFILING_STACK_INTERVAL
+    seconds, for the collapsed-stack file
+
+    cProfile only keeps caller -> callee edges, which cannot be put back
+    together into stacks through Django's recursive middleware chain, so
+    flame graphs come from samples instead: one per interval, counted per
+    distinct stack below the frame that started the sampler.
+    """
+
+    def __init__(self, interval=None):
+        self.interval = interval or getattr(settings, 'PROFILING_STACK_INTERVAL', DEFAULT_STACK_INTERVAL)
+        self.counts = {}
+        self._thread_id = threading.get_ident()
+        self._root = sys._getframe(1)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='perf-stack-sampler', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None and frame is not self._root:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack and frame is self._root:
+                key = ';'.join(reversed(stack))
+                self.counts[key] = self.counts.get(key, 0) + 1
+
+    def collapsed(self):
+        """
+        'root;caller;callee samples' lines, as flamegraph.pl reads them
+        """
+        return [f'{stack} {samples}' for stack, samples in sorted(self.counts.items())]
+
+
+def profile_request(get_response, request, reason):
+    """
+    Run get_response(request) under cProfile and the SQL timeline, then
+    store the profile
+    """
+    profiler = cProfile.Profile()
+    timeline = SQLTimeline()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(timeline))
+        sampler = stack.enter_context(StackSampler())
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            response = get_response(request)
+        finally:
+            profiler.disable()
+        duration = time.perf_counter() - start
+
+    try:
+        response['X-Profile-Id'] = save_profile(profiler, sampler, request, response, timeline, reason, duration)
+    except OSError:
+        # A full or read-only disk must not fail the request
+        logger.exception('Could not save the profile of %s', request.path)
+    return response
+
+
+def save_profile(profiler, sampler, request, response, timeline, reason, duration):
+    """
+    Write the three files of a profile; return its id
+    """
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    profile_id = f"{timezone.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+    base = os.path.join(directory, profile_id)
+
+    stats = pstats.Stats(profiler)
+    stats.dump_stats(base + '.prof')
+    with open(base + '.collapsed', 'w') as collapsed:
+        collapsed.write(''.join(line + '\n' for line in sampler.collapsed()))
+
+    match = getattr(request, 'resolver_match', None)
+    summary = {
+        'id': profile_id,
+        'created_at': timezone.now().isoformat(),
+        'method': request.method,
+        'path': request.get_full_path(),
+        'view': match.view_name if match else None,
+        'user': request.user.get_username() if hasattr(request, 'user') and request.user.is_authenticated else None,
+        'status': response.status_code,
+        'reason': reason,
+        'duration_ms': round(duration * 1000, 3),
+        'queries': len(timeline.queries),
+        'db_time_ms': round(sum(query['duration_ms'] for query in timeline.queries), 3),
+        'top_functions': top_functions(stats),
+        'sql': timeline.queries,
+    }
+    with open(base + '.json', 'w') as summary_file:
+        json.dump(summary, summary_file, indent=1)
+
+    prune(getattr(settings, 'PROFILING_KEEP', DEFAULT_KEEP))
+    return profile_id
+
+
+def list_profiles(limit=None):
+    """
+    Summaries of the stored profiles, newest first
+    """
+    directory = profile_dir()
+    if not os.path.isdir(directory):
+        return []
+    names = sorted((name for name in os.listdir(directory) if name.endswith('.json')), reverse=True)
+    profiles = []
+    for name in names[:limit]:
+        try:
+            with open(os.path.join(directory, name)) as summary_file:
+                profiles.append(json.load(summary_file))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+
+def profile_path(profile_id, extension):
+    """
+    Path of one of a profile's files, or None if there is no such file
+    """
+    if extension not in ('prof', 'collapsed', 'json') or os.sep in profile_id or profile_id.startswith('.'):
+        return None
+    path = os.path.join(profile_dir(), f'{profile_id}.{extension}')
+    return path if os.path.isfile(path) else None
+
+
+def prune(keep):
+    directory = profile_dir()
+    ids = sorted({name.rsplit('.', 1)[0] for name in os.listdir(directory)}, reverse=True)
+    for profile_id in ids[keep:]:
+        for extension in ('prof', 'collapsed', 'json'):
+            try:
+                os.remove(os.path.join(directory, f'{profile_id}.{extension}'))
+            except FileNotFoundError:
+                pass
+
+
+def profiler_busy():
+    """
+    True when another profiler or tracer (a debugger, coverage) owns the thread
+    """
+    return sys.getprofile() is not None
@@ -0,0 +1,149 @@
+# perf/seed.py
+
+"""
+Synthetic dataset for benchmarks
+
+seed(scale) creates a campus-sized food court, scale 1 being roughly
+
+    20 approved shops (+ pending/blocked ones), 30 items each
+    200 students, 2000 orders of 1-4 items, a few full carts
+
+plus one named user per role (bench_student, bench_vendor, bench_admin)
+whose pages the benchmarks request. Rows are bulk-inserted, so derived data
+(search index, dashboard counters) is rebuilt at the end.
+"""
+
+import random
+from datetime import timedelta
+from decimal import Decimal
+from django.utils import timezone
+from accounts.models import User
+from vendors.models import Shop
+from menu.models import Category, FoodItem
+from menu import search
+from orders.models import Cart, Order, OrderItem
+from orders.order_numbers import generate_order_number
+from dashboard import stats
+
+WORDS = [
+    'masala', 'paneer', 'chicken', 'veg', 'biryani', 'dosa', 'idli', 'vada', 'burger',
+    'pizza', 'sandwich', 'noodles', 'fried', 'rice', 'curry', 'tikka', 'roll', 'wrap',
+    'spicy', 'cheese', 'butter', 'garlic', 'tandoori', 'chilli', 'mango', 'lassi',
+    'coffee', 'tea', 'cold', 'shake', 'chocolate', 'samosa', 'pav', 'bhaji', 'momos',
+]
+CATEGORIES = ['Breakfast', 'Meals', 'Snacks', 'Chinese', 'Beverages', 'Desserts', 'Fast Food', 'Thali']
+STATUSES = ['pending', 'confirmed', 'preparing', 'ready', 'completed', 'completed', 'completed', 'cancelled']
+
+
+class Dataset:
+    """
+    Handles on the seeded rows that URL arguments are taken from
+    """
+
+    def __init__(self, student, vendor, admin, shop, food_item, order):
+        self.users = {'student': student, 'vendor': vendor, 'admin': admin}
+        self.shop = shop
+        self.food_item = food_item
+        self.order = order
+
+
+def _shop(vendor, index, rng, **kwargs):
+    defaults = {
+        'shop_name': f'{rng.choice(WORDS).title()} {rng.choice(WORDS).title()} Kitchen',
+        'description': ' '.join(rng.choices(WORDS, k=20)),
+        'phone': '0000000000',
+        'email': f'shop{index}@example.com',
+        'address': f'Block {index % 6}',
+        'status': 'approved',
+        'is_active': True,
+    }
+    defaults.update(kwargs)
+    return Shop(vendor=vendor, **defaults)
+
+
+def seed(scale=1, rng_seed=42):
+    rng = random.Random(rng_seed)
+    shop_count = max(2, int(20 * scale))
+    student_count = max(5, int(200 * scale))
+    order_count = max(10, int(2000 * scale))
+
+    categories = [Category.objects.get_or_create(name=name)[0] for name in CATEGORIES]
+
+    admin = User.objects.create(username='bench_admin', role='admin', is_staff=True, is_superuser=True)
+    vendor = User.objects.create(username='bench_vendor', role='vendor')
+    student = User.objects.create(username='bench_student', role='student')
+
+    vendors = User.objects.bulk_create([
+        User(username=f'bench_vendor_{index}', role='vendor') for index in range(shop_count + shop_count // 4)
+    ])
+    students = [student] + User.objects.bulk_create([
+        User(username=f'bench_student_{index}', role='student') for index in range(student_count)
+    ])
+
+    shops = Shop.objects.bulk_create(
+        [_shop(vendor, 0, rng, shop_name='Bench Kitchen')]
+        + [_shop(user, index + 1, rng) for index, user in enumerate(vendors[:shop_count - 1])]
+        + [
+            _shop(user, shop_count + index, rng, status=rng.choice(['pending', 'blocked']), is_active=False)
+            for index, user in enumerate(vendors[shop_count - 1:])
+        ]
+    )
+    approved = shops[:shop_count]
+
+    food_items = FoodItem.objects.bulk_create([
+        FoodItem(
+            shop=shop,
+            category=rng.choice(categories),
+            name=' '.join(rng.sample(WORDS, 2)).title(),
+            description=' '.join(rng.choices(WORDS, k=15)),
+            price=Decimal(rng.randint(20, 300)),
+            is_available=rng.random() > 0.1,
+            is_vegetarian=rng.random() > 0.5,
+            preparation_time=rng.randint(5, 30),
+        )
+        for shop in shops
+        for _ in range(30)
+    ], batch_size=500)
+    items_by_shop = {}
+    for food_item in food_items:
+        items_by_shop.setdefault(food_item.shop_id, []).append(food_item)
+
+    now = timezone.now()
+    orders, lines = [], []
+    for index in range(order_count):
+        # The bench users get a realistic history of their own
+        shop = approved[0] if index % 10 == 0 else rng.choice(approved)
+        customer = student if index % 10 == 0 else rng.choice(students)
+        picked = rng.sample(items_by_shop[shop.id], rng.randint(1, 4))
+        order_lines = [(food_item, rng.randint(1, 3)) for food_item in picked]
+        orders.append(Order(
+            order_number=generate_order_number(),
+            user=customer,
+            shop=shop,
+            status=rng.choice(STATUSES),
+            payment_status='paid',
+            total_amount=sum(food_item.price * quantity for food_item, quantity in order_lines),
+        ))
+        lines.append(order_lines)
+    orders = Order.objects.bulk_create(orders, batch_size=500)
+    OrderItem.objects.bulk_create([
+        OrderItem(order=order, food_item=food_item, quantity=quantity, price=food_item.price)
+        for order, order_lines in zip(orders, lines)
+        for food_item, quantity in order_lines
+    ], batch_size=500)
+    # Spread the history over the last 90 days (auto_now_add set them all to now)
+    for order in orders:
+        order.created_at = now - timedelta(minutes=rng.randint(0, 90 * 24 * 60))
+    Order.objects.bulk_update(orders, ['created_at'], batch_size=500)
+
+    Cart.objects.bulk_create([
+        Cart(user=customer, food_item=food_item, quantity=rng.randint(1, 3))
+        for customer in students[:max(2, len(students) // 10)]
+        for food_item in rng.sample(food_items[:len(approved) * 30], 4)
+    ], ignore_conflicts=True)
+
+    search.rebuild()
+    stats.reconcile()
+
+    bench_order = Order.objects.filter(user=student, shop=approved[0]).order_by('-created_at').first()
+    return Dataset(student, vendor, admin, approved[0], items_by_shop[approved[0].id][0], bench_order)
@@ -0,0 +1,130 @@
+# perf/testing.py
+
+"""
+Test helpers for query budgets and query plans
+"""
+
+import re
+from contextlib import contextmanager
+from django.db import connection
+from django.test import Client, override_settings
+from . import bench
+
+# Tables small and bounded enough that reading them whole is fine
+SCANNABLE_TABLES = ('menu_category', 'dashboard_globalstats')
+
+FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+
+
+def budget_reports(dataset, roles=bench.ROLES):
+    """
+    Request every benchmarkable URL once per role (see perf.bench) and
+    return the QueryReport of each response that has a budget
+    """
+    reports = []
+    with override_settings(QUERY_BUDGET_MODE='log'):
+        urls = bench.discover_urls(dataset)
+        for role in roles:
+            client = Client()
+            if role != 'anonymous':
+                client.force_login(dataset.users[role])
+            for _, url in urls:
+                # Warm caches first: budgets are for the steady state
+                client.get(url)
+                report = getattr(client.get(url), 'query_report', None)
+                if report is not None and report.budget is not None:
+                    reports.append((role, url, report))
+    return reports
+
+
+class QueryBudgetTestMixin:
+    """
+    assertWithinBudgets(dataset) fails listing every view over its budget
+    """
+
+    def assertWithinBudgets(self, dataset, roles=bench.ROLES):
+        with self.assertLogs('perf.budget', 'DEBUG'):
+            reports = budget_reports(dataset, roles)
+        over = [f'{role} {url}: {report}' for role, url, report in reports if report.exceeded]
+        if over:
+            self.fail('Views over their query budget:\n' + '\n'.join(over))
+        return reports
+
+    def assertWithinBudget(self, response):
+        """
+        Fail if the view that made response went over its query budget
+        """
+        report = getattr(response, 'query_report', None)
+        if report is None or report.budget is None:
+            self.fail('The response has no query budget report')
+        if report.exceeded:
+            self.fail(f'View over its query budget: {report}')
+        return report
+
+
+# ============= QUERY PLANS =============
+
+class PlanCollector:
+    """
+    connection.execute_wrapper() hook keeping the SELECTs it sees
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.lstrip().upper().startswith('SELECT'):
+            self.queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+    def plans(self):
+        """
+        [(sql, [plan detail lines])] from SQLite's EXPLAIN QUERY PLAN
+        """
+        plans = []
+        with connection.cursor() as cursor:
+            for sql, params in self.queries:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                plans.append((sql, [row[3] for row in cursor.fetchall()]))
+        return plans
+
+
+@contextmanager
+def collect_queries():
+    collector = PlanCollector()
+    with connection.execute_wrapper(collector):
+        yield collector
+
+
+def full_scans(plan, allow=SCANNABLE_TABLES):
+    """
+    The tables a plan reads in full, without any index
+    """
+    scans = []
+    for detail in plan:
+        match = FULL_SCAN.match(detail)
+        if match and match.group(1) not in allow:
+            scans.append(match.group(1))
+    return scans
+
+
+class QueryPlanTestMixin:
+    """
+    assertIndexedQueries() fails if code it wraps makes SQLite read a table
+    in full (SQLite only)
+    """
+
+    @contextmanager
+    def assertIndexedQueries(self, allow=SCANNABLE_TABLES):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Query plans are checked against SQLite')
+        with collect_queries() as collector:
+            yield collector
+        self.assertTrue(collector.queries, 'No queries ran')
+        problems = []
+        for sql, plan in collector.plans():
+            scans = full_scans(plan, allow)
+            if scans:
+                problems.append(f'{", ".join(scans)}: {sql}')
+        if problems:
+            self.fail('Full table scans:\n' + '\n'.join(problems))
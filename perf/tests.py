@@ -0,0 +1,219 @@
+import os
+import pstats
+import shutil
+import tempfile
+import time
+from django.core.asgi import get_asgi_application
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import resolve, reverse
+from accounts.models import User
+from dashboard import stats
+from . import bench, profiling
+from .budget import QueryBudgetExceeded, get_budget
+from .middleware import QueryBudgetMiddleware
+from .seed import seed
+from .testing import QueryBudgetTestMixin, QueryPlanTestMixin, collect_queries, full_scans
+
+
+class BenchmarkTests(TestCase):
+    def test_every_role_gets_every_view(self):
+        dataset = seed(scale=0.05)
+        results = bench.run(dataset, runs=1, warmup=0, views=['browse_menu', 'my_orders', 'admin:index'])
+        by_key = {(result['role'], result['view']): result for result in results}
+        self.assertEqual(len(by_key), len(bench.ROLES) * 5)  # views match by substring
+        self.assertEqual(by_key[('student', 'my_orders')]['status'], 200)
+        self.assertEqual(by_key[('anonymous', 'my_orders')]['status'], 302)
+        self.assertEqual(by_key[('admin', 'admin:index')]['status'], 200)
+        self.assertGreater(by_key[('student', 'browse_menu')]['bytes'], 0)
+        self.assertGreater(by_key[('student', 'browse_menu')]['queries'], 0)
+
+    def test_asgi_throughput(self):
+        statuses, rate = bench.asgi_throughput(get_asgi_application(), reverse('shop_list'), concurrency=3, duration=0.2)
+        self.assertEqual(list(statuses), [200])
+        self.assertGreater(rate, 0)
+
+    def test_compare_flags_regressions(self):
+        def report(p50, queries, status=200):
+            return {'results': [{
+                'role': 'student', 'view': 'browse_menu', 'status': status,
+                'p50_ms': p50, 'p95_ms': p50, 'queries': queries, 'bytes': 1000,
+            }]}
+
+        self.assertEqual(bench.compare(report(10, 4), report(11, 4)), [])
+        # Relative growth below min_ms is noise
+        self.assertEqual(bench.compare(report(0.5, 4), report(1.0, 4)), [])
+        self.assertEqual(
+            [metric for _, _, metric, _, _ in bench.compare(report(10, 4), report(20, 5, 500))],
+            ['status', 'p50_ms', 'p95_ms', 'queries'],
+        )
+
+
+class QueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    def test_views_stay_within_budget(self):
+        reports = self.assertWithinBudgets(seed(scale=0.05))
+        budgeted = {report.view_name for _, _, report in reports}
+        self.assertIn('browse_menu', budgeted)
+        self.assertIn('order_detail', budgeted)
+        self.assertIn('admin:menu_fooditem_changelist', budgeted)
+
+    def test_budget_survives_login_required(self):
+        self.assertEqual(get_budget(resolve('/orders/my-orders/')).queries, 8)
+
+    @override_settings(QUERY_BUDGETS={'browse_menu': {'queries': 0}})
+    def test_settings_override_decorator(self):
+        self.assertEqual(get_budget(resolve('/menu/browse/')).queries, 0)
+
+    @override_settings(QUERY_BUDGETS={'home': {'queries': 0}}, DEBUG=True)
+    def test_overrun_is_logged_or_raised(self):
+        # Session and user loading count too
+        self.client.force_login(User.objects.create_user('budget_student', role='student'))
+        with self.assertLogs('perf.budget', 'WARNING') as logs:
+            response = self.client.get('/')
+        self.assertIn('home', logs.output[0])
+        self.assertTrue(response.query_report.exceeded)
+        self.assertEqual(response['X-Query-Count'], str(response.query_report.queries))
+
+        with self.settings(QUERY_BUDGET_MODE='raise'), self.assertLogs('django.request', 'ERROR'):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get('/')
+
+    def test_counts_queries_of_the_request(self):
+        def view(request):
+            User.objects.count()
+            User.objects.exists()
+            return HttpResponse()
+
+        request = RequestFactory().get('/')
+        request.resolver_match = resolve('/')
+        response = QueryBudgetMiddleware(view)(request)
+        self.assertEqual(response.query_report.queries, 2)
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        override = self.settings(PROFILING_DIR=self.directory, PROFILING_SAMPLE_RATE=0)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.staff = User.objects.create_user('profiler', role='admin', is_staff=True)
+
+    def test_only_signed_requests_are_profiled(self):
+        self.assertNotIn('X-Profile-Id', self.client.get('/'))
+        with self.assertLogs('perf.profiling', 'WARNING'):
+            self.assertNotIn('X-Profile-Id', self.client.get('/', headers={'X-Profile': 'profile:forged'}))
+        self.assertEqual(os.listdir(self.directory), [])
+
+        self.client.force_login(self.staff)
+        response = self.client.get('/', headers={'X-Profile': profiling.make_token()})
+        profile_id = response['X-Profile-Id']
+        self.assertEqual(
+            sorted(os.listdir(self.directory)),
+            [f'{profile_id}.collapsed', f'{profile_id}.json', f'{profile_id}.prof'],
+        )
+        pstats.Stats(os.path.join(self.directory, f'{profile_id}.prof'))
+
+        [summary] = profiling.list_profiles()
+        self.assertEqual((summary['view'], summary['status'], summary['reason']), ('home', 200, 'header'))
+        self.assertEqual(summary['queries'], len(summary['sql']))
+        self.assertGreater(summary['queries'], 0)  # session and user
+        self.assertTrue(summary['top_functions'])
+
+        self.assertTrue(os.path.isfile(os.path.join(self.directory, f'{profile_id}.collapsed')))
+
+    def test_stack_sampler(self):
+        def slow_view():
+            time.sleep(0.05)
+
+        with profiling.StackSampler(interval=0.001) as sampler:
+            slow_view()
+        stacks = dict(line.rsplit(' ', 1) for line in sampler.collapsed())
+        [stack] = [stack for stack in stacks if stack.startswith('slow_view (tests.py')]
+        self.assertGreater(int(stacks[stack]), 10)
+
+    def test_sampling(self):
+        with self.settings(PROFILING_SAMPLE_RATE=1):
+            self.assertEqual(profiling.list_profiles(), [])
+            self.client.get('/')
+        self.assertEqual(profiling.list_profiles()[0]['reason'], 'sample')
+
+    def test_keeps_newest_profiles(self):
+        with self.settings(PROFILING_SAMPLE_RATE=1, PROFILING_KEEP=2):
+            for _ in range(3):
+                self.client.get('/')
+        self.assertEqual(len(os.listdir(self.directory)), 6)
+
+    def test_admin_page_is_staff_only(self):
+        with self.settings(PROFILING_SAMPLE_RATE=1):
+            profile_id = self.client.get('/')['X-Profile-Id']
+        url = reverse('perf_profile_list')
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(self.staff)
+        response = self.client.get(url)
+        self.assertContains(response, profile_id)
+        self.assertContains(response, 'Request profiles')
+        download = self.client.get(reverse('perf_profile_file', args=[profile_id, 'collapsed']))
+        self.assertEqual(download.status_code, 200)
+        self.assertEqual(
+            self.client.get(reverse('perf_profile_file', args=[profile_id, 'txt'])).status_code, 404
+        )
+
+
+class QueryPlanTests(QueryPlanTestMixin, TestCase):
+    """
+    Every query behind the hot views must be able to use an index
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = seed(scale=0.05)
+
+    def setUp(self):
+        # Cached fragments would hide their queries
+        cache.clear()
+
+    def get(self, role, url, **params):
+        if role != 'anonymous':
+            self.client.force_login(self.dataset.users[role])
+        with self.assertIndexedQueries():
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+
+    def test_menu(self):
+        food_item, shop = self.dataset.food_item, self.dataset.shop
+        self.get('anonymous', reverse('browse_menu'))
+        self.get('anonymous', reverse('browse_menu'), vegetarian='1')
+        self.get('anonymous', reverse('browse_menu_json'), search='dosa')
+        self.get('anonymous', reverse('shop_menu', args=[shop.id]))
+        self.get('anonymous', reverse('food_detail', args=[food_item.id]))
+
+    def test_shops(self):
+        self.get('anonymous', reverse('shop_list'))
+        self.get('anonymous', reverse('shop_public_detail', args=[self.dataset.shop.id]))
+
+    def test_orders(self):
+        self.get('student', reverse('my_orders'))
+        self.get('student', reverse('order_detail', args=[self.dataset.order.id]))
+        self.get('student', reverse('view_cart'))
+        self.get('vendor', reverse('my_orders'))
+        self.get('vendor', reverse('my_orders_json'))
+
+    def test_dashboards(self):
+        self.get('student', reverse('dashboard'))
+        self.get('admin', reverse('dashboard'))
+        self.get('vendor', reverse('sales_analytics'), days=365)
+
+    def test_todays_orders_is_a_range_query(self):
+        with self.assertIndexedQueries() as collector:
+            stats.compute_shop_stats(self.dataset.shop.id)
+        [(_, plan)] = [(sql, plan) for sql, plan in collector.plans() if 'orders_order' in sql]
+        self.assertIn('SEARCH orders_order USING INDEX order_shop_', ' '.join(plan))
+
+    def test_full_scans_are_reported(self):
+        with collect_queries() as collector:
+            list(User.objects.filter(first_name='nobody'))
+        [(_, plan)] = collector.plans()
+        self.assertEqual(full_scans(plan), ['accounts_user'])
@@ -0,0 +1,9 @@
+# perf/urls.py
+
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('profiles/', views.profile_list, name='perf_profile_list'),
+    path('profiles/<str:profile_id>.<str:extension>', views.profile_file, name='perf_profile_file'),
+]
@@ -0,0 +1,36 @@
+# perf/views.py
+
+from django.contrib import admin
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import FileResponse, Http404
+from django.shortcuts import render
+from . import profiling
+
+PROFILES_SHOWN = 50
+
+
+@staff_member_required
+def profile_list(request):
+    """
+    Recent request profiles with their top functions (staff only)
+    """
+    context = {
+        **admin.site.each_context(request),
+        'title': 'Request profiles',
+        'profiles': profiling.list_profiles(limit=PROFILES_SHOWN),
+        'token': profiling.make_token(),
+        'header': profiling.get_header(),
+        'sample_rate': profiling.get_sample_rate(),
+    }
+    return render(request, 'perf/profile_list.html', context)
+
+
+@staff_member_required
+def profile_file(request, profile_id, extension):
+    """
+    Download a profile's .prof, .collapsed or .json file
+    """
+    path = profiling.profile_path(profile_id, extension)
+    if path is None:
+        raise Http404('No such profile')
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=f'{profile_id}.{extension}')
@@ -3,7 +3,20 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.utils import timezone
+from django.db import transaction
 from .models import Shop
+from dashboard import stats
+
+
+class ShopListFilter(admin.RelatedFieldListFilter):
+    """
+    Shop filter loading each shop's vendor (used by Shop.__str__) in the same query
+    """
+    def field_choices(self, field, request, model_admin):
+        ordering = self.field_admin_ordering(field, request, model_admin)
+        shops = Shop.objects.select_related('vendor').order_by(*ordering)
+        return [(shop.pk, str(shop)) for shop in shops]
+
 
 @admin.register(Shop)
 class ShopAdmin(admin.ModelAdmin):
@@ -13,6 +26,7 @@ class ShopAdmin(admin.ModelAdmin):
     list_display = ['shop_name', 'vendor_username', 'status_badge', 'phone', 'applied_at', 'action_buttons']
     list_filter = ['status', 'is_active', 'applied_at']
     search_fields = ['shop_name', 'vendor__username', 'vendor__email', 'phone']
+    list_select_related = ['vendor']
     readonly_fields = ['applied_at', 'approved_at', 'updated_at', 'vendor']
     
     fieldsets = (
@@ -68,4 +82,20 @@ class ShopAdmin(admin.ModelAdmin):
         if obj.status in ['rejected', 'blocked']:
             obj.is_active = False
         
-        super().save_model(request, obj, form, change)
\ No newline at end of file
+        super().save_model(request, obj, form, change)
+        
+        # Keep the admin dashboard counters in step (changeform views are atomic)
+        if change:
+            stats.record_shop_status_changed(obj, form.initial.get('status'))
+        else:
+            stats.record_shop_added(obj)
+    
+    def delete_model(self, request, obj):
+        stats.record_shop_removed(obj)
+        super().delete_model(request, obj)
+    
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            for shop in queryset:
+                stats.record_shop_removed(shop)
+            super().delete_queryset(request, queryset)
\ No newline at end of file
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-18 05:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shop',
+            name='banner_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='shop',
+            name='logo_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.9 on 2026-10-18 05:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0002_shop_banner_variants_shop_logo_variants'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shop',
+            index=models.Index(fields=['status', 'is_active'], name='shop_status_active'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.9 on 2026-10-18 05:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0003_hot_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shop',
+            index=models.Index(fields=['updated_at'], name='shop_updated'),
+        ),
+    ]
@@ -3,6 +3,25 @@
 from django.db import models
 from django.conf import settings
 
+# Long text columns that lists and joined rows do not show
+DETAIL_FIELDS = ('description', 'address', 'admin_notes')
+
+
+class ShopQuerySet(models.QuerySet):
+    """
+    Shared shop filters
+    """
+
+    def approved(self):
+        return self.filter(status='approved')
+
+    def active(self):
+        """
+        Shops students can see and order from (the is_approved property)
+        """
+        return self.filter(status='approved', is_active=True)
+
+
 class Shop(models.Model):
     """
     Vendor Shop Model
@@ -16,6 +35,12 @@ class Shop(models.Model):
         ('blocked', 'Blocked'),
     )
     
+    # Resized copies built by foodcourt.images
+    IMAGE_VARIANTS = {
+        'shop_logo': ('logo_variants', ('thumb',)),
+        'shop_banner': ('banner_variants', ('card', 'banner')),
+    }
+    
     vendor = models.OneToOneField(
         settings.AUTH_USER_MODEL, 
         on_delete=models.CASCADE, 
@@ -28,6 +53,8 @@ class Shop(models.Model):
     description = models.TextField()
     shop_logo = models.ImageField(upload_to='shops/logos/', blank=True, null=True)
     shop_banner = models.ImageField(upload_to='shops/banners/', blank=True, null=True)
+    logo_variants = models.JSONField(default=dict, blank=True, editable=False)
+    banner_variants = models.JSONField(default=dict, blank=True, editable=False)
     
     # Contact Information
     phone = models.CharField(max_length=15)
@@ -46,10 +73,17 @@ class Shop(models.Model):
     approved_at = models.DateTimeField(blank=True, null=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = ShopQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Shop'
         verbose_name_plural = 'Shops'
         ordering = ['-applied_at']
+        indexes = [
+            models.Index(fields=['status', 'is_active'], name='shop_status_active'),
+            # Max(updated_at) validates the public shop list (menu.conditional)
+            models.Index(fields=['updated_at'], name='shop_updated'),
+        ]
     
     def __str__(self):
         return f"{self.shop_name} - {self.vendor.username}"
@@ -0,0 +1,14 @@
+# vendors/signals.py
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from foodcourt import images
+from .models import Shop
+
+
+# ============= IMAGE VARIANTS =============
+
+@receiver(post_save, sender=Shop)
+def build_shop_variants(sender, instance, raw=False, **kwargs):
+    if not raw:
+        images.schedule_variants(instance)
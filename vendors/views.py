@@ -1,11 +1,22 @@
 # vendors/views.py
 
-from django.shortcuts import render, redirect, get_object_or_404
+import asyncio
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, redirect, aget_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db import transaction
+from django.template.loader import render_to_string
 from .models import Shop
 from .forms import ShopApplicationForm, ShopUpdateForm
 from menu.models import FoodItem  # Add this import
+from menu import cache as menu_cache
+from menu import conditional
+from dashboard import stats
+from foodcourt.db import alist
+from foodcourt.http import public_page
+from foodcourt.replica import replica_reads
+from perf.budget import query_budget
 
 @login_required
 def apply_shop(request):
@@ -27,7 +38,9 @@ def apply_shop(request):
         if form.is_valid():
             shop = form.save(commit=False)
             shop.vendor = request.user
-            shop.save()
+            with transaction.atomic():
+                shop.save()
+                stats.record_shop_added(shop)
             messages.success(request, 'Shop application submitted successfully! Admin will review it soon.')
             return redirect('vendor_shop_detail')
     else:
@@ -81,32 +94,44 @@ def vendor_shop_update(request):
     return render(request, 'vendors/shop_update.html', {'form': form, 'shop': shop})
 
 
-def shop_list(request):
+@replica_reads
+@public_page(etag_func=conditional.shops_etag, last_modified_func=conditional.shops_last_modified)
+@query_budget(queries=6)
+async def shop_list(request):
     """
     Public view to list all approved shops
     """
-    shops = Shop.objects.filter(status='approved', is_active=True)
-    return render(request, 'vendors/shop_list.html', {'shops': shops})
+    shops = await alist(Shop.objects.active())
+    return await sync_to_async(render)(request, 'vendors/shop_list.html', {'shops': shops})
 
 
-def shop_public_detail(request, shop_id):
+@replica_reads
+@public_page(etag_func=conditional.shop_etag, last_modified_func=conditional.shop_last_modified)
+@query_budget(queries=6)
+async def shop_public_detail(request, shop_id):
     """
     Public view of a shop's details with menu items
     """
-    shop = get_object_or_404(Shop, id=shop_id, status='approved', is_active=True)
+    shop = await aget_object_or_404(Shop.objects.active(), id=shop_id)
     
-    # Get food items from this shop (limit to 6 for preview)
-    food_items = FoodItem.objects.filter(
-        shop=shop, 
-        is_available=True
-    ).select_related('category')[:6]
-    
-    # Get total count
-    total_items = FoodItem.objects.filter(shop=shop, is_available=True).count()
+    async def render_menu_preview():
+        # Get food items from this shop (limit to 6 for preview) and the
+        # total count, concurrently
+        shop_items = FoodItem.objects.available().filter(shop=shop)
+        food_items, total_items = await asyncio.gather(
+            alist(shop_items.select_related('category')[:6]),
+            shop_items.acount(),
+        )
+        
+        context = {
+            'shop': shop,
+            'food_items': food_items,
+            'total_items': total_items,
+        }
+        return await sync_to_async(render_to_string)('vendors/shop_menu_preview.html', context, request)
     
     context = {
         'shop': shop,
-        'food_items': food_items,
-        'total_items': total_items,
+        'menu_preview': await menu_cache.aget_fragment(shop.id, 'shop_preview', '', render_menu_preview),
     }
-    return render(request, 'vendors/shop_public_detail.html', context)
\ No newline at end of file
+    return await sync_to_async(render)(request, 'vendors/shop_public_detail.html', context)